@@ -0,0 +1,67 @@
+"""
+Content-addressed analysis result cache.
+
+Lookups go through a bounded in-process LRU first and then fall back to the
+`analysis_cache` table. Entries hold only content-derived findings; the
+service re-binds citations, summaries and metadata checks to the requesting
+evidence, so nothing from another case or firm is ever exposed.
+"""
+import os
+from typing import Optional, Dict, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core import models
+from app.core.cache import TTLCache
+
+LRU_SIZE = int(os.getenv("ANALYSIS_CACHE_LRU_SIZE", 1024))  # 0 disables the in-process tier
+
+CacheKey = Tuple[str, str, str]
+
+_lru = TTLCache(LRU_SIZE)  # No TTL: entries are content-addressed and never go stale
+
+
+def lookup(db: Session, file_hash: str, model_name: str, prompt_version: str) -> Optional[Dict]:
+    if not file_hash:
+        return None
+    key: CacheKey = (file_hash, model_name, prompt_version)
+    hit = _lru.get(key)
+    if hit is not None:
+        return hit
+
+    entry = db.query(models.AnalysisCacheEntry).filter(
+        models.AnalysisCacheEntry.file_hash == file_hash,
+        models.AnalysisCacheEntry.model_name == model_name,
+        models.AnalysisCacheEntry.prompt_version == prompt_version
+    ).first()
+    if entry is None:
+        return None
+
+    hit = {
+        "findings": entry.findings,
+        "reasoning_path": entry.reasoning_path,
+        "tokens_used": entry.tokens_used,
+    }
+    _lru.put(key, hit)
+    return hit
+
+
+def store(db: Session, file_hash: str, model_name: str, prompt_version: str, content: Dict):
+    """
+    Persists a freshly computed result. A concurrent worker may have stored the
+    same key first; the savepoint makes that a harmless no-op.
+    """
+    if not file_hash:
+        return
+    try:
+        with db.begin_nested():
+            db.add(models.AnalysisCacheEntry(
+                file_hash=file_hash,
+                model_name=model_name,
+                prompt_version=prompt_version,
+                findings=content["findings"],
+                reasoning_path=content["reasoning_path"],
+                tokens_used=content["tokens_used"],
+            ))
+    except IntegrityError:
+        pass
+    _lru.put((file_hash, model_name, prompt_version), content)
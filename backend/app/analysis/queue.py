@@ -0,0 +1,263 @@
+"""
+Durable analysis job queue backed by the `analysis_jobs` table.
+
+The API process only enqueues rows. Worker processes (app.analysis.worker)
+claim them with a lease: `SELECT ... FOR UPDATE SKIP LOCKED` on PostgreSQL,
+plus a guarded UPDATE so two workers can never own the same job, even on
+SQLite. A lease that expires (visibility timeout) makes the job claimable
+again, so a crashed worker never strands work; live workers keep long jobs
+leased with extend_lease, and complete/fail only write while the caller
+still holds the lease.
+"""
+import os
+from datetime import datetime, timedelta, UTC
+from typing import Optional, Iterable, List, Dict
+from sqlalchemy import select, update, insert, func, or_, and_
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.core import models
+
+VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("ANALYSIS_VISIBILITY_TIMEOUT", 300))
+MAX_ATTEMPTS = int(os.getenv("ANALYSIS_MAX_ATTEMPTS", 3))
+RETRY_BACKOFF_SECONDS = float(os.getenv("ANALYSIS_RETRY_BACKOFF", 5.0))
+MAX_BATCH_SIZE = int(os.getenv("ANALYSIS_MAX_BATCH_SIZE", 10000))
+TERMINAL_STATUSES = ("Completed", "Conflict Detected", "Failed")
+ANALYSIS_FAILED_STATUS = "Analysis Failed"  # Exhibit status once its job has given up
+
+# Keeps IN (...) lists below driver parameter limits (SQLite: 32766)
+_ID_CHUNK = 1000
+
+Job = models.AnalysisJob
+
+
+def _now() -> datetime:
+    return datetime.now(UTC)
+
+
+def enqueue(db: Session, evidence_id: str, firm_id: str) -> models.AnalysisJob:
+    """
+    Adds a Pending job to the session. The caller owns the transaction.
+    """
+    job = Job(
+        evidence_id=evidence_id,
+        firm_id=firm_id,
+        status="Pending",
+        attempts=0,
+        max_attempts=MAX_ATTEMPTS,
+        available_at=_now(),
+    )
+    db.add(job)
+    return job
+
+
+def enqueue_batch(
+    db: Session,
+    evidence_ids: Iterable[str],
+    firm_id: str,
+    user_id: str,
+    case_id: Optional[str] = None,
+) -> models.AnalysisBatch:
+    """
+    Creates an AnalysisBatch and one Pending job per evidence id with a single
+    bulk INSERT. The caller owns the transaction (and the audit entry).
+    """
+    evidence_ids = list(dict.fromkeys(evidence_ids))
+    batch = models.AnalysisBatch(
+        firm_id=firm_id,
+        case_id=case_id,
+        created_by=user_id,
+        total_jobs=len(evidence_ids),
+    )
+    db.add(batch)
+    db.flush()
+
+    if evidence_ids:
+        now = _now()
+        db.execute(insert(Job), [
+            {
+                "id": models.generate_uuid(),
+                "evidence_id": evidence_id,
+                "firm_id": firm_id,
+                "batch_id": batch.id,
+                "status": "Pending",
+                "attempts": 0,
+                "max_attempts": MAX_ATTEMPTS,
+                "available_at": now,
+            }
+            for evidence_id in evidence_ids
+        ])
+    return batch
+
+
+def find_foreign_evidence(db: Session, evidence_ids: List[str], firm_id: str) -> List[str]:
+    """Returns the ids that do not exist or belong to another firm."""
+    found = set()
+    for i in range(0, len(evidence_ids), _ID_CHUNK):
+        chunk = evidence_ids[i:i + _ID_CHUNK]
+        found.update(db.scalars(
+            select(models.Evidence.id).where(
+                models.Evidence.id.in_(chunk),
+                models.Evidence.firm_id == firm_id,
+            )
+        ))
+    return [evidence_id for evidence_id in evidence_ids if evidence_id not in found]
+
+
+def batch_progress(db: Session, batch: models.AnalysisBatch) -> Dict:
+    """Aggregates job statuses for a batch with one GROUP BY query."""
+    counts = dict(db.execute(
+        select(Job.status, func.count())
+        .where(Job.batch_id == batch.id)
+        .group_by(Job.status)
+    ).all())
+    finished = sum(counts.get(s, 0) for s in TERMINAL_STATUSES)
+    total = batch.total_jobs or 0
+    return {
+        "id": batch.id,
+        "case_id": batch.case_id,
+        "total": total,
+        "finished": finished,
+        "failed": counts.get("Failed", 0),
+        "progress": round(finished / total, 4) if total else 1.0,
+        "status_counts": counts,
+        "created_at": batch.created_at,
+    }
+
+
+def _mark_failed(db: Session, job: models.AnalysisJob):
+    # Through the ORM, so timeline and rollup hooks see the exhibit leave "Analyzing"
+    evidence = db.get(models.Evidence, job.evidence_id)
+    if evidence is not None and evidence.status == "Analyzing":
+        evidence.status = ANALYSIS_FAILED_STATUS
+
+
+def fail_abandoned(db: Session, limit: int = 100) -> int:
+    """
+    Marks Failed the jobs whose final attempt died without calling fail()
+    (worker OOM-killed or SIGKILLed): lease expired and attempts exhausted.
+    Returns the number of jobs failed; commits.
+    """
+    now = _now()
+    abandoned = db.scalars(
+        select(Job)
+        .where(Job.status == "Processing", Job.locked_until < now, Job.attempts >= Job.max_attempts)
+        .limit(limit)
+    ).all()
+    failed = 0
+    for job in abandoned:
+        updated = db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == "Processing", Job.locked_until < now)
+            .values(status="Failed", locked_by=None, locked_until=None,
+                    last_error=f"Lease expired during the final attempt (worker {job.locked_by})"[:1000])
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if updated:
+            _mark_failed(db, job)
+            failed += 1
+    db.commit()
+    return failed
+
+
+def claim_next(db: Session, worker_id: str) -> Optional[models.AnalysisJob]:
+    """
+    Leases the oldest runnable job to `worker_id` and commits the lease.
+    Runnable means Pending and due, or Processing with an expired lease and
+    attempts left; expired jobs without attempts left are failed first.
+    """
+    fail_abandoned(db)
+    now = _now()
+    candidate = (
+        select(Job.id, Job.status)
+        .where(or_(
+            and_(Job.status == "Pending", Job.available_at <= now),
+            and_(Job.status == "Processing", Job.locked_until < now, Job.attempts < Job.max_attempts),
+        ))
+        .order_by(Job.available_at)
+        .limit(1)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        candidate = candidate.with_for_update(skip_locked=True)
+
+    row = db.execute(candidate).first()
+    if row is None:
+        db.rollback()
+        return None
+
+    claimed = db.execute(
+        update(Job)
+        .where(Job.id == row.id, Job.status == row.status, Job.attempts < Job.max_attempts)
+        .where(or_(Job.locked_until.is_(None), Job.locked_until < now))
+        .values(
+            status="Processing",
+            attempts=Job.attempts + 1,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=VISIBILITY_TIMEOUT_SECONDS),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if not claimed:
+        return None  # Another worker won the race
+    return db.get(Job, row.id, populate_existing=True)
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and another worker (may have) claimed it."""
+
+
+def _release(db: Session, job: models.AnalysisJob, worker_id: str, **values):
+    """
+    Clears the lease (and sets `values`) only while `worker_id` still holds it,
+    in the caller's open transaction. Raises LeaseLost otherwise.
+    """
+    released = db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.locked_by == worker_id)
+        .values(locked_by=None, locked_until=None, **values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not released:
+        db.rollback()
+        raise LeaseLost(f"Analysis job {job.id} is no longer leased to {worker_id}")
+    for name, value in (("locked_by", None), ("locked_until", None), *values.items()):
+        set_committed_value(job, name, value)
+
+
+def extend_lease(db: Session, job_id: str, worker_id: str) -> bool:
+    """Heartbeat: pushes the lease out by another visibility timeout. False if it was lost."""
+    extended = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == "Processing")
+        .values(locked_until=_now() + timedelta(seconds=VISIBILITY_TIMEOUT_SECONDS))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return bool(extended)
+
+
+def complete(db: Session, job: models.AnalysisJob, worker_id: str):
+    """
+    Releases the lease and commits the results the service left in the session
+    (job status, report, exhibit status) in one transaction. If the lease was
+    lost meanwhile, the results are rolled back and LeaseLost is raised.
+    """
+    db.flush()
+    _release(db, job, worker_id, last_error=None)
+    db.commit()
+
+
+def fail(db: Session, job: models.AnalysisJob, worker_id: str, error: str):
+    """
+    Records a failed attempt. The job is rescheduled with exponential backoff
+    until max_attempts is reached, then marked Failed for good and its exhibit
+    leaves "Analyzing". Raises LeaseLost if another worker owns the job now.
+    """
+    if (job.attempts or 0) < (job.max_attempts or MAX_ATTEMPTS):
+        backoff = RETRY_BACKOFF_SECONDS * 2 ** ((job.attempts or 1) - 1)
+        _release(db, job, worker_id, status="Pending", last_error=error[:1000],
+                 available_at=_now() + timedelta(seconds=backoff))
+    else:
+        _release(db, job, worker_id, status="Failed", last_error=error[:1000])
+        _mark_failed(db, job)
+    db.commit()
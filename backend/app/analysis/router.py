@@ -1,57 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core import models, database, security
-from . import service, schemas
+from . import queue, schemas
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
 
+def create_batch(db: Session, current_user: security.Principal, evidence_ids, case_id: str = None):
+    """
+    Shared by /analysis/batch and /cases/{case_id}/analyze:
+    one bulk job insert, one audit entry, one commit.
+    """
+    if len(evidence_ids) > queue.MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {queue.MAX_BATCH_SIZE} evidence items")
+
+    batch = queue.enqueue_batch(db, evidence_ids, current_user.firm_id, current_user.id, case_id=case_id)
+    security.log_audit(
+        db, current_user.id, current_user.firm_id, "TRIGGER_BATCH_ANALYSIS", "analysis_batches", batch.id,
+        {"case_id": case_id, "jobs": batch.total_jobs}
+    )
+    db.commit()
+    return queue.batch_progress(db, batch)
+
+@router.post("/batch", response_model=schemas.AnalysisBatch)
+def trigger_batch_analysis(
+    request: schemas.AnalysisBatchCreate,
+    db: Session = Depends(database.get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
+):
+    evidence_ids = list(dict.fromkeys(request.evidence_ids))
+    missing = queue.find_foreign_evidence(db, evidence_ids, current_user.firm_id)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Evidence not found: {missing[:20]}")
+    return create_batch(db, current_user, evidence_ids)
+
+@router.get("/batch/{batch_id}", response_model=schemas.AnalysisBatch)
+def get_batch_status(
+    batch_id: str,
+    db: Session = Depends(database.get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
+):
+    batch = db.query(models.AnalysisBatch).filter(
+        models.AnalysisBatch.id == batch_id,
+        models.AnalysisBatch.firm_id == current_user.firm_id
+    ).first()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return queue.batch_progress(db, batch)
+
 @router.post("/{evidence_id}", response_model=schemas.AnalysisJob)
 async def trigger_analysis(
     evidence_id: str, 
-    background_tasks: BackgroundTasks, 
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: security.Principal = Depends(security.get_current_user_async)
 ):
     # 1. Fetch evidence (Strict Firm Isolation)
-    evidence = db.query(models.Evidence).filter(
+    evidence = (await db.execute(select(models.Evidence.id).where(
         models.Evidence.id == evidence_id,
         models.Evidence.firm_id == current_user.firm_id
-    ).first()
+    ))).first()
     
     if not evidence:
         raise HTTPException(status_code=404, detail="Evidence not found")
 
-    # 2. Create AnalysisJob Record
-    job = models.AnalysisJob(
-        evidence_id=evidence_id,
-        firm_id=current_user.firm_id,
-        status="Pending"
-    )
-    db.add(job)
-    db.commit()
-    db.refresh(job)
-
-    # 3. Trigger Async Task
-    background_tasks.add_task(service.AIService.analyze_evidence, evidence_id, job.id, db)
+    # 2-3. Enqueue durable AnalysisJob; picked up by app.analysis.worker processes
+    job = queue.enqueue(db, evidence_id, current_user.firm_id)
+    await db.flush()
     
-    # 4. Audit
+    # 4. Audit (committed together with the job)
     security.log_audit(
         db, current_user.id, current_user.firm_id, "TRIGGER_ANALYSIS", "analysis_jobs", job.id
     )
+    await db.commit()
+    await db.refresh(job)
 
     return job
 
 @router.get("/{evidence_id}/status", response_model=schemas.AnalysisJob)
 async def get_analysis_status(
     evidence_id: str, 
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: security.Principal = Depends(security.get_current_user_async)
 ):
     # Query the latest job for this evidence and firm
-    job = db.query(models.AnalysisJob).filter(
-        models.AnalysisJob.evidence_id == evidence_id,
-        models.AnalysisJob.firm_id == current_user.firm_id
-    ).order_by(models.AnalysisJob.created_at.desc()).first()
+    job = (await db.execute(
+        select(models.AnalysisJob).where(
+            models.AnalysisJob.evidence_id == evidence_id,
+            models.AnalysisJob.firm_id == current_user.firm_id
+        ).order_by(models.AnalysisJob.created_at.desc()).limit(1)
+    )).scalars().first()
     
     if not job:
         raise HTTPException(status_code=404, detail="No analysis jobs found for this evidence")
@@ -25,5 +25,19 @@ class AnalysisJob(BaseModel):
     evidence_id: str
     status: str # Pending, Processing, Verified, Conflict Detected, Failed
     result: Optional[AnalysisResult] = None
+    cache_hit: Optional[bool] = False # Served from the content-addressed result cache
     created_at: datetime
     updated_at: Optional[datetime]
+
+class AnalysisBatchCreate(BaseModel):
+    evidence_ids: List[str]
+
+class AnalysisBatch(BaseModel):
+    id: str
+    case_id: Optional[str] = None
+    total: int
+    finished: int
+    failed: int
+    progress: float # 0.0 - 1.0
+    status_counts: Dict[str, int]
+    created_at: Optional[datetime] = None
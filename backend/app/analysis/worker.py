@@ -0,0 +1,129 @@
+"""
+Analysis worker pool.
+
+Each worker process opens its own database sessions and drains the
+app.analysis.queue table. Throughput scales with --concurrency because
+workers share nothing but the queue rows. While a job runs, a heartbeat
+thread keeps extending its lease.
+
+Usage:
+    python -m app.analysis.worker --concurrency 4
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from typing import Optional
+from app.core.database import SessionLocal
+from app.cases import timeline  # Registers timeline write hooks (exhibit status changes)
+from app.dashboard import rollups  # Registers rollup write hooks (exhibit status changes)
+from . import queue, service
+
+logger = logging.getLogger("veritas.analysis.worker")
+
+WORKER_CONCURRENCY = int(os.getenv("ANALYSIS_WORKER_CONCURRENCY", os.cpu_count() or 1))
+POLL_INTERVAL_SECONDS = float(os.getenv("ANALYSIS_POLL_INTERVAL", 1.0))
+HEARTBEAT_SECONDS = float(os.getenv("ANALYSIS_HEARTBEAT", queue.VISIBILITY_TIMEOUT_SECONDS / 3))
+
+
+def _heartbeat(job_id: str, worker_id: str, stop: threading.Event):
+    """Extends the job's lease every HEARTBEAT_SECONDS until stopped or the lease is lost."""
+    with SessionLocal() as db:
+        while not stop.wait(HEARTBEAT_SECONDS):
+            try:
+                if not queue.extend_lease(db, job_id, worker_id):
+                    logger.warning(f"Analysis job {job_id}: lease lost to another worker")
+                    return
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Analysis job {job_id}: heartbeat failed: {e}")
+
+
+def process_job(db, job, worker_id: str) -> bool:
+    """Runs one leased job to completion or records the failure. Returns True on success."""
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job.id, worker_id, stop), daemon=True)
+    heartbeat.start()
+    try:
+        try:
+            result = service.AIService.analyze_evidence(job.evidence_id, job.id, db)
+            if result is None:
+                raise LookupError("Job or evidence no longer exists")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Analysis job {job.id} failed (attempt {job.attempts}): {e}")
+            queue.fail(db, job, worker_id, "".join(traceback.format_exception_only(e)).strip())
+            return False
+        queue.complete(db, job, worker_id)
+        return True
+    except queue.LeaseLost as e:
+        logger.warning(f"{e}; its results were discarded")
+        return False
+    finally:
+        stop.set()
+        heartbeat.join()
+
+
+def run_worker(worker_id: str, poll_interval: float = POLL_INTERVAL_SECONDS,
+               max_jobs: Optional[int] = None, stop_when_idle: bool = False) -> int:
+    """
+    Claim/process loop for a single worker. Returns the number of jobs handled.
+    """
+    stopping = False
+
+    def _stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    if multiprocessing.current_process().name != "MainProcess":
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+
+    handled = 0
+    while not stopping and (max_jobs is None or handled < max_jobs):
+        with SessionLocal() as db:
+            job = queue.claim_next(db, worker_id)
+            if job is None:
+                if stop_when_idle:
+                    break
+                time.sleep(poll_interval)
+                continue
+            process_job(db, job, worker_id)
+            handled += 1
+    return handled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Veritas analysis worker pool")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY)
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL_SECONDS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    ctx = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+    workers = [
+        ctx.Process(target=run_worker, args=(f"{host}:{os.getpid()}:{i}", args.poll_interval), name=f"analysis-worker-{i}")
+        for i in range(args.concurrency)
+    ]
+    for w in workers:
+        w.start()
+    logger.info(f"Started {len(workers)} analysis workers")
+
+    def _shutdown(*_):
+        for w in workers:
+            w.terminate()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+    for w in workers:
+        w.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Audit hash chain primitives.
+
+Every SystemAudit row hashes its own content together with the previous
+row's hash for the same firm, so editing, deleting or reordering any entry
+breaks every hash after it.
+"""
+import hashlib
+import json
+from datetime import datetime, UTC
+
+GENESIS_HASH = "GENESIS"
+
+HASHED_FIELDS = (
+    "id", "seq", "prev_hash", "firm_id", "user_id",
+    "action", "table_name", "record_id", "details", "timestamp",
+)
+
+
+def canonical_timestamp(ts) -> str:
+    """UTC, naive, microsecond ISO format: identical on PostgreSQL and SQLite round-trips."""
+    if ts is None:
+        return None
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(UTC).replace(tzinfo=None)
+    return ts.isoformat(timespec="microseconds")
+
+
+def compute_row_hash(entry) -> str:
+    """
+    Hashes a mapping (or SystemAudit row) over HASHED_FIELDS.
+    """
+    get = entry.get if isinstance(entry, dict) else lambda field: getattr(entry, field)
+    payload = {field: get(field) for field in HASHED_FIELDS}
+    payload["timestamp"] = canonical_timestamp(payload["timestamp"])
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class ChainVerifier:
+    """
+    Incremental verifier for one firm's audit rows fed in `seq` order.
+    Holds O(1) state (plus a capped list of breaks), so it can check
+    arbitrarily long exports as they stream.
+    """
+    MAX_REPORTED_BREAKS = 1000
+
+    def __init__(self):
+        self.rows = 0
+        self.verified = 0
+        self.unchained = 0  # Rows written before hash chaining existed
+        self.break_count = 0
+        self.breaks = []
+        self.last_seq = None
+        self.last_hash = None
+        self._head = None
+        self._head_hash_seen = None
+        self._from_start = False  # Set by expect_head(): the log is fed unfiltered
+
+    def _break(self, row, reason: str):
+        self.break_count += 1
+        if len(self.breaks) < self.MAX_REPORTED_BREAKS:
+            self.breaks.append({"id": row.id, "seq": row.seq, "reason": reason})
+
+    def feed(self, row) -> bool:
+        """Checks one row; returns False if it breaks the chain."""
+        self.rows += 1
+        if row.seq is None:
+            self.unchained += 1
+            return True
+
+        ok = True
+        if row.row_hash != compute_row_hash(row):
+            self._break(row, "row_hash mismatch (entry modified)")
+            ok = False
+        if self.last_seq is None:
+            if self._from_start and row.seq != 1:
+                self._break(row, f"log does not start at seq 1 (starts at seq {row.seq})")
+                ok = False
+            elif row.seq == 1 and row.prev_hash != GENESIS_HASH:
+                self._break(row, "first entry does not start from GENESIS")
+                ok = False
+        elif row.seq != self.last_seq + 1:
+            self._break(row, f"gap: expected seq {self.last_seq + 1}")
+            ok = False
+        elif row.prev_hash != self.last_hash:
+            self._break(row, "prev_hash does not match previous entry")
+            ok = False
+
+        self.last_seq, self.last_hash = row.seq, row.row_hash
+        if self._head and row.seq == self._head[0]:
+            self._head_hash_seen = row.row_hash
+        if ok:
+            self.verified += 1
+        return ok
+
+    def expect_head(self, head_seq, head_hash):
+        """
+        Registers the firm's chain head as read *before* streaming started.
+        Rows appended later are fine; a log ending before the head, or a
+        different hash at the head's seq, means entries were removed.
+        Also declares the feed complete, so its first chained row must be
+        seq 1 starting from GENESIS (leading entries cannot be dropped).
+        """
+        self._head = (head_seq, head_hash) if head_seq else None
+        self._from_start = True
+
+    def finish(self):
+        head = self._head
+        if head is None:
+            return
+        head_seq, head_hash = head
+        reason = None
+        if self.last_seq is None or self.last_seq < head_seq:
+            reason = f"chain head is seq {head_seq} but log ends at seq {self.last_seq}"
+        elif self._head_hash_seen is not None and self._head_hash_seen != head_hash:
+            reason = "entry at chain head does not match recorded head hash"
+        if reason:
+            self.break_count += 1
+            if len(self.breaks) < self.MAX_REPORTED_BREAKS:
+                self.breaks.append({"id": None, "seq": head_seq, "reason": reason})
+
+    def summary(self) -> dict:
+        return {
+            "rows": self.rows,
+            "verified": self.verified,
+            "unchained": self.unchained,
+            "break_count": self.break_count,
+            "breaks": self.breaks,
+            "last_seq": self.last_seq,
+            "last_hash": self.last_hash,
+            "intact": self.break_count == 0,
+        }
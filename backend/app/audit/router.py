@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional, Literal
+from datetime import datetime
+from app.core import models, database, security
+from app.core.pagination import paginate, DEFAULT_PAGE_SIZE
+from . import schemas, export
+
+router = APIRouter(prefix="/audit", tags=["audit"])
+
+def query_audit_logs(
+    db: Session,
+    firm_id: str,
+    action: Optional[str] = None,
+    table_name: Optional[str] = None,
+    record_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Firm-scoped audit query. Every filter combination is served by one of the
+    (firm_id, ..., timestamp, id) composite indexes on system_audits.
+    """
+    query = db.query(models.SystemAudit).filter(models.SystemAudit.firm_id == firm_id)
+    if action:
+        query = query.filter(models.SystemAudit.action == action)
+    if table_name:
+        query = query.filter(models.SystemAudit.table_name == table_name)
+    if record_id:
+        query = query.filter(models.SystemAudit.record_id == record_id)
+    if user_id:
+        query = query.filter(models.SystemAudit.user_id == user_id)
+    if since:
+        query = query.filter(models.SystemAudit.timestamp >= since)
+    if until:
+        query = query.filter(models.SystemAudit.timestamp < until)
+    return query
+
+@router.get("/logs", response_model=schemas.AuditPage)
+def list_audit_logs(
+    action: Optional[str] = None,
+    table_name: Optional[str] = None,
+    record_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: Session = Depends(database.get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
+):
+    """
+    Newest-first audit trail with keyset pagination on (timestamp, id).
+    """
+    query = query_audit_logs(db, current_user.firm_id, action, table_name, record_id, user_id, since, until)
+    items, next_cursor = paginate(
+        query, [models.SystemAudit.timestamp, models.SystemAudit.id], cursor, limit, descending=True
+    )
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+def export_audit_logs(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: security.Principal = Depends(security.require_roles(["Owner", "Admin"]))
+):
+    """
+    Streams the firm's full audit log in chain order with inline integrity
+    verification. The final record is a trailer listing any chain breaks.
+    """
+    security.log_audit_async(
+        current_user.id, current_user.firm_id, "EXPORT_AUDIT", "system_audits", None,
+        {"format": format, "since": since.isoformat() if since else None, "until": until.isoformat() if until else None}
+    )
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"audit-{current_user.firm_id}.{'csv' if format == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        export.stream_audit_export(current_user.firm_id, format, since, until),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
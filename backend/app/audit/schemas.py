@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import List, Optional, Dict
+from datetime import datetime
+
+class AuditEntry(BaseModel):
+    id: str
+    action: str
+    table_name: Optional[str] = None
+    record_id: Optional[str] = None
+    user_id: Optional[str] = None
+    timestamp: datetime
+    details: Optional[Dict] = None
+    seq: Optional[int] = None
+    prev_hash: Optional[str] = None
+    row_hash: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class AuditPage(BaseModel):
+    items: List[AuditEntry]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,205 @@
+"""
+Batched audit log writer.
+
+Two delivery paths, both ending in `write_entries`:
+
+* In-transaction (default): `buffer()` parks entries on the Session and a
+  `before_commit` hook bulk-inserts them as part of the caller's own commit.
+  A rollback discards them together with the business data.
+* Background: `AuditFlusher.submit()` queues entries for a daemon thread that
+  flushes in bulk every AUDIT_FLUSH_INTERVAL_MS (or AUDIT_FLUSH_BATCH rows),
+  for read-only endpoints that have nothing else to commit. `stop()` drains
+  the queue, and it is registered with atexit as a last resort.
+
+Each firm's chain tip lives in `audit_chain_heads`, locked once per flush,
+so appends cost O(batch) and never re-read historical rows. Entries without
+a firm (e.g. before a user joins one) are hashed but left out of any chain.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, UTC
+from typing import Dict, List
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.core import models
+from app.core.database import SessionLocal
+from . import chain
+
+logger = logging.getLogger("veritas.audit")
+
+AUDIT_FLUSH_INTERVAL_MS = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", 200))
+AUDIT_FLUSH_BATCH = int(os.getenv("AUDIT_FLUSH_BATCH", 500))
+
+_BUFFER_KEY = "veritas_audit_buffer"
+
+
+def make_entry(user_id: str, firm_id: str, action: str, table_name: str, record_id: str, details: dict = None) -> Dict:
+    return {
+        "id": models.generate_uuid(),
+        "user_id": user_id,
+        "firm_id": firm_id,
+        "action": action,
+        "table_name": table_name,
+        "record_id": record_id,
+        "details": details,
+        "timestamp": datetime.now(UTC),
+    }
+
+
+def _lock_head(db: Session, firm_id: str) -> models.AuditChainHead:
+    """Returns the firm's chain head, creating it if needed, locked for this transaction."""
+    dialect = db.get_bind().dialect.name
+    values = {"firm_id": firm_id, "seq": 0, "last_hash": chain.GENESIS_HASH}
+    if dialect == "postgresql":
+        db.execute(pg_insert(models.AuditChainHead).values(**values).on_conflict_do_nothing())
+    elif dialect == "sqlite":
+        db.execute(sqlite_insert(models.AuditChainHead).values(**values).on_conflict_do_nothing())
+    elif db.get(models.AuditChainHead, firm_id) is None:
+        db.add(models.AuditChainHead(**values))
+        db.flush()
+
+    head_query = select(models.AuditChainHead.seq, models.AuditChainHead.last_hash).where(
+        models.AuditChainHead.firm_id == firm_id
+    )
+    if dialect == "postgresql":
+        head_query = head_query.with_for_update()
+    return db.execute(head_query).one()
+
+
+def write_entries(db: Session, entries: List[Dict]):
+    """
+    Chains and bulk-inserts entries inside the current transaction:
+    one head lock, one multi-row INSERT and one head UPDATE per firm.
+    """
+    by_firm: Dict[str, List[Dict]] = {}
+    firmless = []
+    for entry in entries:
+        if entry["firm_id"]:
+            by_firm.setdefault(entry["firm_id"], []).append(entry)
+        else:
+            firmless.append(entry)
+
+    if firmless:
+        # No firm, no chain: no firm's export would ever include (and verify)
+        # these rows, and firm_id is a foreign key so a sentinel can't stand in
+        rows = [{**entry, "firm_id": None, "seq": None, "prev_hash": None} for entry in firmless]
+        for row in rows:
+            row["row_hash"] = chain.compute_row_hash(row)
+        db.execute(insert(models.SystemAudit), rows)
+
+    # Fixed lock order keeps concurrent multi-firm flushes deadlock-free
+    for firm_key in sorted(by_firm):
+        head = _lock_head(db, firm_key)
+        seq, prev_hash = head.seq or 0, head.last_hash or chain.GENESIS_HASH
+        rows = []
+        for entry in by_firm[firm_key]:
+            seq += 1
+            row = {**entry, "seq": seq, "prev_hash": prev_hash}
+            row["row_hash"] = prev_hash = chain.compute_row_hash(row)
+            rows.append(row)
+        db.execute(insert(models.SystemAudit), rows)
+        db.execute(
+            update(models.AuditChainHead)
+            .where(models.AuditChainHead.firm_id == firm_key)
+            .values(seq=seq, last_hash=prev_hash)
+        )
+
+
+def buffer(db: Session, entry: Dict):
+    """Queues an entry to be written by the session's next commit."""
+    db = getattr(db, "sync_session", db)  # AsyncSession commits through its sync Session
+    if not db.in_transaction():
+        db.begin()  # Ties the buffer's lifetime to a transaction a rollback can end
+    db.info.setdefault(_BUFFER_KEY, []).append(entry)
+
+
+@event.listens_for(Session, "before_commit")
+def _flush_buffer(session: Session):
+    entries = session.info.pop(_BUFFER_KEY, None)
+    if entries:
+        write_entries(session, entries)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_buffer(session: Session, previous_transaction):
+    session.info.pop(_BUFFER_KEY, None)
+
+
+class AuditFlusher:
+    """
+    Background flusher with bounded latency. Entries submitted while it is not
+    running are written synchronously, so nothing is ever dropped.
+    """
+
+    def __init__(self, interval_ms: int = AUDIT_FLUSH_INTERVAL_MS, batch_size: int = AUDIT_FLUSH_BATCH):
+        self.interval = interval_ms / 1000
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Dict]" = queue.Queue()
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the thread after flushing everything queued so far."""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+        self._drain()
+
+    def submit(self, entry: Dict):
+        if self.running:
+            self._queue.put(entry)
+        else:
+            self._write([entry])
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._stopping.wait(self.interval)
+            self._drain()
+
+    def _drain(self):
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error(f"Audit flush of {len(batch)} entries failed, will retry: {e}")
+                for entry in batch:
+                    self._queue.put(entry)
+                return
+
+    def _write(self, entries: List[Dict]):
+        with SessionLocal() as db:
+            write_entries(db, entries)
+            db.commit()
+
+
+flusher = AuditFlusher()
+atexit.register(flusher.stop)
@@ -1,28 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List, Optional
-import hashlib
+import asyncio
+import os
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, BackgroundTasks, Query
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import List, Optional, Literal
 from datetime import datetime
-from app.core import models, database, firebase as firebase_setup, security as auth
-from app.analysis import service as ai_service
-from . import schemas as case_schemas
+from app.core import models, database, security as auth
+from app.core.projection import Projection, json_rows
+from app.core.pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.analysis import schemas as analysis_schemas
+from app.analysis.router import create_batch
+from app.evidence import storage as evidence_storage, custody, extraction
+from . import schemas as case_schemas, timeline
 from app.core.security import get_current_user, require_roles
 
 router = APIRouter(prefix="/cases", tags=["cases"])
 
+# case_schemas.Case nests its evidence: load it in one IN query per page
+# instead of one lazy load per case during serialization
+WITH_EVIDENCE = selectinload(models.Case.evidence)
+
+# ?fields= / ?view=summary on list_cases: a single Core SELECT, no evidence rows
+CASE_PROJECTION = Projection(
+    models.Case,
+    case_schemas.Case,
+    summary=["id", "title", "case_number", "status", "registered_at", "evidence_count"],
+    computed={
+        "evidence_count": select(func.count(models.Evidence.id))
+        .where(models.Evidence.case_id == models.Case.id)
+        .correlate(models.Case)
+        .scalar_subquery(),
+    },
+)
+
 # Removed mock get_current_firm_id
 
 @router.post("/", response_model=case_schemas.Case)
 def create_case(
     case: case_schemas.CaseCreate, 
     db: Session = Depends(database.get_db), 
-    current_user: models.User = Depends(require_roles(["Owner", "Lawyer", "Admin"]))
+    current_user: auth.Principal = Depends(require_roles(["Owner", "Lawyer", "Admin"]))
 ):
     db_case = models.Case(
         **case.dict(),
         firm_id=current_user.firm_id
     )
     db.add(db_case)
+    db.flush() # Assigns db_case.id for the audit record
     
     # Secure Audit Entry via centralized helper
     auth.log_audit(
@@ -37,16 +65,26 @@ def create_case(
     
     db.commit()
     db.refresh(db_case)
+    set_committed_value(db_case, "evidence", [])  # A new case has no exhibits; skip the lazy load
     return db_case
 
 @router.get("/", response_model=List[case_schemas.Case])
 def list_cases(
     cursor: Optional[str] = None, 
     limit: int = 20, 
+    fields: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
     db: Session = Depends(database.get_db), 
-    current_user: models.User = Depends(get_current_user)
+    current_user: auth.Principal = Depends(get_current_user)
 ):
-    query = db.query(models.Case).filter(models.Case.firm_id == current_user.firm_id)
+    names = CASE_PROJECTION.resolve(fields, view)
+    if names is not None:
+        stmt = CASE_PROJECTION.select(names).where(models.Case.firm_id == current_user.firm_id)
+        if cursor:
+            stmt = stmt.where(models.Case.id > cursor)
+        return json_rows(names, db.execute(stmt.order_by(models.Case.id).limit(limit)))
+
+    query = db.query(models.Case).options(WITH_EVIDENCE).filter(models.Case.firm_id == current_user.firm_id)
     
     if cursor:
         query = query.filter(models.Case.id > cursor) # Simple ID-based cursor
@@ -56,7 +94,7 @@ def list_cases(
 
 @router.get("/{case_id}", response_model=case_schemas.Case)
 def get_case(case_id: str, db: Session = Depends(database.get_db)):
-    db_case = db.query(models.Case).filter(models.Case.id == case_id).first()
+    db_case = db.query(models.Case).options(WITH_EVIDENCE).filter(models.Case.id == case_id).first()
     if not db_case:
         raise HTTPException(status_code=404, detail="Case not found")
     return db_case
@@ -65,9 +103,9 @@ def get_case(case_id: str, db: Session = Depends(database.get_db)):
 def lock_case(
     case_id: str, 
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(require_roles(["Owner", "Admin"]))
+    current_user: auth.Principal = Depends(require_roles(["Owner", "Admin"]))
 ):
-    db_case = db.query(models.Case).filter(
+    db_case = db.query(models.Case).options(WITH_EVIDENCE).filter(
         models.Case.id == case_id, 
         models.Case.firm_id == current_user.firm_id
     ).first()
@@ -76,11 +114,10 @@ def lock_case(
         raise HTTPException(status_code=404, detail="Case not found")
         
     db_case.status = "Locked"
-    db.commit()
-    
     auth.log_audit(
         db, current_user.id, current_user.firm_id, "LOCK_CASE", "cases", case_id
     )
+    db.commit()
     return db_case
 
 @router.post("/{case_id}/evidence", response_model=case_schemas.Evidence)
@@ -89,110 +126,257 @@ async def add_evidence(
     title: str,
     type: str,
     source: str,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...), 
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(require_roles(["Owner", "Lawyer", "Paralegal", "Admin"]))
+    collected_at: Optional[datetime] = None,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.Principal = Depends(require_roles(["Owner", "Lawyer", "Paralegal", "Admin"], auth.get_current_user_async))
 ):
     # 0. Check Case Lock Status
-    db_case = db.query(models.Case).filter(models.Case.id == case_id).first()
-    if db_case and db_case.status == "Locked":
+    db_case = (await db.execute(select(models.Case).where(
+        models.Case.id == case_id,
+        models.Case.firm_id == current_user.firm_id
+    ))).scalars().first()
+    if not db_case:
+        raise HTTPException(status_code=404, detail="Case not found")
+    if db_case.status == "Locked":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Case is LOCKED. No new evidence can be added for integrity reasons."
         )
 
-    # 1. Read file and calculate hash
-    content = await file.read()
-    file_hash = hashlib.sha256(content).hexdigest()
-    
-    # 2. Upload to Firebase Storage
-    bucket = firebase_setup.get_bucket()
-    if bucket:
-        blob = bucket.blob(f"evidence/{case_id}/{file_hash}_{file.filename}")
-        blob.upload_from_string(content, content_type=file.content_type)
-        storage_path = blob.name
-    else:
-        storage_path = f"local_storage/{case_id}/{file.filename}" # Fallback
+    # 1-2. Stream file into storage (Firebase or local fallback) while hashing
+    stored = await evidence_storage.store_upload(file, case_id)
+    file_hash = stored.file_hash
+    storage_path = stored.storage_path
     
-    # 3. Handle cryptographic chaining (Enterprise Integrity)
-    previous_evidence = db.query(models.Evidence).filter(
-        models.Evidence.case_id == case_id
-    ).order_by(models.Evidence.created_at.desc()).first()
-    
-    previous_hash = previous_evidence.file_hash if previous_evidence else "GENESIS"
-
-    # 4. Create database record
-    db_evidence = models.Evidence(
-        case_id=case_id,
-        title=title,
-        type=type,
-        source=source,
-        file_hash=file_hash,
-        storage_path=storage_path,
-        previous_hash=previous_hash,
-        firm_id=current_user.firm_id,
-        status="Pending",
-        audit_chain=[{
-            "action": "Uploaded",
-            "timestamp": datetime.utcnow().isoformat(),
-            "user": current_user.email,
-            "hash": file_hash,
-            "previous_hash": previous_hash
-        }]
-    )
-    db.add(db_evidence)
+    try:
+        # 3. Create database record
+        db_evidence = models.Evidence(
+            id=models.generate_uuid(),
+            case_id=case_id,
+            title=title,
+            type=type,
+            source=source,
+            collected_at=collected_at or datetime.utcnow(),
+            file_hash=file_hash,
+            storage_path=storage_path,
+            firm_id=current_user.firm_id,
+            status="Pending"
+        )
+
+        # 4. Handle cryptographic chaining (Enterprise Integrity)
+        # O(1) swap of the case's chain head; serialized per case only
+        previous_hash = await db.run_sync(custody.append, case_id, db_evidence)
+        db.add(db_evidence)
+        custody.record_event(db, db_evidence, "Uploaded", current_user.email, hash=file_hash, previous_hash=previous_hash)
     
-    # 5. Create System Audit entry via centralized helper
-    auth.log_audit(
-        db,
-        current_user.id,
-        current_user.firm_id,
-        "CREATE_EVIDENCE",
-        "evidence",
-        db_evidence.id,
-        {"case_id": case_id, "file_name": file.filename}
-    )
+        # 5. Create System Audit entry via centralized helper
+        auth.log_audit(
+            db,
+            current_user.id,
+            current_user.firm_id,
+            "CREATE_EVIDENCE",
+            "evidence",
+            db_evidence.id,
+            {"case_id": case_id, "file_name": file.filename}
+        )
     
-    db.commit()
-    db.refresh(db_evidence)
-    return db_evidence
+        await db.commit()
+    except Exception:
+        # No row points at the stored object: remove it unless an existing
+        # exhibit of this case has the same content (same content-addressed path)
+        await db.rollback()
+        referenced = (await db.execute(select(models.Evidence.id).where(
+            models.Evidence.storage_path == storage_path
+        ).limit(1))).first()
+        if referenced is None:
+            await run_in_threadpool(evidence_storage.delete_stored, storage_path)
+        raise
+    await db.refresh(db_evidence)
 
+    # 6. Extract text (then index it for semantic search) once the response is sent
+    background_tasks.add_task(
+        extraction.process_upload,
+        current_user.firm_id, db_evidence.id, file_hash, storage_path, file.filename, file.content_type
+    )
     return db_evidence
 
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from app.core import exporter
+from app.exports import pdf as pdf_renderer
 
 @router.get("/{case_id}/export", response_class=HTMLResponse)
-def export_case(
+async def export_case(
     case_id: str, 
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    format: Literal["html", "pdf"] = "html",
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """
     Generates a professional judicial-grade dossier for the case.
+    HTML is streamed as it renders; unchanged sections come from the dossier cache.
+    PDF renders in the renderer pool and is cached by content: a render that
+    outlasts PDF_WAIT_SECONDS answers 202 (repeat the request to collect it),
+    and a full render queue answers 503. Waiting for a render holds no thread.
     """
-    db_case = db.query(models.Case).filter(
+    query = select(models.Case).where(
         models.Case.id == case_id,
         models.Case.firm_id == current_user.firm_id
-    ).first()
+    )
+    if format == "pdf":
+        query = query.options(joinedload(models.Case.firm))
+    case = (await db.execute(query)).scalars().first()
     
-    if not db_case:
+    if not case:
         raise HTTPException(status_code=404, detail="Case not found or access denied")
     
-    report_html = exporter.generate_case_report(db_case)
-    
-    # Audit the export
-    auth.log_audit(
-        db, current_user.id, current_user.firm_id, "EXPORT_DOSSIER", "cases", case_id
+    # Audit the export (read-only request: flushed in the background)
+    auth.log_audit_async(
+        current_user.id, current_user.firm_id, "EXPORT_DOSSIER", "cases", case_id
     )
     
-    return report_html
+    if format == "html":
+        return StreamingResponse(exporter.stream_case_report(case_id), media_type="text/html; charset=utf-8")
+
+    key = await db.run_sync(pdf_renderer.dossier_key, case)
+    # An open handle, not a path: a concurrent prune() can't pull the file from under the response
+    handle = pdf_renderer.open_cached(key)
+    if handle is None:
+        try:
+            future = pdf_renderer.submit(case_id, key)
+        except pdf_renderer.RendererBusy:
+            raise HTTPException(status_code=503, detail="PDF renderer busy, retry shortly", headers={"Retry-After": "5"})
+        try:
+            # shield: timing out must not cancel the render other requests may be sharing
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), pdf_renderer.PDF_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            return JSONResponse({"status": "rendering"}, status_code=202, headers={"Retry-After": "5"})
+        handle = pdf_renderer.open_cached(key)
+        if handle is None:  # Evicted between render and read
+            return JSONResponse({"status": "rendering"}, status_code=202, headers={"Retry-After": "5"})
+    filename = quote(f"dossier-{case.case_number or case.id[:8]}.pdf")
+    return StreamingResponse(
+        pdf_renderer.iter_file(handle),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename*=utf-8''{filename}",
+            "Content-Length": str(os.fstat(handle.fileno()).st_size),
+        },
+    )
+
+@router.post("/{case_id}/analyze", response_model=analysis_schemas.AnalysisBatch)
+def analyze_case(
+    case_id: str,
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(require_roles(["Owner", "Lawyer", "Paralegal", "Admin"]))
+):
+    """
+    Enqueues analysis for every exhibit in the case as a single batch.
+    """
+    db_case = db.query(models.Case).filter(
+        models.Case.id == case_id,
+        models.Case.firm_id == current_user.firm_id
+    ).first()
+    if not db_case:
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    evidence_ids = db.scalars(
+        select(models.Evidence.id).where(
+            models.Evidence.case_id == case_id,
+            models.Evidence.firm_id == current_user.firm_id
+        )
+    ).all()
+    return create_batch(db, current_user, evidence_ids, case_id=case_id)
 
-@router.get("/{case_id}/timeline")
-def get_case_timeline(case_id: str, db: Session = Depends(database.get_db)):
-    db_case = db.query(models.Case).filter(models.Case.id == case_id).first()
+@router.get("/{case_id}/custody/verify", response_model=case_schemas.CustodyVerification)
+def verify_custody_chain(
+    case_id: str,
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(get_current_user)
+):
+    """
+    Walks the case's evidence chain and reports breaks and forks.
+    """
+    db_case = db.query(models.Case).filter(
+        models.Case.id == case_id,
+        models.Case.firm_id == current_user.firm_id
+    ).first()
     if not db_case:
         raise HTTPException(status_code=404, detail="Case not found")
-    
-    timeline = ai_service.AIService.generate_timeline(db_case)
-    return timeline
+    return custody.verify_case(db, case_id)
+
+@router.get("/{case_id}/xai-reports", response_model=case_schemas.XaiReportPage)
+def list_xai_reports(
+    case_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(get_current_user)
+):
+    """
+    The case's XAI reports, newest first, keyset-paginated on (created_at, id).
+    """
+    Report = models.CaseXaiReport
+    query = db.query(Report).filter(Report.case_id == case_id, Report.firm_id == current_user.firm_id)
+    items, next_cursor = paginate(query, [Report.created_at, Report.id], cursor, limit, descending=True)
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/{case_id}/evidence/{evidence_id}/custody", response_model=case_schemas.CustodyEventPage)
+def list_custody_events(
+    case_id: str,
+    evidence_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(get_current_user)
+):
+    """
+    An exhibit's chain-of-custody log in order, keyset-paginated on (occurred_at, id).
+    """
+    exists = db.query(models.Evidence.id).filter(
+        models.Evidence.id == evidence_id,
+        models.Evidence.case_id == case_id,
+        models.Evidence.firm_id == current_user.firm_id
+    ).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    Event = models.EvidenceCustodyEvent
+    query = db.query(Event).filter(Event.evidence_id == evidence_id)
+    items, next_cursor = paginate(query, [Event.occurred_at, Event.id], cursor, limit)
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/{case_id}/timeline", response_model=case_schemas.TimelinePage)
+def get_case_timeline(
+    case_id: str,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    types: Optional[List[str]] = Query(None, alias="type"),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(get_current_user)
+):
+    """
+    The case's chronology (registration, evidence, tasks, events, invoices)
+    from the materialized timeline, oldest first, keyset-paginated on
+    (occurred_at, id); `from`/`to` bound the window, `type` filters items.
+    """
+    exists = db.query(models.Case.id).filter(
+        models.Case.id == case_id,
+        models.Case.firm_id == current_user.firm_id
+    ).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Case not found")
+    columns = [timeline.case_timeline.c.occurred_at, timeline.case_timeline.c.id]
+    rows, next_cursor = paginate(timeline.page_query(db, case_id, start, end, types), columns, cursor, limit)
+    items = [{
+        "date": row.occurred_at,
+        "type": row.type,
+        "title": row.title,
+        "description": row.description,
+        "entity_type": row.entity_type,
+        "entity_id": row.entity_id,
+        "evidence_id": row.entity_id if row.entity_type == "Evidence" else None,
+    } for row in rows]
+    return {"items": items, "next_cursor": next_cursor}
@@ -18,11 +18,53 @@ class Evidence(EvidenceBase):
     file_hash: Optional[str]
     storage_path: Optional[str]
     firm_id: str
-    audit_chain: Optional[List[Dict]] = []
     
     class Config:
         from_attributes = True
 
+class CustodyEvent(BaseModel):
+    id: str
+    evidence_id: str
+    action: str
+    actor: Optional[str] = None
+    occurred_at: Optional[datetime] = None
+    details: Optional[Dict] = None
+
+    class Config:
+        from_attributes = True
+
+class CustodyEventPage(BaseModel):
+    items: List[CustodyEvent]
+    next_cursor: Optional[str] = None
+
+class XaiReport(BaseModel):
+    id: str
+    case_id: str
+    evidence_id: Optional[str] = None
+    job_id: Optional[str] = None
+    created_at: datetime
+    report: Dict
+
+    class Config:
+        from_attributes = True
+
+class XaiReportPage(BaseModel):
+    items: List[XaiReport]
+    next_cursor: Optional[str] = None
+
+class TimelineItem(BaseModel):
+    date: datetime
+    type: str # system, evidence, task, event, invoice
+    title: Optional[str] = None
+    description: Optional[str] = None
+    entity_type: str
+    entity_id: str
+    evidence_id: Optional[str] = None # Set on evidence items
+
+class TimelinePage(BaseModel):
+    items: List[TimelineItem]
+    next_cursor: Optional[str] = None
+
 class CaseBase(BaseModel):
     title: str
     description: str
@@ -44,3 +86,16 @@ class Case(CaseBase):
 
     class Config:
         from_attributes = True
+
+class CustodyIssue(BaseModel):
+    evidence_id: str
+    expected: Optional[str]
+    found: Optional[str]
+
+class CustodyVerification(BaseModel):
+    case_id: str
+    items: int
+    intact: bool
+    breaks: List[CustodyIssue]
+    forks: List[CustodyIssue]
+    head_hash: Optional[str] = None
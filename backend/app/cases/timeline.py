@@ -0,0 +1,140 @@
+"""
+Materialized per-case timeline.
+
+Every dated thing that happens on a case (registration, evidence, tasks,
+calendar events, invoices) is projected into one `case_timeline` row, kept
+current by ORM write hooks in the same transaction as the entity itself
+(app.core.materialized, as for the search documents). Reads are keyset-paginated
+range scans over the (case_id, occurred_at, id) index, so a page costs the
+same however long the litigation has been running.
+
+Rebuild for existing data:
+    python -m app.cases.timeline --rebuild
+"""
+from datetime import UTC, datetime
+from typing import Optional
+from sqlalchemy import Table, Column, Integer, String, Text, DateTime, UniqueConstraint, Index
+from app.core import models
+from app.core.database import Base
+from app.core.materialized import MaterializedTable
+
+case_timeline = Table(
+    "case_timeline",
+    Base.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("case_id", String, nullable=False),
+    Column("firm_id", String, nullable=False),
+    Column("entity_type", String, nullable=False),  # Case, Evidence, Task, Event, Invoice
+    Column("entity_id", String, nullable=False),
+    Column("type", String, nullable=False),  # system, evidence, task, event, invoice
+    Column("occurred_at", DateTime(timezone=True), nullable=False),
+    Column("title", Text),
+    Column("description", Text),
+    UniqueConstraint("entity_type", "entity_id", name="uq_case_timeline_entity"),
+    Index("ix_case_timeline_case_time", "case_id", "occurred_at", "id"),
+)
+
+
+def utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timeline times are UTC; naive values are taken to be UTC already."""
+    if value is None:
+        return None
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+
+
+# --- Entity projections ---
+
+def _case_item(case: models.Case) -> dict:
+    return {
+        "case_id": case.id,
+        "type": "system",
+        "occurred_at": case.registered_at,
+        "title": "Case Registered",
+        "description": f"Case {case.case_number} registered by firm {case.firm_id}.",
+    }
+
+
+def _evidence_item(evidence: models.Evidence) -> dict:
+    return {
+        "case_id": evidence.case_id,
+        "type": "evidence",
+        "occurred_at": evidence.collected_at or evidence.created_at,
+        "title": f"Evidence: {evidence.title}",
+        "description": f"Status: {evidence.status}. Citation: {evidence.id}",
+    }
+
+
+def _task_item(task: models.Task) -> dict:
+    return {
+        "case_id": task.case_id,
+        "type": "task",
+        "occurred_at": task.due_date or task.created_at,
+        "title": f"Task due: {task.title}" if task.due_date else f"Task: {task.title}",
+        "description": f"Status: {task.status}",
+    }
+
+
+def _event_item(item: models.Event) -> dict:
+    return {
+        "case_id": item.case_id,
+        "type": "event",
+        "occurred_at": item.start_time,
+        "title": f"Event: {item.title}",
+        "description": " | ".join(filter(None, [item.location, item.description])),
+    }
+
+
+def _invoice_item(invoice: models.Invoice) -> dict:
+    amount = f"{(invoice.total_amount or 0) / 100:.2f}"
+    return {
+        "case_id": invoice.case_id,
+        "type": "invoice",
+        "occurred_at": invoice.due_date or invoice.created_at,
+        "title": f"Invoice due: {amount}" if invoice.due_date else f"Invoice: {amount}",
+        "description": f"Status: {invoice.status}. Invoice {invoice.id}",
+    }
+
+
+TIMELINE_ENTITIES = {
+    models.Case: ("Case", _case_item),
+    models.Evidence: ("Evidence", _evidence_item),
+    models.Task: ("Task", _task_item),
+    models.Event: ("Event", _event_item),
+    models.Invoice: ("Invoice", _invoice_item),
+}
+
+
+def _dated(row: dict) -> Optional[dict]:
+    if not row["case_id"] or row["occurred_at"] is None:
+        return None  # Undated, or not (or no longer) attached to a case
+    return {**row, "occurred_at": utc(row["occurred_at"])}
+
+
+entries = MaterializedTable(
+    case_timeline, TIMELINE_ENTITIES, ("case_id", "firm_id", "type", "occurred_at", "title", "description"),
+    prepare=_dated,
+).listen()
+record_entity = entries.record
+rebuild = entries.rebuild
+
+
+def page_query(db, case_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               types: Optional[list] = None):
+    """Timeline rows of one case, optionally within [start, end) and of the given types."""
+    query = db.query(case_timeline).filter(case_timeline.c.case_id == case_id)
+    if start is not None:
+        query = query.filter(case_timeline.c.occurred_at >= utc(start))
+    if end is not None:
+        query = query.filter(case_timeline.c.occurred_at < utc(end))
+    if types:
+        query = query.filter(case_timeline.c.type.in_(types))
+    return query
+
+
+def main():
+    entries.main("Maintain the materialized case timelines", "Re-project all timeline items",
+                  "Recorded {} timeline items")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Small in-process caching primitives shared across modules.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class TTLCache:
+    """
+    Thread-safe mapping bounded by both size (LRU eviction) and age (TTL).
+    A ttl or maxsize of 0 disables caching entirely; ttl=None never expires
+    entries (a plain LRU).
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0 or (self.ttl is not None and self.ttl <= 0):
+            return
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -1,6 +1,11 @@
-from sqlalchemy import create_engine, event, text
+import importlib
+import ssl
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
 from sqlalchemy.pool import Pool
+from sqlalchemy.schema import CreateColumn
 import logging
 from app.core.config import DatabaseSettings
 
@@ -70,8 +75,47 @@ def create_db_engine():
     
     return engine
 
-# Initialize engine
+def get_async_database_url(db_url: str) -> str:
+    """Maps DATABASE_URL onto its asyncio driver (asyncpg / aiosqlite)."""
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        return url.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    raise RuntimeError(f"No async driver configured for '{backend}'")
+
+def create_async_db_engine():
+    """
+    Async counterpart of create_db_engine, used by `async def` endpoints so
+    queries await the driver instead of blocking the event loop.
+    Same pooling and SSL policy as the sync engine.
+    """
+    db_url = get_async_database_url(settings.DATABASE_URL)
+    echo = settings.ENVIRONMENT == "development"
+
+    if db_url.startswith("sqlite"):
+        return create_async_engine(db_url, echo=echo)
+
+    # asyncpg takes `ssl` (libpq sslmode names, or an SSLContext) instead of sslmode
+    ssl_arg = settings.get_ssl_mode()
+    if settings.DB_SSL_ROOT_CERT and ssl_arg in ("verify-ca", "verify-full"):
+        ssl_arg = ssl.create_default_context(cafile=settings.DB_SSL_ROOT_CERT)
+        ssl_arg.check_hostname = settings.get_ssl_mode() == "verify-full"
+
+    return create_async_engine(
+        db_url,
+        pool_size=settings.get_pool_size(),
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        connect_args={"ssl": ssl_arg},
+        echo=echo,
+    )
+
+# Initialize engines
 engine = create_db_engine()
+async_engine = create_async_db_engine()
 
 # Session factory with enterprise settings
 SessionLocal = sessionmaker(
@@ -82,6 +126,13 @@ SessionLocal = sessionmaker(
     future=True
 )
 
+# Async sessions never expire on commit: attribute access must not trigger implicit IO
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Declarative base for models
 Base = declarative_base()
 
@@ -104,6 +155,52 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """
+    Async variant of get_db for `async def` endpoints.
+    Synchronous helpers can still run on it via `await db.run_sync(fn, ...)`.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error(f"Database session error: {e}")
+            await db.rollback()
+            raise
+
+def ensure_columns():
+    """
+    create_all() never alters existing tables; this adds columns declared
+    later that are nullable or have a server default, then runs the
+    column's `info["backfill"]` function, if any, to derive existing values.
+    """
+    existing_tables = set(inspect(engine).get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {c["name"] for c in inspect(conn).get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not (column.nullable or column.server_default is not None):
+                    continue
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                logger.info(f"Added column {table.name}.{column.name}")
+                backfill = column.info.get("backfill")  # "module.function", called with the connection
+                if backfill:
+                    module, _, name = backfill.rpartition(".")
+                    getattr(importlib.import_module(module), name)(conn)
+
+def ensure_indexes():
+    """
+    create_all() only builds indexes together with new tables; this adds
+    indexes declared later on tables that already exist.
+    """
+    ensure_columns()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 def check_database_connection():
     """
     Startup health check for database connectivity.
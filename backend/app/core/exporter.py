@@ -1,9 +1,44 @@
-from jinja2 import Template
-from app.core import models
+"""
+Case dossier rendering.
+
+The dossier is assembled from section templates compiled once into
+`templates` (loaded at startup) and rendered with Template.generate(), so
+output streams as it is produced: exhibits and XAI reports are read from
+the database in batches while rendering, and memory stays flat however
+large the case is.
+
+The two heavy sections (evidence table, AI findings) are cached keyed by
+the case's version: a single aggregate over its evidence, custody events
+and reports that changes whenever anything those sections show changes.
+Repeat exports of an unchanged case only render the header and footer.
+
+`write_case_pdf` lays the same data (case, exhibits with excerpts, XAI
+reports) out as a PDF with app.core.pdf; PDF rendering runs in the pooled
+renderer in app.exports.pdf. PDFs are stamped with their content version
+rather than a generation time, since they are served from a content cache.
+"""
+import os
+import zlib
 from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from jinja2 import DictLoader, Environment
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, joinedload
+from app.core import models, pdf
+from app.core.cache import TTLCache
+from app.core.database import SessionLocal
+from app.analysis.service import iter_case_reports
+from app.evidence.textstore import store as text_store
+
+EXCERPT_BYTES = 280
+STREAM_CHUNK_CHARS = 16 * 1024
+STREAM_BATCH_ROWS = 500
+DOSSIER_CACHE_SIZE = int(os.getenv("DOSSIER_CACHE_SIZE", 128))  # Sections
+DOSSIER_CACHE_TTL = float(os.getenv("DOSSIER_CACHE_TTL", 3600))
+DOSSIER_CACHE_MAX_SECTION_CHARS = int(os.getenv("DOSSIER_CACHE_MAX_SECTION_CHARS", 16 * 1024 * 1024))  # Before compression
 
-REPORT_TEMPLATE = """
-<!DOCTYPE html>
+SECTION_TEMPLATES = {
+    "dossier/head.html": """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -24,7 +59,7 @@ REPORT_TEMPLATE = """
 </head>
 <body>
     <h1>Veritas Legal Intelligence - Case Dossier</h1>
-    
+
     <div class="metadata">
         <strong>Case:</strong> {{ case.title }} ({{ case.case_number }})<br>
         <strong>Firm:</strong> {{ case.firm.name }}<br>
@@ -34,7 +69,8 @@ REPORT_TEMPLATE = """
 
     <div class="section-title">Case Summary</div>
     <p>{{ case.description }}</p>
-
+""",
+    "dossier/evidence.html": """
     <div class="section-title">Evidence List</div>
     <table>
         <thead>
@@ -43,24 +79,27 @@ REPORT_TEMPLATE = """
                 <th>Type</th>
                 <th>Hash (SHA-256)</th>
                 <th>Status</th>
+                <th>Extracted Text</th>
             </tr>
         </thead>
         <tbody>
-            {% for item in case.evidence %}
+            {% for item, excerpt in evidence %}
             <tr>
                 <td>{{ item.title }}</td>
                 <td>{{ item.type }}</td>
-                <td style="font-family: monospace; font-size: 0.7em;">{{ item.file_hash[:16] }}...</td>
+                <td style="font-family: monospace; font-size: 0.7em;">{{ (item.file_hash or "")[:16] }}...</td>
                 <td>
                     <span class="status-badge {% if item.status == 'Verified' %}status-verified{% elif item.status == 'Conflict Detected' %}status-conflict{% endif %}">
                         {{ item.status }}
                     </span>
                 </td>
+                <td style="font-size: 0.8em;">{{ excerpt or "-" }}</td>
             </tr>
             {% endfor %}
         </tbody>
     </table>
-
+""",
+    "dossier/findings.html": """
     <div class="section-title">AI Findings (XAI)</div>
     {% for report in xai_reports %}
     <div style="margin-top: 15px; padding: 10px; border: 1px dotted #ccc;">
@@ -82,23 +121,193 @@ REPORT_TEMPLATE = """
     {% else %}
     <p>No AI analysis findings available for this dossier.</p>
     {% endfor %}
-
+""",
+    "dossier/foot.html": """
     <div class="footer">
         This document was cryptographically generated by Veritas. Document Integrity ID: {{ case.id[:8] }}-{{ now.timestamp()|int }}
     </div>
 </body>
 </html>
-"""
+""",
+}
+
+
+class TemplateRegistry:
+    """
+    Compiled templates by name. Sources never change at runtime, so each is
+    compiled once and reused by every render (no up-to-date checks).
+    """
+
+    def __init__(self, sources: Dict[str, str]):
+        self.environment = Environment(
+            loader=DictLoader(sources), autoescape=True, auto_reload=False, cache_size=-1
+        )
+        self._sources = sources
+
+    def load(self):
+        for name in self._sources:
+            self.environment.get_template(name)
+
+    def get(self, name: str):
+        return self.environment.get_template(name)
+
+
+templates = TemplateRegistry(SECTION_TEMPLATES)
+_sections = TTLCache(DOSSIER_CACHE_SIZE, DOSSIER_CACHE_TTL)
+
+
+def case_version(db: Session, case_id: str) -> Tuple:
+    """
+    Changes whenever an exhibit is added or updated, a custody event is
+    logged (uploads, text extraction, analyses) or an XAI report is stored.
+    """
+    Evidence, Custody, Report = models.Evidence, models.EvidenceCustodyEvent, models.CaseXaiReport
+    row = db.execute(select(
+        select(func.count(Evidence.id)).where(Evidence.case_id == case_id).scalar_subquery(),
+        select(func.max(func.coalesce(Evidence.updated_at, Evidence.created_at)))
+        .where(Evidence.case_id == case_id).scalar_subquery(),
+        select(func.max(Custody.occurred_at)).join(Evidence, Evidence.id == Custody.evidence_id)
+        .where(Evidence.case_id == case_id).scalar_subquery(),
+        select(func.count(Report.id)).where(Report.case_id == case_id).scalar_subquery(),
+        select(func.max(Report.created_at)).where(Report.case_id == case_id).scalar_subquery(),
+    )).one()
+    return tuple(row)
+
+
+def iter_evidence(db: Session, case_id: str) -> Iterator[Tuple]:
+    """(exhibit, excerpt) pairs in upload order, fetched in batches."""
+    Evidence = models.Evidence
+    rows = db.query(Evidence.title, Evidence.type, Evidence.file_hash, Evidence.status).filter(
+        Evidence.case_id == case_id
+    ).order_by(Evidence.created_at, Evidence.id).yield_per(STREAM_BATCH_ROWS)
+    for row in rows:
+        # Opening excerpts come from the extracted-text store (one block each)
+        excerpt = None
+        extracted = text_store.open(row.file_hash) if row.file_hash else None
+        if extracted is not None:
+            with extracted:
+                excerpt = extracted.excerpt(EXCERPT_BYTES).strip()
+        yield row, excerpt
+
+
+def _cached_section(key: Tuple, render: Callable[[], Iterable[str]]) -> Iterator[str]:
+    """
+    Serves a section from cache, or streams it while capturing it for the
+    cache. Entries are zlib-compressed (rendered HTML shrinks ~10x);
+    sections over the size cap, or abandoned mid-stream (client went
+    away), are not cached.
+    """
+    cached = _sections.get(key)
+    if cached is not None:
+        inflate = zlib.decompressobj()
+        for offset in range(0, len(cached), STREAM_CHUNK_CHARS):
+            yield inflate.decompress(cached[offset:offset + STREAM_CHUNK_CHARS]).decode("utf-8")
+        yield inflate.flush().decode("utf-8")
+        return
+    deflate, parts, size = zlib.compressobj(), [], 0
+    for chunk in render():
+        yield chunk
+        if parts is not None:
+            size += len(chunk)
+            parts.append(deflate.compress(chunk.encode("utf-8")))
+            if size > DOSSIER_CACHE_MAX_SECTION_CHARS:
+                parts = None
+    if parts is not None:
+        parts.append(deflate.flush())
+        _sections.put(key, b"".join(parts))
+
+
+def _buffered(chunks: Iterable[str], size: int = STREAM_CHUNK_CHARS) -> Iterator[str]:
+    # Template.generate() yields many tiny fragments; send them in larger writes
+    buffer, buffered = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield "".join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def iter_case_report(db: Session, case: models.Case, now: Optional[datetime] = None) -> Iterator[str]:
+    """Renders the dossier of `case` (firm loaded) as a stream of HTML chunks."""
+    now = now or datetime.utcnow()
+    version = case_version(db, case.id)
+
+    def sections():
+        yield from templates.get("dossier/head.html").generate(case=case, now=now)
+        yield from _cached_section(
+            ("evidence", case.id, version),
+            lambda: templates.get("dossier/evidence.html").generate(evidence=iter_evidence(db, case.id)),
+        )
+        yield from _cached_section(
+            ("findings", case.id, version),
+            lambda: templates.get("dossier/findings.html").generate(xai_reports=iter_case_reports(db, case.id, STREAM_BATCH_ROWS)),
+        )
+        yield from templates.get("dossier/foot.html").generate(case=case, now=now)
+
+    return _buffered(sections())
+
+
+def stream_case_report(case_id: str) -> Iterator[str]:
+    """
+    Dossier stream backed by its own session, which stays open exactly as
+    long as the stream is consumed (suits StreamingResponse and workers).
+    """
+    with SessionLocal() as db:
+        case = db.query(models.Case).options(joinedload(models.Case.firm)).filter(models.Case.id == case_id).first()
+        if case is None:
+            return
+        yield from iter_case_report(db, case)
+
+
+def generate_case_report(case_id: str) -> str:
+    return "".join(stream_case_report(case_id))
+
+
+# PDF column widths (points) for Title, Type, Hash, Status; they sum to the text width
+PDF_EVIDENCE_COLUMNS = (205, 80, 100, 110)
+
+
+def write_case_pdf(db: Session, case: models.Case, out: BinaryIO, version: str) -> int:
+    """
+    Writes the dossier of `case` (firm loaded) as a PDF to `out`. Returns the page count.
+
+    Unlike the HTML export, the PDF carries no generation time: it is cached
+    by content (app.exports.pdf), so every download of the same contents is
+    the same file. Its integrity ID is derived from `version`, the dossier's
+    content hash.
+    """
+    doc = pdf.PdfDocument(out, footer=f"Veritas dossier {case.case_number} - Integrity ID {case.id[:8]}-{version[:12]}")
+    doc.paragraph("Veritas Legal Intelligence - Case Dossier", 16, bold=True)
+    doc.spacer(6)
+    doc.paragraph(f"Case: {case.title} ({case.case_number})")
+    doc.paragraph(f"Firm: {case.firm.name}")
+    doc.paragraph(f"Dossier version: {version[:16]}")
+    doc.paragraph(f"Status: {case.status}")
+
+    doc.heading("Case Summary")
+    doc.paragraph(case.description or "")
+
+    doc.heading("Evidence List")
+    doc.row(("Title", "Type", "Hash (SHA-256)", "Status"), PDF_EVIDENCE_COLUMNS, bold=True)
+    for item, excerpt in iter_evidence(db, case.id):
+        doc.row((item.title or "", item.type or "", f"{(item.file_hash or '')[:16]}...", item.status or ""), PDF_EVIDENCE_COLUMNS)
+        if excerpt:
+            doc.paragraph(excerpt, 7, indent=10, gray=0.35)
 
-def generate_case_report(case: models.Case) -> str:
-    template = Template(REPORT_TEMPLATE)
-    
-    # Extract XAI reports from case metadata
-    metadata = case.metadata_fields or {}
-    xai_reports = metadata.get("xai_reports", [])
-    
-    return template.render(
-        case=case,
-        xai_reports=xai_reports,
-        now=datetime.utcnow()
-    )
+    doc.heading("AI Findings (XAI)")
+    found = False
+    for report in iter_case_reports(db, case.id, STREAM_BATCH_ROWS):
+        found = True
+        doc.paragraph(f"Subject: {report.get('summary', '')}", 10, bold=True)
+        for claim in report.get("claims") or []:
+            confidence = round((claim.get("confidence") or 0) * 100, 1)
+            doc.paragraph(f"- Claim: {claim.get('finding', '')} (Confidence: {confidence}%)", 9, indent=10)
+        for flag in report.get("risk_flags") or []:
+            doc.paragraph(f"! {flag.get('message', '')} [{flag.get('severity', '')}]", 9, indent=10)
+        doc.spacer(6)
+    if not found:
+        doc.paragraph("No AI analysis findings available for this dossier.")
+    return doc.close()
@@ -37,4 +37,8 @@ def get_db():
     return firestore.client()
 
 def get_bucket():
-    return storage.bucket()
+    """Returns the default bucket, or None when Firebase is not initialized."""
+    try:
+        return storage.bucket()
+    except ValueError:
+        return None
@@ -1,61 +1,163 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional, Literal
+from datetime import datetime
 from app.core import models, database, security
 from . import legacy_schemas as additional_schemas
+from .projection import Projection, json_page
+from .pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.audit.router import query_audit_logs
+from app.search import service as search_service
+from app.scheduling import service as scheduling, schemas as scheduling_schemas
 
 router = APIRouter()
 
+TASK_PROJECTION = Projection(
+    models.Task, additional_schemas.Task, summary=["id", "title", "status", "due_date", "case_id"]
+)
+EVENT_PROJECTION = Projection(
+    models.Event, additional_schemas.Event, summary=["id", "title", "start_time", "end_time", "case_id"]
+)
+INVOICE_PROJECTION = Projection(
+    models.Invoice, additional_schemas.Invoice, summary=["id", "case_id", "total_amount", "status", "due_date"]
+)
+
+def _page(db: Session, projection: Projection, conditions: list, order: list, cursor: Optional[str],
+          limit: int, descending: bool, names: Optional[List[str]], options: tuple = ()):
+    """
+    Keyset page over `projection.model` (see app.core.pagination). Full pages
+    are ORM objects for the response model; projected pages select only the
+    requested columns plus the sort keys the cursor is built from.
+    """
+    if names is None:
+        query = db.query(projection.model).options(*options).filter(*conditions)
+        items, next_cursor = paginate(query, order, cursor, limit, descending)
+        return {"items": items, "next_cursor": next_cursor}
+    keys = [column.key for column in order if column.key not in names]
+    query = db.query(*projection.entities([*names, *keys])).filter(*conditions)
+    rows, next_cursor = paginate(query, order, cursor, limit, descending)
+    return json_page(names, rows, next_cursor)
+
 # Tasks
 @router.post("/tasks", response_model=additional_schemas.Task, tags=["tasks"])
 def create_task(
     task: additional_schemas.TaskCreate, 
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    current_user: security.Principal = Depends(security.get_current_user)
 ):
     db_task = models.Task(**task.model_dump(), firm_id=current_user.firm_id)
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    db.flush()
     
     security.log_audit(
         db, current_user.id, current_user.firm_id, "CREATE_TASK", "tasks", db_task.id, {"title": db_task.title}
     )
+    db.commit()
+    db.refresh(db_task)
     return db_task
 
-@router.get("/tasks", response_model=List[additional_schemas.Task], tags=["tasks"])
+@router.get("/tasks", response_model=additional_schemas.TaskPage, tags=["tasks"])
 def list_tasks(
+    status: Optional[str] = None,
+    case_id: Optional[str] = None,
+    assigned_to: Optional[str] = None,
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    current_user: security.Principal = Depends(security.get_current_user)
 ):
-    return db.query(models.Task).filter(models.Task.firm_id == current_user.firm_id).all()
+    """
+    Newest-first tasks, keyset-paginated on (created_at, id). Filters are
+    served by the (firm_id, status|assigned_to, due_date) and
+    (firm_id, case_id, created_at) indexes.
+    """
+    conditions = [models.Task.firm_id == current_user.firm_id]
+    if status:
+        conditions.append(models.Task.status == status)
+    if case_id:
+        conditions.append(models.Task.case_id == case_id)
+    if assigned_to:
+        conditions.append(models.Task.assigned_to == assigned_to)
+    if due_after:
+        conditions.append(models.Task.due_date >= due_after)
+    if due_before:
+        conditions.append(models.Task.due_date < due_before)
+    return _page(
+        db, TASK_PROJECTION, conditions, [models.Task.created_at, models.Task.id], cursor, limit,
+        descending=True, names=TASK_PROJECTION.resolve(fields, view)
+    )
 
 # Calendar
 @router.post("/events", response_model=additional_schemas.Event, tags=["calendar"])
 def create_event(
     event: additional_schemas.EventCreate, 
+    allow_conflicts: bool = False,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    current_user: security.Principal = Depends(security.get_current_user)
 ):
+    """
+    Schedules an event. Booking a lawyer who already has an overlapping
+    event (on any case) is rejected with 409 unless allow_conflicts is set.
+    """
+    if event.assigned_to and not allow_conflicts:
+        scheduling.lock_assignee(db, current_user.firm_id, event.assigned_to)
+        conflicts = scheduling.find_conflicts(
+            db, current_user.firm_id, event.assigned_to, event.start_time, event.end_time
+        )
+        if conflicts:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={
+                    "message": "Assignee is already booked during this period",
+                    "conflicts": [
+                        scheduling_schemas.EventSlot.model_validate(c).model_dump(mode="json") for c in conflicts
+                    ],
+                }
+            )
     db_event = models.Event(**event.model_dump(), firm_id=current_user.firm_id)
     db.add(db_event)
     db.commit()
     db.refresh(db_event)
     return db_event
 
-@router.get("/events", response_model=List[additional_schemas.Event], tags=["calendar"])
+@router.get("/events", response_model=additional_schemas.EventPage, tags=["calendar"])
 def list_events(
+    case_id: Optional[str] = None,
+    start_after: Optional[datetime] = None,
+    start_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    current_user: security.Principal = Depends(security.get_current_user)
 ):
-    return db.query(models.Event).filter(models.Event.firm_id == current_user.firm_id).all()
+    """
+    Chronological events, keyset-paginated on (start_time, id) over the
+    (firm_id, start_time, id) index.
+    """
+    conditions = [models.Event.firm_id == current_user.firm_id]
+    if case_id:
+        conditions.append(models.Event.case_id == case_id)
+    if start_after:
+        conditions.append(models.Event.start_time >= start_after)
+    if start_before:
+        conditions.append(models.Event.start_time < start_before)
+    return _page(
+        db, EVENT_PROJECTION, conditions, [models.Event.start_time, models.Event.id], cursor, limit,
+        descending=False, names=EVENT_PROJECTION.resolve(fields, view)
+    )
 
 # Billing
 @router.post("/invoices", response_model=additional_schemas.Invoice, tags=["billing"])
 def create_invoice(
     invoice: additional_schemas.InvoiceCreate, 
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    current_user: security.Principal = Depends(security.get_current_user)
 ):
     db_invoice = models.Invoice(
         case_id=invoice.case_id,
@@ -65,101 +167,77 @@ def create_invoice(
         firm_id=current_user.firm_id
     )
     db.add(db_invoice)
-    db.commit()
-    db.refresh(db_invoice)
+    db.flush()
     
     for item in invoice.items:
         db_item = models.InvoiceItem(**item.model_dump(), invoice_id=db_invoice.id)
         db.add(db_item)
-    
-    db.commit()
-    db.refresh(db_invoice)
 
     security.log_audit(
         db, current_user.id, current_user.firm_id, "CREATE_INVOICE", "invoices", db_invoice.id, {"total": db_invoice.total_amount}
     )
+    db.commit()
+    db.refresh(db_invoice)
     return db_invoice
 
-@router.get("/invoices", response_model=List[additional_schemas.Invoice], tags=["billing"])
+@router.get("/invoices", response_model=additional_schemas.InvoicePage, tags=["billing"])
 def list_invoices(
+    status: Optional[str] = None,
+    case_id: Optional[str] = None,
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    current_user: security.Principal = Depends(security.get_current_user)
 ):
-    return db.query(models.Invoice).filter(models.Invoice.firm_id == current_user.firm_id).all()
+    """
+    Newest-first invoices, keyset-paginated on (created_at, id). Projections
+    omit line items; full pages load them with one IN query.
+    """
+    conditions = [models.Invoice.firm_id == current_user.firm_id]
+    if status:
+        conditions.append(models.Invoice.status == status)
+    if case_id:
+        conditions.append(models.Invoice.case_id == case_id)
+    if due_after:
+        conditions.append(models.Invoice.due_date >= due_after)
+    if due_before:
+        conditions.append(models.Invoice.due_date < due_before)
+    return _page(
+        db, INVOICE_PROJECTION, conditions, [models.Invoice.created_at, models.Invoice.id], cursor, limit,
+        descending=True, names=INVOICE_PROJECTION.resolve(fields, view),
+        options=(selectinload(models.Invoice.items),)
+    )
 
-# Global Search with Relevance Foundation
-@router.get("/search", response_model=List[additional_schemas.SearchResult], tags=["search"])
+# Global Search (full-text index, see app.search)
+@router.get("/search", response_model=additional_schemas.SearchPage, tags=["search"])
 def search(
     query: str = Query(...), 
+    limit: int = Query(search_service.DEFAULT_LIMIT, ge=1, le=search_service.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    type: Optional[str] = Query(None, description="Restrict to Case, Task or Evidence"),
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    current_user: security.Principal = Depends(security.get_current_user)
 ):
     """
-    Enterprise search with foundation for semantic ranking.
-    In a production env, this would use pgvector or Elasticsearch.
+    Enterprise search across cases, tasks and evidence.
+    Top-k ranking runs in the database against the firm-isolated full-text
+    index; follow `next_cursor` for further pages. `facets` (first page only)
+    counts matches per type without fetching them.
     """
-    results = []
-    fid = current_user.firm_id
-    query_l = query.lower()
-    
-    # helper for ranking
-    def calculate_relevance(text: str, q: str) -> float:
-        if not text: return 0.0
-        text = text.lower()
-        if q in text: return 0.95
-        return 0.5 if any(word in text for word in q.split()) else 0.1
-
-    # Search Cases (Isolated)
-    cases = db.query(models.Case).filter(
-        models.Case.firm_id == fid,
-        (models.Case.title.ilike(f"%{query}%")) | (models.Case.case_number.ilike(f"%{query}%"))
-    ).all()
-    for c in cases:
-        results.append({
-            "type": "Case",
-            "id": c.id,
-            "title": c.title,
-            "description": f"No: {c.case_number} | Status: {c.status}",
-            "relevance": calculate_relevance(c.title + c.case_number, query_l)
-        })
-    
-    # Search Tasks (Isolated)
-    tasks = db.query(models.Task).filter(
-        models.Task.firm_id == fid,
-        models.Task.title.ilike(f"%{query}%")
-    ).all()
-    for t in tasks:
-        results.append({
-            "type": "Task",
-            "id": t.id,
-            "title": t.title,
-            "description": f"Due: {t.due_date.strftime('%Y-%m-%d') if t.due_date else 'N/A'}",
-            "relevance": calculate_relevance(t.title, query_l)
-        })
-        
-    # Search Evidence (Isolated)
-    evidences = db.query(models.Evidence).filter(
-        models.Evidence.firm_id == fid,
-        models.Evidence.title.ilike(f"%{query}%")
-    ).all()
-    for e in evidences:
-        results.append({
-            "type": "Evidence",
-            "id": e.id,
-            "title": e.title,
-            "description": f"Type: {e.type} | Status: {e.status}",
-            "relevance": calculate_relevance(e.title, query_l)
-        })
-    
-    # Sort by relevance (Semantic foundation)
-    results.sort(key=lambda x: x["relevance"], reverse=True)
-    return results
+    return search_service.search(db, current_user.firm_id, query, limit, cursor, type)
 
 @router.get("/audit", tags=["audit"])
 def get_audit_logs(
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    current_user: security.Principal = Depends(security.get_current_user)
 ):
-    return db.query(models.SystemAudit).filter(
-        models.SystemAudit.firm_id == current_user.firm_id
-    ).order_by(models.SystemAudit.timestamp.desc()).limit(100).all()
+    """
+    Latest 100 entries. Kept for compatibility; use /audit/logs for filters and paging.
+    """
+    return query_audit_logs(db, current_user.firm_id).order_by(
+        models.SystemAudit.timestamp.desc(), models.SystemAudit.id.desc()
+    ).limit(100).all()
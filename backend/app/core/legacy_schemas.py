@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, model_validator
+from typing import List, Optional, Dict
 from datetime import datetime
 
 # Tasks
@@ -21,6 +21,10 @@ class Task(TaskBase):
     class Config:
         from_attributes = True
 
+class TaskPage(BaseModel):
+    items: List[Task]
+    next_cursor: Optional[str] = None
+
 # Events
 class EventBase(BaseModel):
     title: str
@@ -29,9 +33,14 @@ class EventBase(BaseModel):
     end_time: datetime
     location: Optional[str] = None
     case_id: str
+    assigned_to: Optional[str] = None
 
 class EventCreate(EventBase):
-    pass
+    @model_validator(mode="after")
+    def check_period(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        return self
 
 class Event(EventBase):
     id: str
@@ -40,6 +49,10 @@ class Event(EventBase):
     class Config:
         from_attributes = True
 
+class EventPage(BaseModel):
+    items: List[Event]
+    next_cursor: Optional[str] = None
+
 # Invoices
 class InvoiceItemBase(BaseModel):
     description: str
@@ -72,6 +85,10 @@ class Invoice(InvoiceBase):
     class Config:
         from_attributes = True
 
+class InvoicePage(BaseModel):
+    items: List[Invoice]
+    next_cursor: Optional[str] = None
+
 # Search
 class SearchResult(BaseModel):
     type: str # Case, Task, Evidence
@@ -79,3 +96,8 @@ class SearchResult(BaseModel):
     title: str
     description: Optional[str] = None
     relevance: Optional[float] = 0.0
+
+class SearchPage(BaseModel):
+    items: List[SearchResult]
+    next_cursor: Optional[str] = None
+    facets: Dict[str, int] = {} # Match count per type (first page only)
@@ -0,0 +1,121 @@
+"""
+Tables materialized from ORM entities.
+
+A `MaterializedTable` holds one row per entity, keyed by (entity_type,
+entity_id), and is kept current by ORM write hooks in the same transaction
+as the entity itself: inserts and updates upsert the entity's row, deletes
+remove it. `rebuild()` re-projects existing data, and `main()` is the
+`--rebuild` command line of the module that owns the table.
+
+Used by app.search.index (search documents) and app.cases.timeline (case
+timelines); app.dashboard.rollups shares `upsert_statement`.
+"""
+import argparse
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from sqlalchemy import Table, event, delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.core.database import Base, SessionLocal
+
+UPSERT_DIALECTS = ("postgresql", "sqlite")
+
+
+def upsert_statement(dialect: str, table: Table, rows, index_elements: Iterable[str], set_: Callable):
+    """
+    INSERT ... ON CONFLICT (index_elements) DO UPDATE SET set_(excluded) on
+    PostgreSQL and SQLite; None on other dialects, which need a fallback.
+    """
+    if dialect not in UPSERT_DIALECTS:
+        return None
+    insert = pg_insert if dialect == "postgresql" else sqlite_insert
+    stmt = insert(table).values(rows)
+    return stmt.on_conflict_do_update(index_elements=list(index_elements), set_=set_(stmt.excluded))
+
+
+class MaterializedTable:
+    """
+    `entities` maps each model to (entity_type, project), where project(entity)
+    returns the row's own columns. Rows also get entity_type, entity_id and
+    firm_id ("" when unset); `prepare` may rewrite a row or return None to
+    keep the entity out of the table.
+    """
+
+    def __init__(self, table: Table, entities: Dict[type, Tuple[str, Callable]], updated_columns: Iterable[str],
+                 prepare: Optional[Callable[[dict], Optional[dict]]] = None):
+        self.table = table
+        self.entities = entities
+        self.updated_columns = tuple(updated_columns)
+        self.prepare = prepare
+
+    def row_for(self, entity) -> Optional[dict]:
+        entity_type, project = self.entities[type(entity)]
+        row = {"entity_type": entity_type, "entity_id": entity.id, "firm_id": entity.firm_id or "", **project(entity)}
+        return self.prepare(row) if self.prepare else row
+
+    def _upsert(self, dialect: str, rows: list):
+        return upsert_statement(dialect, self.table, rows, ("entity_type", "entity_id"),
+                                lambda excluded: {c: excluded[c] for c in self.updated_columns})
+
+    def remove(self, connection, entity_type: str, entity_id: str):
+        connection.execute(delete(self.table).where(
+            self.table.c.entity_type == entity_type,
+            self.table.c.entity_id == entity_id,
+        ))
+
+    def record(self, connection, entity):
+        """Writes (or removes) the entity's row on `connection`."""
+        row = self.row_for(entity)
+        if row is None:
+            self.remove(connection, self.entities[type(entity)][0], entity.id)
+            return
+        statement = self._upsert(connection.dialect.name, [row])
+        if statement is None:
+            self.remove(connection, row["entity_type"], entity.id)
+            statement = self.table.insert().values(**row)
+        connection.execute(statement)
+
+    def _on_write(self, mapper, connection, target):
+        self.record(connection, target)
+
+    def _on_delete(self, mapper, connection, target):
+        self.remove(connection, self.entities[type(target)][0], target.id)
+
+    def listen(self) -> "MaterializedTable":
+        """Registers the write hooks (at import time of the owning module)."""
+        for model in self.entities:
+            event.listen(model, "after_insert", self._on_write)
+            event.listen(model, "after_update", self._on_write)
+            event.listen(model, "after_delete", self._on_delete)
+        return self
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """Re-projects every entity (e.g. after deploying on existing data). Returns rows written."""
+        total = 0
+        with SessionLocal() as db:
+            connection = db.connection()
+            dialect = connection.dialect.name
+            for model in self.entities:
+                for partition in db.execute(
+                    select(model).execution_options(yield_per=batch_size)
+                ).scalars().partitions():
+                    rows = [row for row in map(self.row_for, partition) if row is not None]
+                    statement = self._upsert(dialect, rows) if rows else None
+                    if statement is not None:
+                        connection.execute(statement)
+                    elif rows:
+                        for entity in partition:
+                            self.record(connection, entity)
+                    total += len(rows)
+                    for entity in partition:  # expunge_all() would invalidate the streaming result
+                        db.expunge(entity)
+            db.commit()
+        return total
+
+    def main(self, description: str, rebuild_help: str, done: str):
+        """`--rebuild` command line; `done` is formatted with the row count."""
+        parser = argparse.ArgumentParser(description=description)
+        parser.add_argument("--rebuild", action="store_true", help=rebuild_help)
+        args = parser.parse_args()
+        if args.rebuild:
+            Base.metadata.create_all(bind=SessionLocal().get_bind(), tables=[self.table])
+            print(done.format(self.rebuild()))
@@ -0,0 +1,140 @@
+"""
+Data migrations that create_all()/ensure_indexes() cannot express.
+
+normalize_json_history moves the two append-only JSON arrays into tables:
+
+* Evidence.audit_chain entries         -> evidence_custody_events
+* Case.metadata_fields["xai_reports"]  -> case_xai_reports
+
+Rows are processed in id order, batch by batch; each batch inserts the new
+rows and clears the source arrays in one transaction, so an interrupted run
+can simply be restarted and a finished one is a no-op.
+
+CLI:
+    python -m app.core.migrations normalize-json-history --batch-size 500
+"""
+import argparse
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import null, select, update
+from sqlalchemy.orm import Session
+from app.core import models
+from app.core.database import SessionLocal
+
+BATCH_SIZE = 500
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def custody_rows(evidence: models.Evidence) -> List[Dict]:
+    """Custody event rows for one exhibit's legacy audit_chain."""
+    rows = []
+    for entry in evidence.audit_chain or []:
+        entry = dict(entry)
+        rows.append(dict(
+            id=models.generate_uuid(),
+            evidence_id=evidence.id,
+            firm_id=evidence.firm_id,
+            action=entry.pop("action", None) or "Unknown",
+            actor=entry.pop("user", None),
+            occurred_at=_parse_timestamp(entry.pop("timestamp", None)) or evidence.created_at,
+            details=entry or None,
+        ))
+    return rows
+
+
+def report_rows(case: models.Case, known_evidence: set) -> List[Dict]:
+    """Report rows for one case's legacy metadata_fields["xai_reports"]."""
+    # The array carries no timestamps: keep its order with microsecond steps
+    base = case.registered_at or models.utcnow()
+    rows = []
+    for i, report in enumerate(case.metadata_fields.get("xai_reports") or []):
+        citation = next((c.get("citation") for c in report.get("claims") or []), None)
+        rows.append(dict(
+            id=models.generate_uuid(),
+            case_id=case.id,
+            evidence_id=citation if citation in known_evidence else None,
+            firm_id=case.firm_id,
+            report=report,
+            created_at=base + timedelta(microseconds=i),
+        ))
+    return rows
+
+
+def _migrate_custody_batch(db: Session, after: str, batch_size: int) -> Optional[str]:
+    Evidence = models.Evidence
+    batch = db.query(Evidence).filter(
+        Evidence.audit_chain.isnot(None), Evidence.id > after
+    ).order_by(Evidence.id).limit(batch_size).all()
+    if not batch:
+        return None
+    rows = [row for evidence in batch for row in custody_rows(evidence)]
+    if rows:
+        db.execute(models.EvidenceCustodyEvent.__table__.insert(), rows)
+    db.execute(
+        update(Evidence).where(Evidence.id.in_([e.id for e in batch])).values(audit_chain=null())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return batch[-1].id
+
+
+def _migrate_report_batch(db: Session, after: str, batch_size: int) -> Optional[str]:
+    Case = models.Case
+    batch = db.query(Case).filter(
+        Case.metadata_fields.isnot(None), Case.id > after
+    ).order_by(Case.id).limit(batch_size).all()
+    if not batch:
+        return None
+    pending = [case for case in batch if isinstance(case.metadata_fields, dict) and "xai_reports" in case.metadata_fields]
+    if pending:
+        citations = {
+            claim.get("citation")
+            for case in pending for report in case.metadata_fields["xai_reports"] or []
+            for claim in report.get("claims") or []
+        }
+        known = set(db.scalars(select(models.Evidence.id).where(models.Evidence.id.in_(citations - {None}))))
+        rows = [row for case in pending for row in report_rows(case, known)]
+        if rows:
+            db.execute(models.CaseXaiReport.__table__.insert(), rows)
+        for case in pending:
+            case.metadata_fields = {k: v for k, v in case.metadata_fields.items() if k != "xai_reports"}
+    db.commit()
+    return batch[-1].id
+
+
+def normalize_json_history(batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """Runs both moves to completion. Returns the number of rows inserted per table."""
+    counts = {}
+    for table, model, step in (
+        ("evidence_custody_events", models.EvidenceCustodyEvent, _migrate_custody_batch),
+        ("case_xai_reports", models.CaseXaiReport, _migrate_report_batch),
+    ):
+        with SessionLocal() as db:
+            before = db.query(model).count()
+            after = ""
+            while (after := step(db, after, batch_size)) is not None:
+                pass
+            counts[table] = db.query(model).count() - before
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Veritas data migrations")
+    parser.add_argument("migration", choices=["normalize-json-history"])
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    if args.migration == "normalize-json-history":
+        print(json.dumps(normalize_json_history(args.batch_size)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON, DateTime, Table
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON, DateTime, Table, Index, UniqueConstraint, false
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 import uuid
+from datetime import datetime, UTC
 
 def generate_uuid():
     return str(uuid.uuid4())
 
+def utcnow():
+    return datetime.now(UTC)
+
 # Association table for User-Case relationships if needed
 # (Assuming simple RBAC for now)
 
@@ -50,9 +54,9 @@ class Case(Base):
     judge = Column(String)
     status = Column(String, default="Open") # Open, Closed, Pending, Appealed
     case_types = Column(JSON) # Multiple types supported
-    metadata_fields = Column(JSON) # Flexible metadata
+    metadata_fields = Column(JSON) # Flexible metadata (XAI reports live in case_xai_reports)
     firm_id = Column(String, ForeignKey("firms.id"))
-    registered_at = Column(DateTime(timezone=True), server_default=func.now())
+    registered_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
     
     firm = relationship("Firm")
     evidence = relationship("Evidence", back_populates="case")
@@ -72,14 +76,72 @@ class Evidence(Base):
     file_hash = Column(String)
     storage_path = Column(String)
     status = Column(String, default="Pending") # Pending, Accepted, Rejected
-    audit_chain = Column(JSON) # Chain of custody logs
+    audit_chain = Column(JSON) # Legacy custody log; entries now live in evidence_custody_events
     
     previous_hash = Column(String) # Link to previous evidence for chaining
+    chain_seq = Column(Integer) # Position in the case's custody chain (see EvidenceChainHead)
     firm_id = Column(String, ForeignKey("firms.id"), index=True) # Direct isolation
     
     case = relationship("Case", back_populates="evidence")
     firm = relationship("Firm")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=utcnow) # Part of the dossier cache version
+
+    __table_args__ = (
+        # Chain-of-custody walks and "previous evidence" lookups per case
+        Index("ix_evidence_case_created_at", "case_id", "created_at"),
+        Index("ix_evidence_case_chain_seq", "case_id", "chain_seq", unique=True),
+    )
+
+class EvidenceChainHead(Base):
+    """
+    Tip of each case's evidence chain. Appends swap this single row instead of
+    scanning for the latest exhibit, so they are O(1) and serialized per case.
+    """
+    __tablename__ = "evidence_chain_heads"
+
+    case_id = Column(String, ForeignKey("cases.id"), primary_key=True)
+    seq = Column(Integer, default=0)
+    head_hash = Column(String)
+    head_evidence_id = Column(String)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class EvidenceCustodyEvent(Base):
+    """
+    One chain-of-custody entry for an exhibit. Appending is a single INSERT,
+    where the old JSON audit_chain rewrote the exhibit's whole history.
+    """
+    __tablename__ = "evidence_custody_events"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    evidence_id = Column(String, ForeignKey("evidence.id"), nullable=False)
+    firm_id = Column(String, ForeignKey("firms.id"))
+    action = Column(String) # Uploaded, XAI_REPORT_GENERATED, ...
+    actor = Column(String) # User email or system identity
+    occurred_at = Column(DateTime(timezone=True), default=utcnow)
+    details = Column(JSON) # Remaining entry fields (hash, previous_hash, report_id, ...)
+
+    __table_args__ = (
+        Index("ix_custody_events_evidence_time", "evidence_id", "occurred_at", "id"),
+    )
+
+class CaseXaiReport(Base):
+    """
+    One XAI analysis report, formerly appended to Case.metadata_fields["xai_reports"].
+    """
+    __tablename__ = "case_xai_reports"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    case_id = Column(String, ForeignKey("cases.id"), nullable=False)
+    evidence_id = Column(String, ForeignKey("evidence.id"))
+    job_id = Column(String)
+    firm_id = Column(String, ForeignKey("firms.id"))
+    report = Column(JSON) # analysis.schemas.AnalysisResult
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_case_xai_reports_case_created", "case_id", "created_at", "id"),
+    )
 
 class SystemAudit(Base):
     __tablename__ = "system_audits"
@@ -93,6 +155,28 @@ class SystemAudit(Base):
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     details = Column(JSON) # Contextual info
     row_hash = Column(String) # SHA-256 of the entry for integrity
+    prev_hash = Column(String) # row_hash of the firm's previous entry (hash chain)
+    seq = Column(Integer) # Position in the firm's audit chain
+
+    __table_args__ = (
+        Index("ix_system_audits_firm_seq", "firm_id", "seq", unique=True),
+        # Keyset pagination on (timestamp, id) per filter (app.audit.router)
+        Index("ix_system_audits_firm_ts", "firm_id", "timestamp", "id"),
+        Index("ix_system_audits_firm_action_ts", "firm_id", "action", "timestamp", "id"),
+        Index("ix_system_audits_firm_table_record_ts", "firm_id", "table_name", "record_id", "timestamp", "id"),
+        Index("ix_system_audits_firm_user_ts", "firm_id", "user_id", "timestamp", "id"),
+    )
+
+class AuditChainHead(Base):
+    """
+    Tip of each firm's audit hash chain, so appends never re-read old rows.
+    """
+    __tablename__ = "audit_chain_heads"
+
+    firm_id = Column(String, primary_key=True)
+    seq = Column(Integer, default=0)
+    last_hash = Column(String)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -109,7 +193,16 @@ class Task(Base):
     case = relationship("Case", back_populates="tasks")
     assignee = relationship("User")
     firm = relationship("Firm")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Python-side default keeps keyset cursors precise (sub-second) on every dialect
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+
+    __table_args__ = (
+        # Keyset pagination and filters of GET /tasks
+        Index("ix_tasks_firm_created", "firm_id", "created_at", "id"),
+        Index("ix_tasks_firm_status_due", "firm_id", "status", "due_date"),
+        Index("ix_tasks_firm_assignee_due", "firm_id", "assigned_to", "due_date"),
+        Index("ix_tasks_firm_case_created", "firm_id", "case_id", "created_at"),
+    )
 
 class Event(Base):
     __tablename__ = "events"
@@ -121,12 +214,32 @@ class Event(Base):
     end_time = Column(DateTime(timezone=True))
     location = Column(String)
     case_id = Column(String, ForeignKey("cases.id"))
+    assigned_to = Column(String, ForeignKey("users.id")) # Lawyer attending; scope of conflict checks
+    long_running = Column(
+        Boolean, default=False, server_default=false(), nullable=False,
+        info={"backfill": "app.scheduling.service.reflag_long_running"}
+    ) # Longer than scheduling.SHORT_EVENT_SPAN (set on write, backfilled when the column is added)
     firm_id = Column(String, ForeignKey("firms.id"), index=True)
     
     case = relationship("Case", back_populates="events")
+    assignee = relationship("User")
     firm = relationship("Firm")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Keyset pagination and filters of GET /events
+        Index("ix_events_firm_start", "firm_id", "start_time", "id"),
+        Index("ix_events_firm_case_start", "firm_id", "case_id", "start_time"),
+        # Range/overlap queries (app.scheduling): bounded start_time scans elsewhere,
+        # a GiST index over the [start, end) range on PostgreSQL (needs btree_gist)
+        Index("ix_events_firm_assignee_start", "firm_id", "assigned_to", "long_running", "start_time"),
+        Index("ix_events_firm_long_start", "firm_id", "long_running", "start_time"),
+        Index(
+            "ix_events_firm_period", "firm_id", func.tstzrange(start_time, end_time, "[)"),
+            postgresql_using="gist",
+        ).ddl_if(dialect="postgresql"),
+    )
+
 class Invoice(Base):
     __tablename__ = "invoices"
 
@@ -140,7 +253,14 @@ class Invoice(Base):
     case = relationship("Case", back_populates="invoices")
     items = relationship("InvoiceItem", back_populates="invoice")
     firm = relationship("Firm")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+
+    __table_args__ = (
+        # Keyset pagination and filters of GET /invoices
+        Index("ix_invoices_firm_created", "firm_id", "created_at", "id"),
+        Index("ix_invoices_firm_status_due", "firm_id", "status", "due_date"),
+        Index("ix_invoices_firm_case_created", "firm_id", "case_id", "created_at"),
+    )
 
 class InvoiceItem(Base):
     __tablename__ = "invoice_items"
@@ -152,12 +272,52 @@ class InvoiceItem(Base):
     
     invoice = relationship("Invoice", back_populates="items")
 
+class ExportJob(Base):
+    """
+    Bulk dossier export (see app.exports.service): rendered dossiers,
+    evidence files and a SHA-256 manifest packed into one archive.
+    """
+    __tablename__ = "export_jobs"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    firm_id = Column(String, ForeignKey("firms.id"), index=True)
+    created_by = Column(String, ForeignKey("users.id"))
+    case_ids = Column(JSON)
+    include_evidence = Column(Boolean, default=True)
+    format = Column(String, default="html", server_default="html") # Dossier format: html, pdf
+    status = Column(String, default="Pending") # Pending, Running, Completed, Failed
+    locked_by = Column(String) # Process building the archive (lease holder)
+    locked_until = Column(DateTime(timezone=True)) # Lease expiry; an expired Running job is rebuilt
+    total_cases = Column(Integer, default=0)
+    completed_cases = Column(Integer, default=0)
+    files_written = Column(Integer, default=0)
+    bytes_written = Column(Integer, default=0) # Uncompressed
+    archive_path = Column(String)
+    archive_size = Column(Integer)
+    last_error = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+class AnalysisBatch(Base):
+    __tablename__ = "analysis_batches"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    firm_id = Column(String, ForeignKey("firms.id"), index=True)
+    case_id = Column(String, ForeignKey("cases.id")) # Set for whole-case analysis
+    created_by = Column(String, ForeignKey("users.id"))
+    total_jobs = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    jobs = relationship("AnalysisJob", back_populates="batch")
+
 class AnalysisJob(Base):
     __tablename__ = "analysis_jobs"
 
     id = Column(String, primary_key=True, default=generate_uuid)
     evidence_id = Column(String, ForeignKey("evidence.id"))
     firm_id = Column(String, ForeignKey("firms.id"), index=True)
+    batch_id = Column(String, ForeignKey("analysis_batches.id"), index=True)
     status = Column(String, default="Pending") # Pending, Processing, Completed, Failed
     result = Column(JSON) # Structured XAI findings (schemas.AnalysisResult)
     reasoning_path = Column(JSON) # Step-wise AI logic
@@ -167,5 +327,40 @@ class AnalysisJob(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Durable queue bookkeeping (see app.analysis.queue)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    available_at = Column(DateTime(timezone=True), server_default=func.now()) # Earliest time a worker may claim it
+    locked_by = Column(String) # Worker holding the lease
+    locked_until = Column(DateTime(timezone=True)) # Visibility timeout
+    last_error = Column(String)
+    cache_hit = Column(Boolean, default=False) # Result served from AnalysisCacheEntry
+
     evidence = relationship("Evidence")
     firm = relationship("Firm")
+    batch = relationship("AnalysisBatch", back_populates="jobs")
+
+    __table_args__ = (
+        Index("ix_analysis_jobs_status_available_at", "status", "available_at"),
+    )
+
+class AnalysisCacheEntry(Base):
+    """
+    Content-addressed analysis output, keyed by (file_hash, model, prompt_version).
+    Stores only content-derived findings: no evidence ids, titles or firm data,
+    so entries can be shared across cases and firms.
+    """
+    __tablename__ = "analysis_cache"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    file_hash = Column(String, nullable=False)
+    model_name = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False)
+    findings = Column(JSON) # [{"finding", "confidence"}]
+    reasoning_path = Column(JSON)
+    tokens_used = Column(Integer)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("file_hash", "model_name", "prompt_version", name="uq_analysis_cache_key"),
+    )
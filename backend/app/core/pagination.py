@@ -0,0 +1,54 @@
+"""
+Keyset (seek) pagination helpers.
+
+Cursors are opaque, URL-safe encodings of the sort key of the last row on
+the previous page. Pages are fetched with a row-value comparison
+`(k1, k2) < (:k1, :k2)` that the matching composite index can seek to
+directly. Unlike OFFSET, cost does not grow with page depth.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values: Sequence) -> str:
+    encoded = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(encoded, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in values]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def paginate(query, columns: Sequence, cursor: Optional[str], limit: int, descending: bool = False) -> Tuple[List, Optional[str]]:
+    """
+    Orders `query` by `columns`, seeks past `cursor` and returns (rows,
+    next_cursor). next_cursor is None on the last page. `query` must be an
+    ORM Query (db.query(...) of entities, columns or a Table), which runs
+    when iterated; a Core select() does not.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        key, bound = tuple_(*columns), tuple_(*values)
+        query = query.filter(key < bound if descending else key > bound)
+
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+    rows = list(query.limit(limit + 1))
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, c.key) for c in columns])
@@ -0,0 +1,187 @@
+"""
+Minimal streaming PDF writer (stdlib only).
+
+Produces PDF 1.4 documents with the standard Helvetica fonts, so nothing
+is embedded and no third-party renderer is needed. Pages are laid out top
+to bottom by `PdfDocument` and written to the output file as soon as they
+are full (FlateDecode content streams); only the page object numbers are
+kept until the document is closed, so memory stays flat however many
+pages a dossier runs to.
+
+Text is encoded as WinAnsi (Latin-1); characters outside it print as "?".
+"""
+import zlib
+from typing import BinaryIO, List, Optional, Sequence
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4, points
+MARGIN = 50
+COMPRESSION_LEVEL = 6
+
+# Helvetica advance widths (1/1000 em) for ASCII 32..126, from the AFM metrics
+_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_BOLD_FACTOR = 1.1  # Helvetica-Bold runs wider; overestimating only wraps a little early
+FONTS = {"regular": b"F1", "bold": b"F2"}
+
+
+def text_width(text: str, size: float, bold: bool = False) -> float:
+    units = sum(_WIDTHS[ord(c) - 32] if 32 <= ord(c) <= 126 else 556 for c in text)
+    return units * size / 1000 * (_BOLD_FACTOR if bold else 1.0)
+
+
+def wrap(text: str, width: float, size: float, bold: bool = False) -> List[str]:
+    """Greedy word wrap; words longer than a line (hashes, URLs) are split."""
+    lines = []
+    for paragraph in (text or "").splitlines() or [""]:
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if text_width(candidate, size, bold) <= width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            while text_width(word, size, bold) > width:
+                cut = max(1, int(len(word) * width / text_width(word, size, bold)))
+                lines.append(word[:cut])
+                word = word[cut:]
+            line = word
+        lines.append(line)
+    return lines
+
+
+def _literal(text: str) -> bytes:
+    data = text.encode("cp1252", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+class PdfDocument:
+    """
+    Flowing text layout over a PDF file. Callers add headings, paragraphs
+    and table rows; a new page starts whenever the next block doesn't fit.
+    """
+
+    def __init__(self, out: BinaryIO, footer: Optional[str] = None):
+        self.out = out
+        self.footer = footer
+        self.pages = 0
+        self._offset = 0
+        self._offsets = {}
+        self._page_ids: List[int] = []
+        self._next_id = 5  # 1 catalog, 2 page tree, 3-4 fonts
+        self._ops: List[bytes] = []
+        self._y = 0.0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for object_id, font in ((3, b"Helvetica"), (4, b"Helvetica-Bold")):
+            self._object(object_id, b"<< /Type /Font /Subtype /Type1 /BaseFont /" + font
+                         + b" /Encoding /WinAnsiEncoding >>")
+
+    # Low-level output
+
+    def _write(self, data: bytes):
+        self.out.write(data)
+        self._offset += len(data)
+
+    def _object(self, object_id: int, body: bytes):
+        self._offsets[object_id] = self._offset
+        self._write(b"%d 0 obj\n" % object_id + body + b"\nendobj\n")
+
+    def _allocate(self) -> int:
+        self._next_id += 1
+        return self._next_id - 1
+
+    # Pages
+
+    @property
+    def width(self) -> float:
+        return PAGE_WIDTH - 2 * MARGIN
+
+    def _start_page(self):
+        self._ops = []
+        self._y = PAGE_HEIGHT - MARGIN
+        self.pages += 1
+
+    def _finish_page(self):
+        if self.footer:
+            self._text(MARGIN, MARGIN / 2, f"{self.footer} - Page {self.pages}", 7)
+        content = zlib.compress(b"\n".join(self._ops), COMPRESSION_LEVEL)
+        content_id, page_id = self._allocate(), self._allocate()
+        self._object(content_id, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content)
+                     + content + b"\nendstream")
+        self._object(page_id, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                     b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+                     % (PAGE_WIDTH, PAGE_HEIGHT, content_id))
+        self._page_ids.append(page_id)
+        self._ops = []
+
+    def _ensure_space(self, height: float):
+        if self.pages == 0:
+            self._start_page()
+        elif self._y - height < MARGIN:
+            self._finish_page()
+            self._start_page()
+
+    def _text(self, x: float, y: float, text: str, size: float, bold: bool = False, gray: float = 0.0):
+        font = FONTS["bold" if bold else "regular"]
+        self._ops.append(b"BT %.3f g /%s %.1f Tf %.2f %.2f Td %s Tj ET"
+                         % (gray, font, size, x, y, _literal(text)))
+
+    # Blocks
+
+    def spacer(self, height: float):
+        self._ensure_space(height)
+        self._y -= height
+
+    def paragraph(self, text: str, size: float = 10, bold: bool = False, indent: float = 0, gray: float = 0.0):
+        leading = size * 1.35
+        for line in wrap(text, self.width - indent, size, bold):
+            self._ensure_space(leading)
+            self._y -= leading
+            self._text(MARGIN + indent, self._y, line, size, bold, gray)
+
+    def heading(self, text: str, size: float = 13):
+        self._ensure_space(size * 3)
+        self._y -= size * 0.8
+        self.paragraph(text, size, bold=True)
+        self._rule(0.6)
+        self._y -= size * 0.4
+
+    def _rule(self, weight: float):
+        self._ops.append(b"%.2f w %d %.2f m %d %.2f l S" % (weight, MARGIN, self._y - 3, PAGE_WIDTH - MARGIN, self._y - 3))
+
+    def row(self, cells: Sequence[str], widths: Sequence[float], size: float = 8, bold: bool = False):
+        """One table row; each cell wraps within its column. Rows never split across pages."""
+        leading = size * 1.3
+        wrapped = [wrap(cell, width - 4, size, bold) for cell, width in zip(cells, widths)]
+        height = leading * max(len(lines) for lines in wrapped) + 4
+        self._ensure_space(height)
+        x = MARGIN
+        for lines, width in zip(wrapped, widths):
+            y = self._y
+            for line in lines:
+                y -= leading
+                self._text(x + 2, y, line, size, bold)
+            x += width
+        self._y -= height
+        self._ops.append(b"0.85 G 0.4 w %d %.2f m %d %.2f l S 0 G" % (MARGIN, self._y, PAGE_WIDTH - MARGIN, self._y))
+
+    def close(self) -> int:
+        """Writes the page tree, catalog and cross-reference table. Returns the page count."""
+        if self.pages == 0:
+            self._start_page()
+        self._finish_page()
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self._page_ids)
+        self._object(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(self._page_ids))
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref_offset = self._offset
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % self._next_id)
+        for object_id in range(1, self._next_id):
+            self._write(b"%010d 00000 n \n" % self._offsets[object_id])
+        self._write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (self._next_id, xref_offset))
+        return len(self._page_ids)
@@ -0,0 +1,82 @@
+"""
+Field projection for list endpoints.
+
+`?fields=id,title,status` or `?view=summary` switches a list endpoint from
+full ORM objects to a Core SELECT of just those columns. Rows come back as
+plain tuples (no identity map, no relationship loading) and are written
+straight to JSON, skipping response-model validation.
+
+Projectable fields are the intersection of the endpoint's response schema
+and the model's columns, so internal columns never leak, plus optional
+computed fields (e.g. a correlated evidence count).
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import select
+
+
+class Projection:
+    def __init__(self, model, schema: type[BaseModel], summary: Sequence[str], computed: Dict = None):
+        self.model = model
+        self.columns = {
+            name: column for name, column in model.__table__.columns.items() if name in schema.model_fields
+        }
+        self.computed = computed or {}
+        self.summary = list(summary)
+
+    @property
+    def allowed(self) -> List[str]:
+        return [*self.columns, *self.computed]
+
+    def resolve(self, fields: Optional[str], view: Optional[str]) -> Optional[List[str]]:
+        """Returns the requested field list, or None for the full representation."""
+        if fields:
+            names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+            unknown = [n for n in names if n not in self.columns and n not in self.computed]
+            if unknown:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown fields {unknown}. Allowed: {self.allowed}"
+                )
+            return names if "id" in names else ["id", *names]
+        if view == "summary":
+            return self.summary
+        return None
+
+    def entities(self, names: Sequence[str]) -> list:
+        return [(self.columns[n] if n in self.columns else self.computed[n]).label(n) for n in names]
+
+    def select(self, names: Sequence[str]):
+        return select(*self.entities(names))
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _objects(names: Sequence[str], rows) -> list:
+    # zip() stops at len(names): trailing sort-key columns are dropped
+    return [dict(zip(names, row)) for row in rows]
+
+
+def json_rows(names: Sequence[str], rows, headers: Dict[str, str] = None) -> Response:
+    """Serializes projected rows as a JSON array of objects."""
+    body = json.dumps(_objects(names, rows), default=_default, separators=(",", ":"))
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def json_page(names: Sequence[str], rows, next_cursor: Optional[str]) -> Response:
+    """Serializes projected rows as a {"items", "next_cursor"} page."""
+    body = json.dumps(
+        {"items": _objects(names, rows), "next_cursor": next_cursor}, default=_default, separators=(",", ":")
+    )
+    return Response(content=body, media_type="application/json")
@@ -1,18 +1,28 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta, UTC
-from typing import Optional, List
+from typing import Optional, List, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import os
 from app.core import database, models
+from app.core.cache import TTLCache
+from app.audit import writer as audit_writer
 
 # Security constants
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-it-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 24 hours for legal workflows
 
+# Authenticated-principal cache (per worker process). The TTL bounds staleness
+# across processes; in-process changes are invalidated eagerly (see below).
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -32,24 +42,97 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+@dataclass(frozen=True)
+class Principal:
+    """
+    Immutable, session-independent view of the authenticated user.
+    Endpoints receive this instead of a models.User ORM instance.
+    """
+    id: str
+    email: str
+    firm_id: Optional[str]
+    role: str
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            firm_id=user.firm_id,
+            role=user.role,
+            is_active=user.is_active is not False,
+        )
+
+_principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+def invalidate_principal(email: str):
+    """Drops a cached principal; call after changing a user's role, firm or active flag."""
+    _principal_cache.pop(email)
+
+def clear_principal_cache():
+    _principal_cache.clear()
+
+_PRINCIPAL_FIELDS = ("email", "role", "firm_id", "is_active")
+_EVICT_KEY = "principal_evictions"
+
+def _evict(target: models.User, emails):
+    # Evict at flush, and again once the change is committed: a request that
+    # reads the user between the two re-caches the old row, and the second
+    # eviction drops it
+    session = inspect(target).session
+    for email in emails:
+        invalidate_principal(email)
+        if session is not None:
+            session.info.setdefault(_EVICT_KEY, set()).add(email)
+
+@event.listens_for(models.User, "after_update")
+def _invalidate_on_user_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _PRINCIPAL_FIELDS):
+        _evict(target, [target.email, *(state.attrs.email.history.deleted or ())])
+
+@event.listens_for(models.User, "after_delete")
+def _invalidate_on_user_delete(mapper, connection, target):
+    _evict(target, [target.email])
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    for email in session.info.pop(_EVICT_KEY, ()):
+        invalidate_principal(email)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_evictions(session: Session, previous_transaction):
+    session.info.pop(_EVICT_KEY, None)
+
+def _token_subject(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(models.User).filter(models.User.email == email).first()
+        email = None
+    if email is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return email
+
+def _authorize(user: Optional[Principal]) -> Principal:
     if user is None:
-        raise credentials_exception
-    
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive. Access denied."
+        )
+
     # Strict Enterprise Isolation: Ensure user belongs to an active firm
     if not user.firm_id:
         raise HTTPException(
@@ -58,8 +141,32 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         )
     return user
 
-def require_roles(roles: List[str]):
-    def role_checker(current_user: models.User = Depends(get_current_user)):
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> Principal:
+    email = _token_subject(token)
+    user = _principal_cache.get(email)
+    if user is None:
+        db_user = db.query(models.User).filter(models.User.email == email).first()
+        if db_user is not None:
+            user = Principal.from_user(db_user)
+            _principal_cache.put(email, user)
+    return _authorize(user)
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)
+) -> Principal:
+    """get_current_user for async endpoints: cache misses await the async engine."""
+    email = _token_subject(token)
+    user = _principal_cache.get(email)
+    if user is None:
+        db_user = (await db.execute(select(models.User).where(models.User.email == email))).scalars().first()
+        if db_user is not None:
+            user = Principal.from_user(db_user)
+            _principal_cache.put(email, user)
+    return _authorize(user)
+
+def require_roles(roles: List[str], authenticate=get_current_user):
+    """`authenticate` is get_current_user, or get_current_user_async for async endpoints."""
+    async def role_checker(current_user: Principal = Depends(authenticate)):
         if current_user.role not in roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -68,7 +175,7 @@ def require_roles(roles: List[str]):
         return current_user
     return role_checker
 
-def firm_context(current_user: models.User = Depends(get_current_user)):
+def firm_context(current_user: Principal = Depends(get_current_user)):
     """
     Returns the firm_id for the current context.
     Ensures that any data operation is scoped to this ID.
@@ -76,7 +183,7 @@ def firm_context(current_user: models.User = Depends(get_current_user)):
     return current_user.firm_id
 
 def log_audit(
-    db: Session, 
+    db: Union[Session, AsyncSession], 
     user_id: str, 
     firm_id: str, 
     action: str, 
@@ -86,22 +193,22 @@ def log_audit(
 ):
     """
     Enterprise-grade audit logger with integrity hashing.
+    The entry is buffered and written, hash-chained, by the caller's next
+    db.commit(), so it succeeds or rolls back together with the audited change.
+    Accepts a Session or an AsyncSession.
+    """
+    audit_writer.buffer(db, audit_writer.make_entry(user_id, firm_id, action, table_name, record_id, details))
+
+def log_audit_async(
+    user_id: str, 
+    firm_id: str, 
+    action: str, 
+    table_name: str, 
+    record_id: str, 
+    details: dict = None
+):
+    """
+    Audit logger for read-only endpoints with no transaction of their own.
+    Entries are flushed in bulk by the background audit flusher.
     """
-    import hashlib
-    import json
-    
-    details_str = json.dumps(details or {})
-    # Integrity hash of the audit entry itself
-    row_hash = hashlib.sha256(f"{user_id}{firm_id}{action}{table_name}{record_id}{details_str}".encode()).hexdigest()
-    
-    audit_entry = models.SystemAudit(
-        action=action,
-        table_name=table_name,
-        record_id=record_id,
-        user_id=user_id,
-        firm_id=firm_id,
-        details=details,
-        row_hash=row_hash
-    )
-    db.add(audit_entry)
-    db.commit()
+    audit_writer.flusher.submit(audit_writer.make_entry(user_id, firm_id, action, table_name, record_id, details))
@@ -0,0 +1,184 @@
+"""
+Materialized per-firm rollups for the dashboard.
+
+`firm_rollups` keeps, per firm, a row count (and for invoices an amount
+total) for every status of cases, evidence, tasks and invoices. ORM write
+hooks apply +1/-1 deltas as atomic upserts in the same transaction as the
+entity, so the counters move with every insert, status change, firm move
+and delete, and the dashboard sums them with one primary-key range scan.
+
+Each counter is split over ROLLUP_SHARDS rows, picked by the entity id, so
+concurrent writers in one firm rarely wait on the same counter row until
+they commit. refresh() folds the shards back into one row per counter.
+
+Writes that bypass the ORM (bulk Core inserts, manual SQL) are not seen;
+recompute from the base tables with (e.g. nightly):
+    python -m app.dashboard.rollups --refresh
+"""
+import argparse
+import os
+import zlib
+from typing import Optional
+from sqlalchemy import (
+    Table, Column, String, Integer, BigInteger, PrimaryKeyConstraint,
+    event, delete, func, inspect, literal, select, text, update,
+)
+from app.core import models
+from app.core.database import Base, SessionLocal
+from app.core.materialized import upsert_statement
+
+firm_rollups = Table(
+    "firm_rollups",
+    Base.metadata,
+    Column("firm_id", String, nullable=False),
+    Column("metric", String, nullable=False),  # cases, evidence, tasks, invoices
+    Column("bucket", String, nullable=False),  # Status
+    Column("shard", Integer, nullable=False, default=0),  # Counter = sum over shards
+    Column("count", Integer, nullable=False, default=0),
+    Column("amount", BigInteger, nullable=False, default=0),  # Sum of amount_attr (cents), else 0
+    PrimaryKeyConstraint("firm_id", "metric", "bucket", "shard", name="pk_firm_rollups"),
+)
+
+ROLLUP_SHARDS = int(os.getenv("DASHBOARD_ROLLUP_SHARDS", 8))
+
+# model: (metric, amount attribute or None)
+ROLLUPS = {
+    models.Case: ("cases", None),
+    models.Evidence: ("evidence", None),
+    models.Task: ("tasks", None),
+    models.Invoice: ("invoices", "total_amount"),
+}
+UNKNOWN_BUCKET = "Unknown"
+
+
+def _shard(entity_id: Optional[str]) -> int:
+    return zlib.crc32((entity_id or "").encode()) % max(1, ROLLUP_SHARDS)
+
+
+def _bump(connection, firm_id: str, metric: str, bucket: Optional[str], count: int, amount: int, shard: int = 0):
+    values = {"firm_id": firm_id, "metric": metric, "bucket": bucket or UNKNOWN_BUCKET, "shard": shard,
+              "count": count, "amount": amount}
+    statement = upsert_statement(
+        connection.dialect.name, firm_rollups, values, ("firm_id", "metric", "bucket", "shard"),
+        lambda excluded: {"count": firm_rollups.c.count + excluded.count,
+                          "amount": firm_rollups.c.amount + excluded.amount},
+    )
+    if statement is not None:
+        connection.execute(statement)
+        return
+    updated = connection.execute(update(firm_rollups).where(
+        firm_rollups.c.firm_id == values["firm_id"],
+        firm_rollups.c.metric == metric,
+        firm_rollups.c.bucket == values["bucket"],
+        firm_rollups.c.shard == shard,
+    ).values(count=firm_rollups.c.count + count, amount=firm_rollups.c.amount + amount)).rowcount
+    if not updated:
+        connection.execute(firm_rollups.insert().values(**values))
+
+
+def _snapshot(target, amount_attr: Optional[str], old: bool) -> tuple:
+    """(firm_id, status, amount) as committed before this flush (old) or as being written."""
+    state = inspect(target)
+    values = []
+    for attr in ("firm_id", "status", amount_attr):
+        if attr is None:
+            values.append(0)
+            continue
+        history = state.attrs[attr].history
+        if old and history.has_changes():
+            value = history.deleted[0] if history.deleted else None
+        else:
+            value = getattr(target, attr)
+        values.append(value)
+    firm_id, status, amount = values
+    return firm_id, status, amount or 0
+
+
+def _on_insert(mapper, connection, target):
+    metric, amount_attr = ROLLUPS[type(target)]
+    firm_id, status, amount = _snapshot(target, amount_attr, old=False)
+    if firm_id:
+        _bump(connection, firm_id, metric, status, 1, amount, _shard(target.id))
+
+
+def _on_update(mapper, connection, target):
+    metric, amount_attr = ROLLUPS[type(target)]
+    before = _snapshot(target, amount_attr, old=True)
+    after = _snapshot(target, amount_attr, old=False)
+    if before == after:
+        return
+    shard = _shard(target.id)
+    if before[0]:
+        _bump(connection, before[0], metric, before[1], -1, -before[2], shard)
+    if after[0]:
+        _bump(connection, after[0], metric, after[1], 1, after[2], shard)
+
+
+def _on_delete(mapper, connection, target):
+    metric, amount_attr = ROLLUPS[type(target)]
+    firm_id, status, amount = _snapshot(target, amount_attr, old=True)
+    if firm_id:
+        _bump(connection, firm_id, metric, status, -1, -amount, _shard(target.id))
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+for _model, (_metric, _amount_attr) in ROLLUPS.items():
+    event.listen(_model, "after_insert", _on_insert)
+    event.listen(_model, "after_update", _on_update)
+    event.listen(_model, "before_delete", _on_delete)  # Unloaded attributes can still be loaded
+    # Load the previous value when an unloaded attribute is assigned, so the old bucket can be decremented
+    for _attr in filter(None, ("firm_id", "status", _amount_attr)):
+        event.listen(getattr(_model, _attr), "set", _keep_old_value, active_history=True)
+
+
+def refresh(firm_id: Optional[str] = None) -> int:
+    """
+    Recomputes the rollups (of one firm, or all) from the base tables, folding
+    the shards into one row per counter. Returns rows written.
+
+    Runs as one transaction that keeps write hooks out until it commits, so a
+    concurrent change is counted exactly once: by the recount, or by its bump
+    applied after it. PostgreSQL: the table lock waits for in-flight bumps and
+    blocks new ones. SQLite: the DELETE comes first and takes the write lock.
+    """
+    rows = []
+    with SessionLocal() as db:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text(f"LOCK TABLE {firm_rollups.name} IN SHARE ROW EXCLUSIVE MODE"))
+        stale = delete(firm_rollups)
+        if firm_id:
+            stale = stale.where(firm_rollups.c.firm_id == firm_id)
+        db.execute(stale)
+        for model, (metric, amount_attr) in ROLLUPS.items():
+            amount = func.coalesce(func.sum(getattr(model, amount_attr)), 0) if amount_attr else literal(0)
+            query = select(model.firm_id, model.status, func.count(), amount).where(model.firm_id.is_not(None))
+            if firm_id:
+                query = query.where(model.firm_id == firm_id)
+            totals = {}
+            for row_firm, status, count, total in db.execute(query.group_by(model.firm_id, model.status)):
+                key = (row_firm, status or UNKNOWN_BUCKET)  # NULL and "Unknown" share a bucket
+                previous = totals.get(key, (0, 0))
+                totals[key] = (previous[0] + count, previous[1] + int(total or 0))
+            rows += [{"firm_id": f, "metric": metric, "bucket": b, "shard": 0, "count": c, "amount": a}
+                     for (f, b), (c, a) in totals.items()]
+        if rows:
+            db.execute(firm_rollups.insert(), rows)
+        db.commit()
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the dashboard rollups")
+    parser.add_argument("--refresh", action="store_true", help="Recompute all rollups from the base tables")
+    parser.add_argument("--firm", help="Only recompute this firm's rollups")
+    args = parser.parse_args()
+    if args.refresh:
+        Base.metadata.create_all(bind=SessionLocal().get_bind(), tables=[firm_rollups])
+        print(f"Wrote {refresh(args.firm)} rollup rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app.core import database, security
+from . import schemas, service
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+@router.get("/stats", response_model=schemas.DashboardStats)
+def dashboard_stats(
+    upcoming_days: int = Query(7, ge=1, le=90),
+    db: Session = Depends(database.get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
+):
+    """
+    Firm-wide counts for the dashboard: cases, evidence and tasks by status,
+    overdue tasks, upcoming events and invoice totals. Three indexed reads,
+    whatever the size of the firm.
+    """
+    return service.firm_stats(db, current_user.firm_id, upcoming_days)
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Dict, List
+from datetime import datetime
+from app.scheduling.schemas import EventSlot
+
+class InvoiceTotals(BaseModel):
+    count: int = 0
+    amount: int = 0 # In cents
+
+class DashboardStats(BaseModel):
+    generated_at: datetime
+    total_cases: int
+    cases_by_status: Dict[str, int]
+    total_evidence: int
+    evidence_by_status: Dict[str, int]
+    tasks_by_status: Dict[str, int]
+    overdue_tasks: int
+    upcoming_events: int # Starting within the next `upcoming_days`
+    next_events: List[EventSlot]
+    invoices_by_status: Dict[str, InvoiceTotals]
+    outstanding_invoices: InvoiceTotals # Sent or Overdue
+    overdue_invoices: InvoiceTotals # Outstanding and past due
@@ -0,0 +1,70 @@
+"""
+Firm dashboard figures.
+
+Status breakdowns and invoice totals come from the materialized rollups
+(app.dashboard.rollups): one primary-key range read, summed over shards. Figures that depend
+on the clock (overdue tasks and invoices, upcoming events) cannot be kept
+as counters; they are index range counts over (firm_id, status, due_date)
+and (firm_id, start_time, id), evaluated in a single statement.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.core import models
+from .rollups import firm_rollups
+
+OPEN_TASK_STATUSES = ("Pending", "In Progress")
+OUTSTANDING_INVOICE_STATUSES = ("Sent", "Overdue")
+NEXT_EVENTS_LIMIT = 5
+
+
+def rollup_totals(db: Session, firm_id: str) -> Dict[str, Dict[str, tuple]]:
+    """{metric: {bucket: (count, amount)}} summed over shards, dropping buckets that have emptied."""
+    totals: Dict[str, Dict[str, tuple]] = {"cases": {}, "evidence": {}, "tasks": {}, "invoices": {}}
+    rows = db.execute(select(
+        firm_rollups.c.metric, firm_rollups.c.bucket, func.sum(firm_rollups.c.count), func.sum(firm_rollups.c.amount)
+    ).where(firm_rollups.c.firm_id == firm_id).group_by(firm_rollups.c.metric, firm_rollups.c.bucket))
+    for metric, bucket, count, amount in rows:
+        if count:
+            totals.setdefault(metric, {})[bucket] = (int(count), int(amount))  # SUM() is NUMERIC on PostgreSQL
+    return totals
+
+
+def firm_stats(db: Session, firm_id: str, upcoming_days: int = 7, now: Optional[datetime] = None) -> dict:
+    now = now or models.utcnow()
+    horizon = now + timedelta(days=upcoming_days)
+    totals = rollup_totals(db, firm_id)
+    Task, Event, Invoice = models.Task, models.Event, models.Invoice
+
+    overdue_invoice = (Invoice.firm_id == firm_id, Invoice.status.in_(OUTSTANDING_INVOICE_STATUSES), Invoice.due_date < now)
+    overdue_tasks, upcoming_events, overdue_count, overdue_amount = db.execute(select(
+        select(func.count()).select_from(Task).where(  # count(*): answered from the index alone
+            Task.firm_id == firm_id, Task.status.in_(OPEN_TASK_STATUSES), Task.due_date < now
+        ).scalar_subquery(),
+        select(func.count()).select_from(Event).where(
+            Event.firm_id == firm_id, Event.start_time >= now, Event.start_time < horizon
+        ).scalar_subquery(),
+        select(func.count()).select_from(Invoice).where(*overdue_invoice).scalar_subquery(),
+        select(func.coalesce(func.sum(Invoice.total_amount), 0)).where(*overdue_invoice).scalar_subquery(),
+    )).one()
+    next_events = db.query(Event).filter(
+        Event.firm_id == firm_id, Event.start_time >= now, Event.start_time < horizon
+    ).order_by(Event.start_time, Event.id).limit(NEXT_EVENTS_LIMIT).all()
+
+    invoices = totals["invoices"]
+    outstanding = [invoices[s] for s in OUTSTANDING_INVOICE_STATUSES if s in invoices]
+    return {
+        "generated_at": now,
+        "total_cases": sum(count for count, _ in totals["cases"].values()),
+        "cases_by_status": {bucket: count for bucket, (count, _) in totals["cases"].items()},
+        "total_evidence": sum(count for count, _ in totals["evidence"].values()),
+        "evidence_by_status": {bucket: count for bucket, (count, _) in totals["evidence"].items()},
+        "tasks_by_status": {bucket: count for bucket, (count, _) in totals["tasks"].items()},
+        "overdue_tasks": overdue_tasks,
+        "upcoming_events": upcoming_events,
+        "next_events": next_events,
+        "invoices_by_status": {bucket: {"count": count, "amount": amount} for bucket, (count, amount) in invoices.items()},
+        "outstanding_invoices": {"count": sum(c for c, _ in outstanding), "amount": sum(a for _, a in outstanding)},
+        "overdue_invoices": {"count": overdue_count, "amount": int(overdue_amount or 0)},
+    }
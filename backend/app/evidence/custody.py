@@ -0,0 +1,209 @@
+"""
+Evidence chain-of-custody verification.
+
+Each Evidence row records `previous_hash`: the file_hash of the exhibit
+appended to the same case just before it ("GENESIS" for the first). A
+case's chain is walked with one ordered, streaming query and checked for:
+
+* breaks - previous_hash does not match the preceding exhibit
+* forks  - two exhibits claim the same predecessor (concurrent appends)
+
+`append` links new exhibits through the per-case EvidenceChainHead row
+(compare-and-swap, plus FOR UPDATE on PostgreSQL), so concurrent uploads
+to one case are linearized while uploads to different cases never contend.
+
+`record_event` appends to an exhibit's custody log (who did what, when),
+one row per entry in evidence_custody_events.
+
+`verify_firm` fans cases out to a process pool for nightly sweeps.
+
+CLI:
+    python -m app.evidence.custody --firm <firm_id> --workers 8
+    python -m app.evidence.custody --all --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.core import models
+from app.core.database import SessionLocal
+
+GENESIS_HASH = "GENESIS"
+STREAM_BATCH_ROWS = 1000
+CASES_PER_TASK = 50
+MAX_APPEND_ATTEMPTS = 50
+
+Evidence = models.Evidence
+Head = models.EvidenceChainHead
+
+
+class ChainAppendConflict(RuntimeError):
+    pass
+
+
+def chain_order(query):
+    """
+    Canonical chain order. Exhibits added before chain heads existed have
+    no chain_seq and sort first, in upload order.
+    """
+    return query.order_by(Evidence.chain_seq.asc().nulls_first(), Evidence.created_at, Evidence.id)
+
+
+def _ensure_head(db: Session, case_id: str):
+    """Creates the case's head row on first append, seeded from any legacy tail."""
+    if db.get(Head, case_id) is not None:
+        return
+    legacy_tail = db.execute(
+        select(Evidence.id, Evidence.file_hash)
+        .where(Evidence.case_id == case_id)
+        .order_by(Evidence.chain_seq.desc().nulls_last(), Evidence.created_at.desc(), Evidence.id.desc())
+        .limit(1)
+    ).first()
+    values = {
+        "case_id": case_id,
+        "seq": 0,
+        "head_hash": legacy_tail.file_hash if legacy_tail else GENESIS_HASH,
+        "head_evidence_id": legacy_tail.id if legacy_tail else None,
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        db.execute(pg_insert(Head).values(**values).on_conflict_do_nothing())
+    elif dialect == "sqlite":
+        db.execute(sqlite_insert(Head).values(**values).on_conflict_do_nothing())
+    else:
+        db.add(Head(**values))
+        db.flush()
+
+
+def append(db: Session, case_id: str, evidence: models.Evidence) -> str:
+    """
+    Links `evidence` (already carrying id and file_hash) to the case chain and
+    returns its previous_hash. Must be committed in the same transaction as
+    the evidence row; the head lock is held only until that commit.
+    """
+    _ensure_head(db, case_id)
+    for _ in range(MAX_APPEND_ATTEMPTS):
+        head_query = select(Head.seq, Head.head_hash).where(Head.case_id == case_id)
+        if db.get_bind().dialect.name == "postgresql":
+            head_query = head_query.with_for_update()
+        head = db.execute(head_query).one()
+
+        swapped = db.execute(
+            update(Head)
+            .where(Head.case_id == case_id, Head.seq == head.seq)
+            .values(seq=head.seq + 1, head_hash=evidence.file_hash, head_evidence_id=evidence.id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if swapped:
+            evidence.previous_hash = head.head_hash
+            evidence.chain_seq = head.seq + 1
+            return head.head_hash
+    raise ChainAppendConflict(f"Could not append to evidence chain of case {case_id}")
+
+
+def record_event(db: Session, evidence: models.Evidence, action: str, actor: str,
+                 **details) -> models.EvidenceCustodyEvent:
+    """
+    Adds one custody log entry for `evidence` to the caller's transaction.
+    A single INSERT, independent of how long the exhibit's history is.
+    """
+    entry = models.EvidenceCustodyEvent(
+        evidence_id=evidence.id, firm_id=evidence.firm_id, action=action, actor=actor, details=details or None
+    )
+    db.add(entry)
+    return entry
+
+
+def verify_case(db: Session, case_id: str) -> Dict:
+    rows = db.execute(
+        chain_order(
+            select(Evidence.id, Evidence.file_hash, Evidence.previous_hash)
+            .where(Evidence.case_id == case_id)
+        ).execution_options(yield_per=STREAM_BATCH_ROWS)
+    )
+
+    expected_prev = GENESIS_HASH
+    claimed = set()  # Predecessor hashes already linked to
+    items, breaks, forks = 0, [], []
+    for row in rows:
+        items += 1
+        if row.previous_hash != expected_prev:
+            issue = {"evidence_id": row.id, "expected": expected_prev, "found": row.previous_hash}
+            if row.previous_hash in claimed:
+                forks.append(issue)
+            else:
+                breaks.append(issue)
+        claimed.add(row.previous_hash)
+        expected_prev = row.file_hash
+
+    return {
+        "case_id": case_id,
+        "items": items,
+        "intact": not breaks and not forks,
+        "breaks": breaks,
+        "forks": forks,
+        "head_hash": expected_prev if items else None,
+    }
+
+
+def _verify_cases(case_ids: List[str]) -> List[Dict]:
+    with SessionLocal() as db:
+        return [verify_case(db, case_id) for case_id in case_ids]
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def verify_firm(firm_id: Optional[str], workers: int = os.cpu_count() or 1) -> Iterable[Dict]:
+    """
+    Verifies every case of a firm (or of all firms when firm_id is None)
+    across `workers` processes. Yields per-case reports as they complete.
+    """
+    with SessionLocal() as db:
+        query = select(models.Case.id).order_by(models.Case.id)
+        if firm_id:
+            query = query.where(models.Case.firm_id == firm_id)
+        case_ids = list(db.scalars(query))
+
+    if workers <= 1:
+        for chunk in _chunks(case_ids, CASES_PER_TASK):
+            yield from _verify_cases(chunk)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        for reports in pool.map(_verify_cases, _chunks(case_ids, CASES_PER_TASK)):
+            yield from reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify evidence chain-of-custody")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--firm", help="Firm id to sweep")
+    target.add_argument("--all", action="store_true", help="Sweep every firm")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--verbose", action="store_true", help="Print intact cases too")
+    args = parser.parse_args()
+
+    cases = broken = 0
+    for report in verify_firm(None if args.all else args.firm, args.workers):
+        cases += 1
+        if not report["intact"]:
+            broken += 1
+        if args.verbose or not report["intact"]:
+            print(json.dumps(report))
+    print(json.dumps({"type": "summary", "cases": cases, "broken": broken}))
+    sys.exit(1 if broken else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Evidence text extraction stage.
+
+Runs after `add_evidence` has stored the upload: the file is parsed once
+(plain text, PDF, DOCX) in a process pool and the text is written to the
+content-addressed TextStore under its file_hash. Analysis, semantic
+indexing and export read that text instead of re-parsing the original.
+Identical uploads are extracted only once.
+
+PDF support uses pypdf when installed; DOCX is parsed with the stdlib.
+
+Backfill existing evidence:
+    python -m app.evidence.extraction --backfill --workers 4
+"""
+import argparse
+import asyncio
+import codecs
+import logging
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+from xml.etree import ElementTree
+from starlette.concurrency import run_in_threadpool
+from app.core import models
+from app.core.database import SessionLocal
+from . import custody, storage
+from .textstore import TextStore, store
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # Optional dependency
+    PdfReader = None
+
+logger = logging.getLogger("veritas.evidence.extraction")
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", 2))  # 0 extracts in a thread instead
+READ_CHUNK_SIZE = 64 * 1024
+
+TEXT_EXTENSIONS = {".txt", ".md", ".csv", ".json", ".xml", ".html", ".htm", ".eml", ".log"}
+_DOCX_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str], head: bytes) -> Optional[str]:
+    extension = os.path.splitext(filename or "")[1].lower()
+    content_type = (content_type or "").lower()
+    if head.startswith(b"%PDF") or extension == ".pdf" or content_type == "application/pdf":
+        return "pdf"
+    if extension == ".docx" or content_type.endswith("wordprocessingml.document"):
+        return "docx" if head.startswith(b"PK") else None
+    if content_type.startswith("text/") or extension in TEXT_EXTENSIONS:
+        return "text"
+    return None
+
+
+def _text_pieces(stream) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while chunk := stream.read(READ_CHUNK_SIZE):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def _pdf_pieces(stream) -> Iterator[str]:
+    if PdfReader is None:
+        raise RuntimeError("PDF extraction requires the pypdf package")
+    for page in PdfReader(stream).pages:
+        yield (page.extract_text() or "") + "\n\f"
+
+
+def _docx_pieces(stream) -> Iterator[str]:
+    with zipfile.ZipFile(stream) as archive, archive.open("word/document.xml") as document:
+        paragraph = []
+        for _, element in ElementTree.iterparse(document, events=("end",)):
+            if element.tag == f"{_DOCX_NS}t":
+                paragraph.append(element.text or "")
+            elif element.tag == f"{_DOCX_NS}tab":
+                paragraph.append("\t")
+            elif element.tag == f"{_DOCX_NS}p":
+                yield "".join(paragraph) + "\n"
+                paragraph = []
+                element.clear()
+
+
+EXTRACTORS = {"text": _text_pieces, "pdf": _pdf_pieces, "docx": _docx_pieces}
+
+
+def extract_to_store(file_hash: str, storage_path: str, filename: str = None,
+                     content_type: str = None, store_root: str = None) -> Optional[int]:
+    """
+    Process-pool entry point: parses one stored file into the TextStore.
+    Returns the extracted size in bytes, or None for unsupported formats.
+    """
+    target = TextStore(store_root)
+    if target.has(file_hash):
+        return os.path.getsize(target.path(file_hash))
+    with storage.open_stored(storage_path) as stream:
+        head = stream.read(8)
+        stream.seek(0)
+        fmt = detect_format(filename, content_type, head)
+        if fmt is None:
+            return None
+        return target.put(file_hash, EXTRACTORS[fmt](stream))
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if _pool is None and EXTRACTION_WORKERS > 0:
+        _pool = ProcessPoolExecutor(EXTRACTION_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+
+def _record_extracted(evidence_id: str):
+    # Custody log entry; also moves the case's dossier version (new excerpt)
+    with SessionLocal() as db:
+        evidence = db.get(models.Evidence, evidence_id)
+        if evidence is not None:
+            custody.record_event(db, evidence, "TEXT_EXTRACTED", "Veritas-Extraction")
+            db.commit()
+
+
+async def process_upload(firm_id: str, evidence_id: str, file_hash: str, storage_path: str,
+                         filename: str = None, content_type: str = None):
+    """
+    Post-upload pipeline: extract, then index for semantic search, both in
+    the pool (off the event loop and out of the API process). Failures are logged and never surface to the client.
+    """
+    from app.search import semantic
+    try:
+        if not store.has(file_hash):
+            await asyncio.get_running_loop().run_in_executor(
+                get_pool(), extract_to_store, file_hash, storage_path, filename, content_type, store.root
+            )
+        if store.has(file_hash):
+            await run_in_threadpool(_record_extracted, evidence_id)
+            # Embedding and k-means retraining are CPU-bound: keep them out of the API process too
+            await asyncio.get_running_loop().run_in_executor(
+                get_pool(), semantic.index_extracted, firm_id, evidence_id, file_hash,
+                store.root, semantic.SEMANTIC_INDEX_ROOT
+            )
+    except Exception as e:
+        logger.error(f"Text extraction for evidence {evidence_id} failed: {e}")
+
+
+def backfill(workers: int = EXTRACTION_WORKERS) -> int:
+    """
+    Extracts text for stored evidence that has none yet and indexes it for
+    semantic search. Returns the number of files extracted.
+    """
+    from app.search import semantic
+    pending, exhibits = {}, []
+    with SessionLocal() as db:
+        for evidence_id, firm_id, file_hash, storage_path in db.query(
+            models.Evidence.id, models.Evidence.firm_id, models.Evidence.file_hash, models.Evidence.storage_path
+        ).filter(models.Evidence.file_hash.isnot(None)).yield_per(1000):
+            if not store.has(file_hash):
+                pending.setdefault(file_hash, storage_path)
+                exhibits.append((firm_id, evidence_id, file_hash))
+
+    extracted = set()
+    with ProcessPoolExecutor(max(1, workers), mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {
+            pool.submit(extract_to_store, file_hash, path, path, None, store.root): file_hash
+            for file_hash, path in pending.items()
+        }
+        for future, file_hash in futures.items():
+            try:
+                if future.result() is not None:
+                    extracted.add(file_hash)
+            except Exception as e:
+                logger.error(f"Extraction of {file_hash} failed: {e}")
+
+    for firm_id, evidence_id, file_hash in exhibits:
+        if file_hash in extracted:
+            semantic.index_extracted(firm_id, evidence_id, file_hash, store.root)
+    return len(extracted)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evidence text extraction")
+    parser.add_argument("--backfill", action="store_true", help="Extract text for stored evidence lacking it")
+    parser.add_argument("--workers", type=int, default=max(1, EXTRACTION_WORKERS))
+    args = parser.parse_args()
+    if args.backfill:
+        from app.search import semantic
+        semantic.ensure_schema()
+        print(f"Extracted {backfill(args.workers)} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Streaming evidence storage.
+
+Uploads are consumed in fixed-size chunks. Every chunk feeds the SHA-256
+digest and the storage writer at the same time, so peak memory per upload
+is bounded by EVIDENCE_CHUNK_SIZE no matter how large the exhibit is.
+"""
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.core import firebase as firebase_setup
+
+# 1 MiB. Must stay a multiple of 256 KiB for resumable GCS uploads.
+EVIDENCE_CHUNK_SIZE = int(os.getenv("EVIDENCE_CHUNK_SIZE", 1024 * 1024))
+LOCAL_STORAGE_ROOT = os.getenv("EVIDENCE_STORAGE_ROOT", "local_storage")
+
+
+@dataclass(frozen=True)
+class StoredEvidence:
+    storage_path: str
+    file_hash: str
+    size: int
+
+
+class LocalStorageWriter:
+    """
+    Local-filesystem backend used when Firebase Storage is unavailable.
+    Data lands in a temp file and is renamed atomically once the hash is known.
+    """
+
+    def __init__(self, case_id: str, filename: str):
+        self.directory = os.path.join(LOCAL_STORAGE_ROOT, os.path.basename(case_id))
+        self.filename = os.path.basename(filename or "upload")
+        os.makedirs(self.directory, exist_ok=True)
+        self._tmp_path = os.path.join(self.directory, f".incoming-{uuid.uuid4().hex}")
+        self._fh = open(self._tmp_path, "wb")
+
+    def write(self, chunk: bytes):
+        self._fh.write(chunk)
+
+    def commit(self, file_hash: str) -> str:
+        self._fh.close()
+        final_path = os.path.join(self.directory, f"{file_hash}_{self.filename}")
+        os.replace(self._tmp_path, final_path)
+        return final_path
+
+    def abort(self):
+        self._fh.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class FirebaseStorageWriter:
+    """
+    Resumable (chunked) upload into the Firebase bucket.
+    The object is renamed to its content-addressed name after the last chunk.
+    """
+
+    def __init__(self, bucket, case_id: str, filename: str, content_type: str = None):
+        self.bucket = bucket
+        self.prefix = f"evidence/{case_id}"
+        self.filename = os.path.basename(filename or "upload")
+        self._blob = bucket.blob(f"{self.prefix}/.incoming/{uuid.uuid4().hex}")
+        self._fh = self._blob.open("wb", chunk_size=EVIDENCE_CHUNK_SIZE, content_type=content_type)
+
+    def write(self, chunk: bytes):
+        self._fh.write(chunk)
+
+    def commit(self, file_hash: str) -> str:
+        self._fh.close()
+        blob = self.bucket.rename_blob(self._blob, f"{self.prefix}/{file_hash}_{self.filename}")
+        return blob.name
+
+    def abort(self):
+        try:
+            self._fh.close()
+            self._blob.delete()
+        except Exception:
+            pass
+
+
+def open_storage_writer(case_id: str, filename: str, content_type: str = None):
+    bucket = firebase_setup.get_bucket()
+    if bucket:
+        return FirebaseStorageWriter(bucket, case_id, filename, content_type)
+    return LocalStorageWriter(case_id, filename)
+
+
+async def store_upload(file: UploadFile, case_id: str) -> StoredEvidence:
+    """
+    Streams an UploadFile into storage while hashing it incrementally.
+    Blocking writes run in the threadpool so the event loop stays free.
+    """
+    writer = await run_in_threadpool(open_storage_writer, case_id, file.filename, file.content_type)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        while chunk := await file.read(EVIDENCE_CHUNK_SIZE):
+            hasher.update(chunk)
+            await run_in_threadpool(writer.write, chunk)
+            size += len(chunk)
+        file_hash = hasher.hexdigest()
+        storage_path = await run_in_threadpool(writer.commit, file_hash)
+    except BaseException:
+        await run_in_threadpool(writer.abort)
+        raise
+    return StoredEvidence(storage_path=storage_path, file_hash=file_hash, size=size)
+
+
+def delete_stored(storage_path: str):
+    """
+    Removes a stored object, e.g. one whose Evidence row failed to commit.
+    Missing objects are ignored.
+    """
+    if os.path.exists(storage_path):
+        os.remove(storage_path)
+        return
+    bucket = firebase_setup.get_bucket()
+    if bucket is not None:
+        try:
+            bucket.blob(storage_path).delete()
+        except Exception:
+            pass
+
+
+def open_stored(storage_path: str):
+    """
+    Opens stored evidence for streaming reads (binary file-like object).
+    """
+    if os.path.exists(storage_path):
+        return open(storage_path, "rb")
+    bucket = firebase_setup.get_bucket()
+    if bucket is None:
+        raise FileNotFoundError(storage_path)
+    return bucket.blob(storage_path).open("rb", chunk_size=EVIDENCE_CHUNK_SIZE)
@@ -0,0 +1,142 @@
+"""
+Content-addressed store for extracted evidence text.
+
+One file per distinct `file_hash` (so re-uploads of identical bytes share
+it), laid out for memory-mapped random access:
+
+    [zlib block 0][zlib block 1]...[offsets: (n+1) x u64][footer]
+
+Each block holds TEXT_BLOCK_SIZE bytes of UTF-8 text compressed on its own,
+so a reader maps the file and inflates only the blocks it touches: an
+excerpt costs one block, and a full scan streams block by block with
+bounded memory. Files are written to a temp name and renamed into place,
+so readers only ever see complete files.
+"""
+import codecs
+import mmap
+import os
+import struct
+import uuid
+import zlib
+from typing import Iterable, Iterator, Optional
+
+TEXT_STORE_ROOT = os.getenv("EXTRACTED_TEXT_ROOT", "extracted_text")
+TEXT_BLOCK_SIZE = 64 * 1024
+COMPRESSION_LEVEL = 6
+
+_MAGIC = b"VTX1"
+_FOOTER = struct.Struct("<QIIQ4s")  # table offset, block size, block count, raw size, magic
+
+
+class ExtractedText:
+    """Read-only view over one stored text file."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        table_offset, self.block_size, self.blocks, self.size, magic = _FOOTER.unpack_from(
+            self._map, len(self._map) - _FOOTER.size
+        )
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError(f"Not an extracted text file: {path}")
+        self._offsets = struct.unpack_from(f"<{self.blocks + 1}Q", self._map, table_offset)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _block(self, index: int) -> bytes:
+        return zlib.decompress(self._map[self._offsets[index]:self._offsets[index + 1]])
+
+    def read_bytes(self, start: int = 0, length: Optional[int] = None) -> bytes:
+        end = self.size if length is None else min(self.size, start + length)
+        if start >= end:
+            return b""
+        first, last = start // self.block_size, (end - 1) // self.block_size
+        data = b"".join(self._block(i) for i in range(first, last + 1))
+        base = first * self.block_size
+        return data[start - base:end - base]
+
+    def iter_text(self) -> Iterator[str]:
+        """Streams the text block by block (multi-byte characters may span blocks)."""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        for i in range(self.blocks):
+            yield decoder.decode(self._block(i))
+        yield decoder.decode(b"", final=True)
+
+    def word_count(self) -> int:
+        count, in_word = 0, False
+        for piece in self.iter_text():
+            if not piece:
+                continue
+            count += len(piece.split()) - (in_word and not piece[0].isspace())  # Word split across blocks
+            in_word = not piece[-1].isspace()
+        return count
+
+    def excerpt(self, max_bytes: int = 1024) -> str:
+        return self.read_bytes(0, max_bytes).decode("utf-8", errors="ignore")
+
+    def text(self, max_bytes: Optional[int] = None) -> str:
+        return self.read_bytes(0, max_bytes).decode("utf-8", errors="replace")
+
+
+class TextStore:
+
+    def __init__(self, root: str = None):
+        self.root = root or TEXT_STORE_ROOT
+
+    def path(self, file_hash: str) -> str:
+        file_hash = os.path.basename(file_hash)
+        return os.path.join(self.root, file_hash[:2], f"{file_hash}.vtx")
+
+    def has(self, file_hash: str) -> bool:
+        return bool(file_hash) and os.path.exists(self.path(file_hash))
+
+    def open(self, file_hash: str) -> Optional[ExtractedText]:
+        """Returns a reader, or None when no text was extracted for this content."""
+        try:
+            return ExtractedText(self.path(file_hash))
+        except FileNotFoundError:
+            return None
+
+    def put(self, file_hash: str, pieces: Iterable[str]) -> int:
+        """Compresses streamed text into the store. Returns the raw UTF-8 size."""
+        final_path = self.path(file_hash)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        tmp_path = f"{final_path}.{uuid.uuid4().hex}.tmp"
+        offsets, pending, size = [0], bytearray(), 0
+        try:
+            with open(tmp_path, "wb") as f:
+                def flush_block(block: bytes):
+                    f.write(zlib.compress(block, COMPRESSION_LEVEL))
+                    offsets.append(f.tell())
+
+                for piece in pieces:
+                    pending += piece.encode("utf-8")
+                    while len(pending) >= TEXT_BLOCK_SIZE:
+                        flush_block(bytes(pending[:TEXT_BLOCK_SIZE]))
+                        size += TEXT_BLOCK_SIZE
+                        del pending[:TEXT_BLOCK_SIZE]
+                if pending:
+                    flush_block(bytes(pending))
+                    size += len(pending)
+
+                table_offset = f.tell()
+                f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+                f.write(_FOOTER.pack(table_offset, TEXT_BLOCK_SIZE, len(offsets) - 1, size, _MAGIC))
+            os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return size
+
+
+store = TextStore()
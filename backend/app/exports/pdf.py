@@ -0,0 +1,170 @@
+"""
+Pooled PDF dossier rendering.
+
+PDFs render in dedicated renderer processes (PDF_WORKERS) behind a bounded
+queue: at most PDF_QUEUE_SIZE distinct renders are queued or running, and
+requests beyond that are refused with RendererBusy instead of piling up
+behind the API workers.
+
+Output is cached on disk by content hash: the key is a SHA-256 over
+everything the dossier shows (case fields, firm name and the case version
+from app.core.exporter) plus the layout version, so an unchanged case is
+rendered once and every later export, by anyone in the firm, is a file
+read. Concurrent requests for the same dossier share one render.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+from sqlalchemy.orm import Session, joinedload
+from app.core import exporter, models
+from app.core.database import SessionLocal
+
+logger = logging.getLogger("veritas.exports.pdf")
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", 2))  # Renderer processes; 0 renders in a thread instead
+PDF_QUEUE_SIZE = int(os.getenv("PDF_QUEUE_SIZE", 8))  # Renders queued or running
+PDF_WAIT_SECONDS = float(os.getenv("PDF_WAIT_SECONDS", 30))  # Longer renders answer 202 and keep going
+PDF_CACHE_ROOT = os.getenv("PDF_CACHE_ROOT", "pdf_cache")
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+LAYOUT_VERSION = 2  # Bump when write_case_pdf output changes
+
+
+class RendererBusy(Exception):
+    """The render queue is full."""
+
+
+def dossier_key(db: Session, case: models.Case) -> str:
+    """Content hash of a case's PDF dossier (case with firm loaded)."""
+    version = exporter.case_version(db, case.id)
+    parts = (LAYOUT_VERSION, case.id, case.title, case.case_number, case.description, case.status,
+             case.firm.name if case.firm else None, *version)
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+
+def cache_path(key: str) -> str:
+    return os.path.join(PDF_CACHE_ROOT, key[:2], f"{key}.pdf")
+
+
+def open_cached(key: str) -> Optional[BinaryIO]:
+    """
+    Opens the rendered dossier, if cached, and marks it recently used. The
+    open handle stays readable even if prune() removes the file before the
+    response has streamed it.
+    """
+    try:
+        f = open(cache_path(key), "rb")
+    except FileNotFoundError:
+        return None
+    os.utime(f.fileno())
+    return f
+
+
+def iter_file(f: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Streams and closes a handle from open_cached()."""
+    with f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def render_pdf(case_id: str, out_path: str, key: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Renderer entry point: writes one dossier to out_path atomically. Returns
+    (pages, size). `key` (the dossier key, computed here if omitted) is
+    printed as the dossier version.
+    """
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = f"{out_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with SessionLocal() as db:
+            case = db.query(models.Case).options(joinedload(models.Case.firm)).filter(models.Case.id == case_id).first()
+            if case is None:
+                raise LookupError(f"Case {case_id} not found")
+            with open(tmp_path, "wb") as f:
+                pages = exporter.write_case_pdf(db, case, f, key or dossier_key(db, case))
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return pages, os.path.getsize(out_path)
+
+
+_pool: Optional[Executor] = None
+_inflight: Dict[str, Future] = {}
+_lock = threading.Lock()
+
+
+def get_pool() -> Executor:
+    global _pool
+    if _pool is None:
+        if PDF_WORKERS > 0:
+            _pool = ProcessPoolExecutor(PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            _pool = ThreadPoolExecutor(1, thread_name_prefix="pdf-render")
+    return _pool
+
+
+def submit(case_id: str, key: str) -> Future:
+    """
+    Queues the render of dossier `key`, or joins the one already in flight.
+    Raises RendererBusy when PDF_QUEUE_SIZE renders are already pending.
+    """
+    with _lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future
+        if len(_inflight) >= PDF_QUEUE_SIZE:
+            raise RendererBusy()
+        future = get_pool().submit(render_pdf, case_id, cache_path(key), key)
+        _inflight[key] = future
+    future.add_done_callback(lambda done: _finished(key, done))
+    return future
+
+
+def _finished(key: str, future: Future):
+    with _lock:
+        _inflight.pop(key, None)
+    if future.cancelled() or future.exception() is not None:
+        logger.error(f"PDF render {key[:12]} failed: {future.exception() if not future.cancelled() else 'cancelled'}")
+        return
+    prune()
+
+
+def prune(max_bytes: int = None) -> int:
+    """Evicts least recently used dossiers until the cache fits. Returns files removed."""
+    max_bytes = PDF_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    files, total = [], 0
+    for root, _, names in os.walk(PDF_CACHE_ROOT):
+        for name in names:
+            if not name.endswith(".pdf"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
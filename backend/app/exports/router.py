@@ -0,0 +1,99 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from app.core import models, database, security
+from . import schemas, service
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+def _progress(job: models.ExportJob) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "format": job.format or "html",
+        "total_cases": job.total_cases or 0,
+        "completed_cases": job.completed_cases or 0,
+        "progress": (job.completed_cases or 0) / job.total_cases if job.total_cases else 1.0,
+        "files_written": job.files_written or 0,
+        "bytes_written": job.bytes_written or 0,
+        "archive_size": job.archive_size,
+        "download_url": f"/api/v1/exports/{job.id}/download" if job.status == "Completed" else None,
+        "last_error": job.last_error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+def _get_job(db: Session, job_id: str, firm_id: str) -> models.ExportJob:
+    job = db.query(models.ExportJob).filter(
+        models.ExportJob.id == job_id,
+        models.ExportJob.firm_id == firm_id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+@router.post("", response_model=schemas.ExportJob, status_code=status.HTTP_202_ACCEPTED)
+def create_export(
+    request: schemas.ExportJobCreate,
+    db: Session = Depends(database.get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
+):
+    """
+    Queues a bulk dossier export. Poll GET /exports/{id} for progress; the
+    archive is downloadable once the job is Completed.
+    """
+    case_ids = list(dict.fromkeys(request.case_ids))
+    if not case_ids:
+        raise HTTPException(status_code=400, detail="No cases requested")
+    if len(case_ids) > service.MAX_EXPORT_CASES:
+        raise HTTPException(status_code=413, detail=f"Export exceeds {service.MAX_EXPORT_CASES} cases")
+    found = {
+        case_id for (case_id,) in db.query(models.Case.id).filter(
+            models.Case.id.in_(case_ids), models.Case.firm_id == current_user.firm_id
+        )
+    }
+    missing = [case_id for case_id in case_ids if case_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Cases not found: {missing[:20]}")
+
+    job = models.ExportJob(
+        id=models.generate_uuid(),
+        firm_id=current_user.firm_id,
+        created_by=current_user.id,
+        case_ids=case_ids,
+        include_evidence=request.include_evidence,
+        format=request.format,
+        total_cases=len(case_ids),
+        completed_cases=0,
+        files_written=0,
+        bytes_written=0
+    )
+    db.add(job)
+    security.log_audit(
+        db, current_user.id, current_user.firm_id, "BULK_EXPORT", "export_jobs", job.id,
+        {"cases": len(case_ids), "include_evidence": request.include_evidence, "format": request.format}
+    )
+    db.commit()
+    service.submit(job.id)
+    return _progress(job)
+
+@router.get("/{job_id}", response_model=schemas.ExportJob)
+def get_export(
+    job_id: str,
+    db: Session = Depends(database.get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
+):
+    return _progress(_get_job(db, job_id, current_user.firm_id))
+
+@router.get("/{job_id}/download")
+def download_export(
+    job_id: str,
+    db: Session = Depends(database.get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
+):
+    job = _get_job(db, job_id, current_user.firm_id)
+    if job.status != "Completed" or not job.archive_path or not os.path.exists(job.archive_path):
+        raise HTTPException(status_code=409, detail=f"Export is {job.status}, archive not available")
+    security.log_audit_async(current_user.id, current_user.firm_id, "DOWNLOAD_EXPORT", "export_jobs", job.id)
+    return FileResponse(job.archive_path, media_type="application/zip", filename=f"veritas-export-{job.id[:8]}.zip")
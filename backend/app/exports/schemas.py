@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+from datetime import datetime
+
+class ExportJobCreate(BaseModel):
+    case_ids: List[str]
+    include_evidence: bool = True
+    format: Literal["html", "pdf"] = "html"
+
+class ExportJob(BaseModel):
+    id: str
+    status: str
+    format: str
+    total_cases: int
+    completed_cases: int
+    progress: float # 0.0 - 1.0
+    files_written: int
+    bytes_written: int
+    archive_size: Optional[int] = None
+    download_url: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,352 @@
+"""
+Bulk dossier export jobs.
+
+A job packs, for each requested case, the rendered dossier and (optionally)
+the case's evidence files into one ZIP archive under EXPORT_ROOT, together
+with a manifest of SHA-256 hashes:
+
+    <case folder>/dossier.html   (or dossier.pdf for PDF jobs)
+    <case folder>/evidence/<stored file name>
+    manifest.json   (path, size, sha256 per entry; evidence also carries its
+                     recorded file_hash and whether the copy matches it)
+    SHA256SUMS      (sha256sum -c compatible)
+
+Dossiers render in a process pool (EXPORT_WORKERS) into temporary files;
+a coordinator thread per job streams those and the evidence files into the
+archive as they complete, hashing every entry on the way in and recording
+progress on the ExportJob row. Nothing is held in memory beyond one copy
+chunk, and API workers only insert the job row.
+
+The archive is written as `<job>.zip.<attempt>.part` and renamed when
+complete.
+
+Jobs are durable: the coordinator leases a job row (locked_by/locked_until)
+before building it and a heartbeat renews the lease while it runs. A sweeper
+thread in each API process (start()) resubmits Pending jobs and Running jobs
+whose lease expired, so jobs queued or running when a process stopped are
+rebuilt from scratch rather than left Pending/Running forever.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import and_, or_, select, update
+from app.core import exporter, models
+from app.core.database import SessionLocal
+from app.evidence import storage
+from . import pdf
+
+logger = logging.getLogger("veritas.exports")
+
+EXPORT_ROOT = os.getenv("EXPORT_ROOT", "exports")
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", 2))  # Render processes; 0 renders in the coordinator thread
+EXPORT_CONCURRENT_JOBS = int(os.getenv("EXPORT_CONCURRENT_JOBS", 1))
+EXPORT_LEASE_SECONDS = int(os.getenv("EXPORT_LEASE_SECONDS", 300))  # Renewed every third of this while running
+MAX_EXPORT_CASES = 500
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Already-compressed formats are stored as-is: deflating them costs CPU for nothing
+STORED_EXTENSIONS = {
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".zip", ".gz", ".7z", ".zst",
+    ".docx", ".xlsx", ".pptx", ".mp3", ".m4a", ".mp4", ".mov", ".avi", ".mkv",
+}
+
+
+def render_dossier(case_id: str, out_path: str, format: str = "html") -> Tuple[str, int]:
+    """Process-pool entry point: renders one dossier to a file. Returns (sha256, size)."""
+    if format == "pdf":
+        pdf.render_pdf(case_id, out_path)
+        with open(out_path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest(), os.path.getsize(out_path)
+    hasher, size = hashlib.sha256(), 0
+    with open(out_path, "wb") as f:
+        for chunk in exporter.stream_case_report(case_id):
+            data = chunk.encode("utf-8")
+            hasher.update(data)
+            f.write(data)
+            size += len(data)
+    return hasher.hexdigest(), size
+
+
+def _folder_name(case: models.Case) -> str:
+    label = re.sub(r"[^A-Za-z0-9._-]+", "_", case.case_number or case.title or "case").strip("._") or "case"
+    return f"{label[:60]}-{case.id[:8]}"
+
+
+def _compression(name: str) -> int:
+    stored = os.path.splitext(name)[1].lower() in STORED_EXTENSIONS
+    return zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+
+
+class ArchiveWriter:
+    """ZIP writer that hashes each entry as it streams in and keeps the manifest."""
+
+    def __init__(self, path: str):
+        self.zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+        self.entries: List[Dict] = []
+        self.bytes_written = 0
+
+    def add_stream(self, name: str, stream, **extra) -> Dict:
+        hasher, size = hashlib.sha256(), 0
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = _compression(name)
+        with self.zip.open(info, "w", force_zip64=True) as out:
+            while chunk := stream.read(COPY_CHUNK_SIZE):
+                hasher.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        return self._record(name, hasher.hexdigest(), size, **extra)
+
+    def add_file(self, name: str, path: str, sha256: str, size: int, **extra) -> Dict:
+        self.zip.write(path, name, compress_type=_compression(name))  # Copies in chunks
+        return self._record(name, sha256, size, **extra)
+
+    def _record(self, name: str, sha256: str, size: int, **extra) -> Dict:
+        entry = {"path": name, "size": size, "sha256": sha256, **extra}
+        self.entries.append(entry)
+        self.bytes_written += size
+        return entry
+
+    def close(self):
+        manifest = json.dumps({"entries": self.entries}, separators=(",", ":")).encode("utf-8")
+        self.zip.writestr("manifest.json", manifest)
+        self.zip.writestr("SHA256SUMS", "".join(
+            f"{e['sha256']}  {e['path']}\n" for e in self.entries if "sha256" in e
+        ))
+        self.zip.close()
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_coordinator: Optional[ThreadPoolExecutor] = None
+_queued: Set[str] = set()  # Job ids submitted to this process's coordinator and not yet finished
+_queued_lock = threading.Lock()
+_sweeper: Optional[threading.Thread] = None
+_stopping = threading.Event()
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseLost(Exception):
+    """Another process reclaimed the job after this one's lease expired."""
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if _pool is None and EXPORT_WORKERS > 0:
+        _pool = ProcessPoolExecutor(EXPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def submit(job_id: str):
+    """Runs the job off the request path, at most EXPORT_CONCURRENT_JOBS at a time."""
+    global _coordinator
+    with _queued_lock:
+        if job_id in _queued:
+            return None
+        _queued.add(job_id)
+        if _coordinator is None:
+            _coordinator = ThreadPoolExecutor(max(1, EXPORT_CONCURRENT_JOBS), thread_name_prefix="export-job")
+    future = _coordinator.submit(run_job, job_id)
+    future.add_done_callback(lambda _: _dequeue(job_id))
+    return future
+
+
+def _dequeue(job_id: str):
+    with _queued_lock:
+        _queued.discard(job_id)
+
+
+def _claimable(now):
+    return or_(
+        models.ExportJob.status == "Pending",
+        and_(models.ExportJob.status == "Running",
+             or_(models.ExportJob.locked_until.is_(None), models.ExportJob.locked_until < now)),
+    )
+
+
+def recover() -> List[str]:
+    """Submits every Pending job and every Running job whose lease has expired. Returns their ids."""
+    with SessionLocal() as db:
+        job_ids = list(db.scalars(
+            select(models.ExportJob.id).where(_claimable(models.utcnow())).order_by(models.ExportJob.created_at)
+        ))
+    for job_id in job_ids:
+        submit(job_id)
+    return job_ids
+
+
+def _sweep():
+    while True:
+        try:
+            recover()
+        except Exception as e:
+            logger.error(f"Export job sweep failed: {e}")
+        if _stopping.wait(EXPORT_LEASE_SECONDS):
+            return
+
+
+def start():
+    """Starts the sweeper that picks up queued and abandoned jobs (API startup)."""
+    global _sweeper
+    if _sweeper is None or not _sweeper.is_alive():
+        _stopping.clear()
+        _sweeper = threading.Thread(target=_sweep, name="export-sweeper", daemon=True)
+        _sweeper.start()
+
+
+def shutdown():
+    global _pool, _coordinator, _sweeper
+    _stopping.set()
+    if _sweeper is not None:
+        _sweeper.join()
+        _sweeper = None
+    if _coordinator is not None:
+        _coordinator.shutdown(wait=True)
+        _coordinator = None
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+
+def _lease_until():
+    return models.utcnow() + timedelta(seconds=EXPORT_LEASE_SECONDS)
+
+
+def _renew(db, job_id: str, **values):
+    """Extends the lease (and writes `values`) while this process holds it; raises LeaseLost otherwise."""
+    renewed = db.execute(
+        update(models.ExportJob)
+        .where(models.ExportJob.id == job_id, models.ExportJob.locked_by == WORKER_ID,
+               models.ExportJob.status == "Running")
+        .values({"locked_until": _lease_until(), **values})
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if not renewed:
+        raise LeaseLost(f"Export job {job_id} was reclaimed by another process")
+
+
+def _heartbeat(job_id: str, stop: threading.Event):
+    with SessionLocal() as db:
+        while not stop.wait(EXPORT_LEASE_SECONDS / 3):
+            try:
+                _renew(db, job_id)
+            except LeaseLost:
+                return
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Export job {job_id}: lease renewal failed: {e}")
+
+
+def _add_evidence(db, archive: ArchiveWriter, case_id: str, folder: str) -> int:
+    written = 0
+    rows = db.query(
+        models.Evidence.id, models.Evidence.storage_path, models.Evidence.file_hash
+    ).filter(models.Evidence.case_id == case_id).order_by(models.Evidence.created_at, models.Evidence.id)
+    for evidence_id, storage_path, file_hash in rows.yield_per(500):
+        if not storage_path:
+            continue
+        # Exhibits can share a stored file name (same bytes and upload name); the id keeps entries apart
+        name = f"{folder}/evidence/{evidence_id}_{os.path.basename(storage_path)}"
+        try:
+            with storage.open_stored(storage_path) as stream:
+                entry = archive.add_stream(name, stream, evidence_id=evidence_id, recorded_sha256=file_hash)
+            entry["verified"] = entry["sha256"] == file_hash
+            written += 1
+        except FileNotFoundError:
+            archive.entries.append({"path": name, "evidence_id": evidence_id, "error": "missing from storage"})
+    return written
+
+
+def _rendered(cases: List[models.Case], scratch: str, format: str):
+    """Yields (case, path, sha256, size) as dossiers finish rendering."""
+    pool = get_pool()
+    if pool is None:
+        for case in cases:
+            out_path = os.path.join(scratch, f"{case.id}.{format}")
+            yield (case, out_path, *render_dossier(case.id, out_path, format))
+        return
+    futures = {}
+    for case in cases:
+        out_path = os.path.join(scratch, f"{case.id}.{format}")
+        futures[pool.submit(render_dossier, case.id, out_path, format)] = (case, out_path)
+    for future in as_completed(futures):
+        yield (*futures[future], *future.result())
+
+
+def run_job(job_id: str):
+    """
+    Builds the archive for one job. The job is leased first, so it runs once
+    at a time; an abandoned job (expired lease) is rebuilt from scratch.
+    """
+    with SessionLocal() as db:
+        now = models.utcnow()
+        claimed = db.execute(
+            update(models.ExportJob)
+            .where(models.ExportJob.id == job_id, _claimable(now))
+            .values(status="Running", locked_by=WORKER_ID, locked_until=_lease_until(), started_at=now,
+                    completed_cases=0, files_written=0, bytes_written=0, last_error=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return
+        job = db.get(models.ExportJob, job_id)
+        cases = db.query(models.Case).filter(
+            models.Case.id.in_(job.case_ids), models.Case.firm_id == job.firm_id
+        ).all()
+
+        os.makedirs(EXPORT_ROOT, exist_ok=True)
+        final_path = os.path.join(EXPORT_ROOT, f"{job.id}.zip")
+        part_path = f"{final_path}.{uuid.uuid4().hex[:8]}.part"  # Per attempt: a stalled holder can't clobber it
+        scratch = tempfile.mkdtemp(prefix=f".{job.id}-", dir=EXPORT_ROOT)
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(job.id, stop), daemon=True)
+        heartbeat.start()
+        completed, files = 0, 0
+        try:
+            archive = ArchiveWriter(part_path)
+            try:
+                format = job.format or "html"
+                for case, out_path, sha256, size in _rendered(cases, scratch, format):
+                    folder = _folder_name(case)
+                    archive.add_file(f"{folder}/dossier.{format}", out_path, sha256, size, case_id=case.id)
+                    os.remove(out_path)
+                    files += 1 + (_add_evidence(db, archive, case.id, folder) if job.include_evidence else 0)
+                    completed += 1
+                    _renew(db, job.id, completed_cases=completed, files_written=files,
+                           bytes_written=archive.bytes_written)
+            finally:
+                archive.close()
+            os.replace(part_path, final_path)
+            _renew(db, job.id, status="Completed", locked_by=None, locked_until=None, archive_path=final_path,
+                   archive_size=os.path.getsize(final_path), finished_at=models.utcnow())
+        except LeaseLost as e:
+            logger.warning(f"{e}; abandoning this attempt")
+            db.rollback()
+        except Exception as e:
+            logger.error(f"Export job {job.id} failed: {e}")
+            db.rollback()
+            try:
+                _renew(db, job.id, status="Failed", locked_by=None, locked_until=None,
+                       last_error=str(e)[:1000], finished_at=models.utcnow())
+            except LeaseLost:
+                pass
+        finally:
+            stop.set()
+            heartbeat.join()
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            shutil.rmtree(scratch, ignore_errors=True)
@@ -0,0 +1,64 @@
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.core import database, security
+from app.core import legacy_schemas
+from . import schemas, service
+
+router = APIRouter(prefix="/calendar", tags=["calendar"])
+
+MAX_WINDOW = timedelta(days=int(os.getenv("CALENDAR_MAX_WINDOW_DAYS", 400)))
+MAX_WINDOW_EVENTS = 5000
+
+def _window(start: datetime, end: datetime):
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    if end - start > MAX_WINDOW:
+        raise HTTPException(status_code=400, detail=f"Window is limited to {MAX_WINDOW.days} days")
+
+@router.get("", response_model=List[legacy_schemas.Event])
+def calendar_window(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    assigned_to: Optional[str] = None,
+    case_id: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=MAX_WINDOW_EVENTS),
+    db: Session = Depends(database.get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
+):
+    """
+    Events overlapping the half-open window [from, to), including ones that
+    started before it and are still running.
+    """
+    _window(start, end)
+    return service.events_in_range(
+        db, current_user.firm_id, start, end, assigned_to=assigned_to, case_id=case_id
+    ).limit(limit).all()
+
+@router.get("/check", response_model=schemas.ConflictCheck)
+def check_availability(
+    assigned_to: str,
+    start_time: datetime,
+    end_time: datetime,
+    exclude_id: Optional[str] = None,
+    db: Session = Depends(database.get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
+):
+    """Would booking this lawyer for [start_time, end_time) double-book them?"""
+    _window(start_time, end_time)
+    conflicts = service.find_conflicts(db, current_user.firm_id, assigned_to, start_time, end_time, exclude_id)
+    return {"assigned_to": assigned_to, "start_time": start_time, "end_time": end_time, "conflicts": conflicts}
+
+@router.get("/conflicts", response_model=schemas.ConflictReport)
+def list_conflicts(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    db: Session = Depends(database.get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
+):
+    """Every pair of overlapping events booked for the same lawyer in [from, to)."""
+    _window(start, end)
+    pairs = service.conflict_report(db, current_user.firm_id, start, end)
+    return {"start": start, "end": end, "pairs": pairs, "truncated": len(pairs) >= service.MAX_CONFLICT_PAIRS}
@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class EventSlot(BaseModel):
+    id: str
+    title: str
+    case_id: Optional[str] = None
+    assigned_to: Optional[str] = None
+    start_time: datetime
+    end_time: datetime
+
+    class Config:
+        from_attributes = True
+
+class ConflictCheck(BaseModel):
+    assigned_to: Optional[str] = None
+    start_time: datetime
+    end_time: datetime
+    conflicts: List[EventSlot]
+
+class ConflictPair(BaseModel):
+    assigned_to: str
+    first: EventSlot
+    second: EventSlot
+
+class ConflictReport(BaseModel):
+    start: datetime
+    end: datetime
+    pairs: List[ConflictPair]
+    truncated: bool = False
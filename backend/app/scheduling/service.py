@@ -0,0 +1,170 @@
+"""
+Calendar range queries and double-booking detection.
+
+Events are half-open intervals [start_time, end_time). Two events overlap
+when each starts before the other ends, which needs an index on *both*
+ends to answer without scanning history:
+
+* PostgreSQL: a GiST index over (firm_id, tstzrange(start, end, '[)'))
+  answers `&&` (overlaps) directly; btree_gist provides the firm_id part.
+* Elsewhere: events no longer than SHORT_EVENT_SPAN must start within
+  [from - SHORT_EVENT_SPAN, to), a bounded B-tree range on start_time.
+  The rare longer events carry `long_running` and are scanned separately;
+  the flag sits before start_time in the indexes so both parts are
+  equality-then-range scans.
+
+Either way the cost of a conflict check depends on how busy the window is,
+not on how many events the firm has ever scheduled, so it runs on every
+event insert.
+
+`long_running` is derived from SHORT_EVENT_SPAN, so after changing
+CALENDAR_SHORT_EVENT_HOURS re-flag existing events:
+    python -m app.scheduling.service --reflag
+"""
+import argparse
+import heapq
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import DDL, and_, case, event, false, func, text, true, update
+from sqlalchemy.orm import Session
+from app.core import models
+
+SHORT_EVENT_SPAN = timedelta(hours=int(os.getenv("CALENDAR_SHORT_EVENT_HOURS", 24)))
+MAX_CONFLICT_PAIRS = 1000
+
+Event = models.Event
+
+# The firm_id column of the GiST index needs btree_gist operator classes
+event.listen(
+    models.Base.metadata, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
+
+
+@event.listens_for(Event, "before_insert")
+@event.listens_for(Event, "before_update")
+def _flag_long_running(mapper, connection, target):
+    target.long_running = bool(
+        target.start_time and target.end_time and target.end_time - target.start_time > SHORT_EVENT_SPAN
+    )
+
+
+def reflag_long_running(connection, span: Optional[timedelta] = None) -> int:
+    """
+    Recomputes `long_running` for every event from its duration (also the
+    backfill run when the column is added). Returns the rows changed.
+    """
+    span = span or SHORT_EVENT_SPAN
+    columns = Event.__table__.c
+    if connection.dialect.name == "postgresql":
+        longer = columns.end_time - columns.start_time > span
+    else:
+        longer = (func.julianday(columns.end_time) - func.julianday(columns.start_time)) * 86400 > span.total_seconds()
+    flag = case((and_(columns.start_time.isnot(None), columns.end_time.isnot(None), longer), true()), else_=false())
+    return connection.execute(
+        update(Event.__table__).where(columns.long_running.is_distinct_from(flag)).values(long_running=flag)
+    ).rowcount
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def overlapping(db: Session, entities: tuple, conditions: list, start: datetime, end: datetime):
+    """
+    Query of `entities` for events overlapping [start, end) that also match
+    `conditions`, shaped for the dialect's index. Elsewhere than PostgreSQL
+    it is a UNION ALL of the bounded short-event range and the long-running
+    events, so each branch gets its own index range scan.
+    """
+    if _is_postgres(db):
+        period = func.tstzrange(Event.start_time, Event.end_time, "[)")
+        return db.query(*entities).filter(*conditions, period.op("&&")(func.tstzrange(start, end, "[)")))
+    overlaps = (Event.start_time < end, Event.end_time > start)
+    short = db.query(*entities).filter(
+        *conditions, *overlaps, Event.long_running == false(), Event.start_time >= start - SHORT_EVENT_SPAN
+    )
+    long = db.query(*entities).filter(*conditions, Event.long_running == true(), *overlaps)
+    return short.union_all(long)
+
+
+def events_in_range(db: Session, firm_id: str, start: datetime, end: datetime,
+                    assigned_to: Optional[str] = None, case_id: Optional[str] = None,
+                    exclude_id: Optional[str] = None):
+    """Query for the firm's events overlapping [start, end), in start order."""
+    conditions = [Event.firm_id == firm_id]
+    if assigned_to:
+        conditions.append(Event.assigned_to == assigned_to)
+    if case_id:
+        conditions.append(Event.case_id == case_id)
+    if exclude_id:
+        conditions.append(Event.id != exclude_id)
+    # No id tie-breaker: ordering by start_time alone is what lets SQLite read each
+    # UNION ALL branch from the equality-then-start_time indexes without a sort
+    return overlapping(db, (Event,), conditions, start, end).order_by(Event.start_time)
+
+
+def lock_assignee(db: Session, firm_id: str, assigned_to: str):
+    """
+    Serializes check-then-insert per lawyer so two concurrent bookings cannot
+    both pass the conflict check. Held until the transaction ends; SQLite
+    already serializes writers.
+    """
+    if _is_postgres(db):
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"calendar:{firm_id}:{assigned_to}"}
+        )
+
+
+def find_conflicts(db: Session, firm_id: str, assigned_to: Optional[str], start: datetime, end: datetime,
+                   exclude_id: Optional[str] = None) -> List[models.Event]:
+    """Events of the same lawyer (on any case) that overlap [start, end)."""
+    if not assigned_to:
+        return []
+    return events_in_range(db, firm_id, start, end, assigned_to=assigned_to, exclude_id=exclude_id).all()
+
+
+def conflict_report(db: Session, firm_id: str, start: datetime, end: datetime,
+                    limit: int = MAX_CONFLICT_PAIRS) -> List[Dict]:
+    """
+    All double-bookings in [start, end): one sweep over the window ordered
+    by (lawyer, start), keeping each lawyer's still-open events in a heap
+    keyed by end time. Every event still open when the next one starts
+    overlaps it, so the cost is O(n log n) plus the pairs reported.
+    """
+    rows = (
+        overlapping(
+            db, (Event.id, Event.assigned_to, Event.case_id, Event.title, Event.start_time, Event.end_time),
+            [Event.firm_id == firm_id, Event.assigned_to.isnot(None)], start, end,
+        )
+        .order_by(Event.assigned_to, Event.start_time)
+        .yield_per(1000)
+    )
+    pairs, lawyer, open_events = [], None, []
+    for row in rows:
+        if row.assigned_to != lawyer:
+            lawyer, open_events = row.assigned_to, []
+        while open_events and open_events[0][0] <= row.start_time:
+            heapq.heappop(open_events)
+        for _, _, other in open_events:
+            pairs.append({"assigned_to": lawyer, "first": other, "second": row})
+            if len(pairs) >= limit:
+                return pairs
+        heapq.heappush(open_events, (row.end_time, row.id, row))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calendar maintenance")
+    parser.add_argument("--reflag", action="store_true",
+                        help="Recompute long_running for all events (after changing CALENDAR_SHORT_EVENT_HOURS)")
+    args = parser.parse_args()
+    if args.reflag:
+        from app.core.database import engine
+        with engine.begin() as connection:
+            print(f"Re-flagged {reflag_long_running(connection)} events")
+
+
+if __name__ == "__main__":
+    main()
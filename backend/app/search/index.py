@@ -0,0 +1,104 @@
+"""
+Unified full-text search index.
+
+Cases, tasks and evidence are projected into one `search_documents` table
+(one row per entity) that is kept current by ORM write hooks in the same
+transaction as the entity itself (app.core.materialized). Ranking is delegated to the database:
+
+* PostgreSQL: a generated, weighted `tsvector` column with a GIN index,
+  ranked with ts_rank_cd.
+* SQLite: an FTS5 external-content index kept in sync by triggers,
+  ranked with bm25().
+
+Rebuild for existing data:
+    python -m app.search.index --rebuild
+"""
+from sqlalchemy import Table, Column, Integer, String, Text, UniqueConstraint, Index, DDL, event
+from app.core import models
+from app.core.database import Base
+from app.core.materialized import MaterializedTable
+
+search_documents = Table(
+    "search_documents",
+    Base.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),  # Stable FTS5 rowid
+    Column("entity_type", String, nullable=False),  # Case, Task, Evidence
+    Column("entity_id", String, nullable=False),
+    Column("firm_id", String, nullable=False),
+    Column("title", Text),
+    Column("body", Text),  # Additional searchable text
+    Column("summary", Text),  # Pre-rendered result description
+    UniqueConstraint("entity_type", "entity_id", name="uq_search_documents_entity"),
+    Index("ix_search_documents_firm", "firm_id"),
+)
+
+# --- Dialect-specific index structures, created/dropped with the table ---
+
+for statement in (
+    "ALTER TABLE search_documents ADD COLUMN document tsvector GENERATED ALWAYS AS ("
+    " setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||"
+    " setweight(to_tsvector('simple', coalesce(body, '')), 'B')) STORED",
+    "CREATE INDEX ix_search_documents_document ON search_documents USING GIN (document)",
+):
+    event.listen(search_documents, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+for statement in (
+    "CREATE VIRTUAL TABLE search_index USING fts5("
+    " title, body, content='search_documents', content_rowid='id', tokenize='unicode61')",
+    "CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN"
+    " INSERT INTO search_index(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN"
+    " INSERT INTO search_index(search_index, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN"
+    " INSERT INTO search_index(search_index, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);"
+    " INSERT INTO search_index(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+):
+    event.listen(search_documents, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(search_documents, "before_drop", DDL("DROP TABLE IF EXISTS search_index").execute_if(dialect="sqlite"))
+
+
+# --- Entity projections ---
+
+def _case_document(case: models.Case) -> dict:
+    return {
+        "title": case.title,
+        "body": " ".join(filter(None, [case.case_number, case.description, case.court, case.judge])),
+        "summary": f"No: {case.case_number} | Status: {case.status}",
+    }
+
+
+def _task_document(task: models.Task) -> dict:
+    return {
+        "title": task.title,
+        "body": task.description,
+        "summary": f"Due: {task.due_date.strftime('%Y-%m-%d') if task.due_date else 'N/A'}",
+    }
+
+
+def _evidence_document(evidence: models.Evidence) -> dict:
+    return {
+        "title": evidence.title,
+        "body": " ".join(filter(None, [evidence.type, evidence.source])),
+        "summary": f"Type: {evidence.type} | Status: {evidence.status}",
+    }
+
+
+INDEXED_ENTITIES = {
+    models.Case: ("Case", _case_document),
+    models.Task: ("Task", _task_document),
+    models.Evidence: ("Evidence", _evidence_document),
+}
+
+
+documents = MaterializedTable(search_documents, INDEXED_ENTITIES, ("firm_id", "title", "body", "summary")).listen()
+index_entity = documents.record
+rebuild = documents.rebuild
+
+
+def main():
+    documents.main("Maintain the full-text search index", "Re-index all cases, tasks and evidence",
+                   "Indexed {} documents")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Query
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import models, database, security
+from . import schemas, semantic
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+@router.get("/semantic", response_model=schemas.SemanticResults)
+async def semantic_search(
+    query: str,
+    k: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: security.Principal = Depends(security.get_current_user_async)
+):
+    """
+    Nearest-neighbour search over evidence content within the caller's firm.
+    Hits cite evidence ids so they can be checked against the exhibit.
+    """
+    hits = await run_in_threadpool(semantic.search, current_user.firm_id, query, k)
+    ids = [hit["evidence_id"] for hit in hits]
+    # Firm-scoped lookup also drops hits for exhibits deleted since indexing
+    evidence = {
+        row.id: row for row in await db.execute(
+            select(models.Evidence.id, models.Evidence.case_id, models.Evidence.title).where(
+                models.Evidence.id.in_(ids), models.Evidence.firm_id == current_user.firm_id
+            )
+        )
+    } if ids else {}
+    items = [
+        {**hit, "case_id": evidence[hit["evidence_id"]].case_id, "title": evidence[hit["evidence_id"]].title}
+        for hit in hits if hit["evidence_id"] in evidence
+    ]
+    return {"query": query, "items": items}
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class SemanticHit(BaseModel):
+    evidence_id: str
+    case_id: str
+    title: Optional[str] = None
+    chunk: int
+    score: float
+    citation: str  # evidence_id, same form as AnalysisClaim.citation
+
+class SemanticResults(BaseModel):
+    query: str
+    items: List[SemanticHit]
@@ -0,0 +1,411 @@
+"""
+Semantic (vector) search over evidence content.
+
+Text is split into overlapping word chunks, embedded with a pluggable local
+embedding function and stored per firm in an approximate nearest-neighbour
+index. Results cite `evidence_id` exactly like AnalysisClaim.citation.
+
+Backends (SEMANTIC_BACKEND):
+
+* local (default): NumPy IVF index over memory-mapped files in
+  SEMANTIC_INDEX_ROOT/<firm_id>/. New vectors are appended to an exact-scan
+  tail; once enough accumulate, k-means re-partitions them into inverted
+  lists and queries probe only the nearest SEMANTIC_NPROBE lists.
+  Embedding and training run in the extraction process pool
+  (app.evidence.extraction), never in an API worker.
+* pgvector: `evidence_embeddings` table with an HNSW cosine index, created
+  once by ensure_schema() at startup.
+
+Embedders: the default HashingEmbedder is deterministic and dependency-free.
+Set SEMANTIC_EMBEDDER="package.module:factory" to plug in a real model; the
+factory returns an object with `dim` and `embed(List[str]) -> ndarray`.
+"""
+import fcntl
+import hashlib
+import importlib
+import json
+import logging
+import os
+import re
+import shutil
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import List, Dict
+import numpy as np
+from sqlalchemy import text
+from app.core.database import engine
+
+logger = logging.getLogger("veritas.search.semantic")
+
+SEMANTIC_BACKEND = os.getenv("SEMANTIC_BACKEND", "local")
+SEMANTIC_INDEX_ROOT = os.getenv("SEMANTIC_INDEX_ROOT", "semantic_index")
+SEMANTIC_DIM = int(os.getenv("SEMANTIC_DIM", 256))
+SEMANTIC_EMBEDDER = os.getenv("SEMANTIC_EMBEDDER")
+SEMANTIC_NPROBE = int(os.getenv("SEMANTIC_NPROBE", 8))
+SEMANTIC_MIN_TRAIN = int(os.getenv("SEMANTIC_MIN_TRAIN", 2048))  # Exact scan below this size
+SEMANTIC_RETRAIN_RATIO = 0.25  # Re-partition once the unindexed tail exceeds this share
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+SEMANTIC_MAX_TEXT_BYTES = int(os.getenv("SEMANTIC_MAX_TEXT_BYTES", 8 * 1024 * 1024))
+
+ID_WIDTH = 36  # UUID4 string length
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbedder:
+    """
+    Feature-hashing bag of unigrams and bigrams, L2-normalized.
+    Deterministic across processes (blake2b, not Python's salted hash()).
+    """
+
+    def __init__(self, dim: int = SEMANTIC_DIM):
+        self.dim = dim
+
+    def _features(self, content: str):
+        words = _WORD.findall(content.lower())
+        yield from words
+        yield from (f"{a} {b}" for a, b in zip(words, words[1:]))
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, content in enumerate(texts):
+            for feature in self._features(content):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                out[row, digest % self.dim] += 1.0 if (digest >> 63) & 1 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+@lru_cache(maxsize=1)
+def get_embedder():
+    if SEMANTIC_EMBEDDER:
+        module_name, factory = SEMANTIC_EMBEDDER.split(":")
+        return getattr(importlib.import_module(module_name), factory)()
+    return HashingEmbedder(SEMANTIC_DIM)
+
+
+def chunk_text(content: str, words_per_chunk: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    words = content.split()
+    if not words:
+        return []
+    step = max(1, words_per_chunk - overlap)
+    return [" ".join(words[i:i + words_per_chunk]) for i in range(0, max(1, len(words) - overlap), step)]
+
+
+def _kmeans(data: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on normalized vectors; returns unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        for c in range(k):
+            members = data[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class LocalANNIndex:
+    """
+    Per-firm IVF index persisted as flat files:
+
+        vectors.f32   N x dim float32 (append-only, memory-mapped for queries)
+        ids.bin       N x 36-byte evidence ids
+        chunks.i32    N chunk numbers
+        ivf-<n>/      inverted lists over the first n vectors, written by _train():
+            centroids.f32   nlist x dim
+            ivf_order.i32   vector ids grouped by list
+            ivf_offsets.i64 nlist + 1 list boundaries
+        state.json    {"trained": n, "nlist": ..., "ivf": "ivf-<n>"}
+
+    Writers hold an exclusive file lock. A retrain publishes a new ivf-<n>
+    directory and then swaps state.json, so a reader that loaded state.json
+    sees one consistent generation; the previous one is kept for readers
+    still using it.
+    """
+
+    RECORD_FILES = (("vectors.f32", None), ("ids.bin", ID_WIDTH), ("chunks.i32", 4))  # name, row width
+    IVF_FILES = ("centroids.f32", "ivf_order.i32", "ivf_offsets.i64")
+
+    def __init__(self, directory: str, dim: int):
+        self.directory = directory
+        self.dim = dim
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, *names: str) -> str:
+        return os.path.join(self.directory, *names)
+
+    def _width(self, name: str) -> int:
+        return dict(self.RECORD_FILES)[name] or self.dim * 4
+
+    @contextmanager
+    def _locked(self):
+        with open(self._path(".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _state(self) -> Dict:
+        try:
+            with open(self._path("state.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"trained": 0, "nlist": 0}
+
+    def _write_atomic(self, path: str, data: bytes):
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def __len__(self) -> int:
+        # Readers never see a half-appended record: count only complete rows in every file
+        sizes = [
+            os.path.getsize(self._path(name)) // self._width(name) if os.path.exists(self._path(name)) else 0
+            for name, _ in self.RECORD_FILES
+        ]
+        return min(sizes)
+
+    def _repair(self) -> int:
+        """Truncates every record file to the complete rows they share (after a crash mid-append)."""
+        count = len(self)
+        for name, _ in self.RECORD_FILES:
+            path = self._path(name)
+            if os.path.exists(path) and os.path.getsize(path) != count * self._width(name):
+                logger.warning(f"Semantic index {self.directory}: truncating {name} to {count} rows")
+                os.truncate(path, count * self._width(name))
+        return count
+
+    def _vectors(self, count: int) -> np.ndarray:
+        if count == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(count, self.dim))
+
+    def add(self, evidence_id: str, vectors: np.ndarray):
+        if len(vectors) == 0:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._locked():
+            self._repair()
+            with open(self._path("vectors.f32"), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._path("ids.bin"), "ab") as f:
+                f.write(evidence_id.encode().ljust(ID_WIDTH)[:ID_WIDTH] * len(vectors))
+            with open(self._path("chunks.i32"), "ab") as f:
+                f.write(np.arange(len(vectors), dtype=np.int32).tobytes())
+
+            total, state = len(self), self._state()
+            tail = total - state["trained"]
+            if total >= SEMANTIC_MIN_TRAIN and tail > SEMANTIC_RETRAIN_RATIO * max(state["trained"], 1):
+                self._train(total)
+
+    def _train(self, count: int):
+        data = np.asarray(self._vectors(count))
+        nlist = max(1, int(np.sqrt(count)))
+        sample = data if count <= 50_000 else data[np.random.default_rng(0).choice(count, 50_000, replace=False)]
+        centroids = _kmeans(sample, nlist)
+
+        assign = np.empty(count, dtype=np.int64)
+        for start in range(0, count, 65_536):
+            assign[start:start + 65_536] = np.argmax(data[start:start + 65_536] @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable").astype(np.int32)
+        offsets = np.searchsorted(assign[order], np.arange(nlist + 1)).astype(np.int64)
+
+        previous = self._state().get("ivf", "")  # "" is the pre-generation layout, in this directory
+        generation = f"ivf-{count}"
+        shutil.rmtree(self._path(generation), ignore_errors=True)  # Left by a crashed train
+        os.makedirs(self._path(generation))
+        self._write_atomic(self._path(generation, "centroids.f32"), centroids.astype(np.float32).tobytes())
+        self._write_atomic(self._path(generation, "ivf_order.i32"), order.tobytes())
+        self._write_atomic(self._path(generation, "ivf_offsets.i64"), offsets.tobytes())
+        self._write_atomic(self._path("state.json"),
+                           json.dumps({"trained": count, "nlist": nlist, "ivf": generation}).encode())
+        for name in os.listdir(self.directory):  # Keep the current and previous generation
+            if name.startswith("ivf-") and name not in (generation, previous):
+                shutil.rmtree(self._path(name), ignore_errors=True)
+            elif name in self.IVF_FILES and previous:
+                os.remove(self._path(name))
+
+    def _snapshot(self):
+        """(state, count, centroids, order, offsets) of one published generation."""
+        for _ in range(3):
+            state, count = self._state(), len(self)
+            if not (state["trained"] and state["nlist"]):
+                return state, count, None, None, None
+            generation = state.get("ivf", "")
+            try:
+                centroids = np.fromfile(self._path(generation, "centroids.f32"), dtype=np.float32)
+                order = np.memmap(self._path(generation, "ivf_order.i32"), dtype=np.int32, mode="r")
+                offsets = np.fromfile(self._path(generation, "ivf_offsets.i64"), dtype=np.int64)
+            except FileNotFoundError:
+                continue  # Two retrains since state.json was read; load the new generation
+            return state, count, centroids.reshape(state["nlist"], self.dim), order, offsets
+        raise RuntimeError(f"Semantic index {self.directory} is changing too fast to read")
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: int = SEMANTIC_NPROBE) -> List[Dict]:
+        state, count, centroids, order, offsets = self._snapshot()
+        if count == 0:
+            return []
+        vectors = self._vectors(count)
+
+        trained = min(state["trained"], count)
+        if centroids is not None:
+            probe = np.argsort(centroids @ query)[::-1][:nprobe]
+            candidates = np.concatenate(
+                [order[offsets[c]:offsets[c + 1]] for c in probe] + [np.arange(trained, count, dtype=np.int32)]
+            )
+        else:
+            candidates = np.arange(count, dtype=np.int32)
+
+        if len(candidates) == 0:
+            return []
+        candidates = np.sort(candidates)  # Sequential memmap access
+        scores = np.asarray(vectors[candidates]) @ query
+        # Over-fetch chunks so that k distinct exhibits survive de-duplication
+        take = min(len(scores), k * 4)
+        top = np.argpartition(-scores, take - 1)[:take]
+        top = top[np.argsort(-scores[top])]
+
+        ids = np.memmap(self._path("ids.bin"), dtype=f"S{ID_WIDTH}", mode="r", shape=(count,))
+        chunks = np.memmap(self._path("chunks.i32"), dtype=np.int32, mode="r", shape=(count,))
+        hits, seen = [], set()
+        for i in top:
+            row = int(candidates[i])
+            evidence_id = ids[row].decode().strip()
+            if evidence_id in seen:
+                continue
+            seen.add(evidence_id)
+            hits.append({"evidence_id": evidence_id, "chunk": int(chunks[row]), "score": float(scores[i])})
+            if len(hits) == k:
+                break
+        return hits
+
+
+def ensure_schema():
+    """
+    Creates the pgvector extension, table and indexes. Run once at startup
+    (main.py) and by the backfill command; a no-op for the local backend.
+    """
+    if SEMANTIC_BACKEND != "pgvector":
+        return
+    dim = get_embedder().dim
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS evidence_embeddings ("
+            " id BIGSERIAL PRIMARY KEY, firm_id TEXT NOT NULL, evidence_id TEXT NOT NULL,"
+            f" chunk INTEGER NOT NULL, embedding vector({dim}) NOT NULL)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_evidence_embeddings_hnsw"
+            " ON evidence_embeddings USING hnsw (embedding vector_cosine_ops)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_evidence_embeddings_firm ON evidence_embeddings (firm_id)"
+        ))
+
+
+class PgVectorIndex:
+    """
+    pgvector backend: one table for all firms, HNSW cosine index (schema
+    from ensure_schema()). Searches use iterative index scans (pgvector
+    >= 0.8) so the firm filter is applied inside the scan and small firms
+    still get k results.
+    """
+
+    MAX_SCAN_TUPLES = 20000  # Per query; bounds the scan for firms with few matching rows
+
+    def __init__(self, firm_id: str, dim: int):
+        self.firm_id = firm_id
+        self.dim = dim
+
+    @staticmethod
+    def _literal(vector: np.ndarray) -> str:
+        return "[" + ",".join(f"{x:.6f}" for x in vector) + "]"
+
+    def add(self, evidence_id: str, vectors: np.ndarray):
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO evidence_embeddings (firm_id, evidence_id, chunk, embedding)"
+                     " VALUES (:firm_id, :evidence_id, :chunk, CAST(:embedding AS vector))"),
+                [
+                    {"firm_id": self.firm_id, "evidence_id": evidence_id, "chunk": i, "embedding": self._literal(v)}
+                    for i, v in enumerate(vectors)
+                ],
+            )
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: int = None) -> List[Dict]:
+        fetch = k * 4
+        with engine.begin() as conn:
+            # Keep scanning the HNSW graph until LIMIT rows pass the firm filter
+            conn.execute(text("SET LOCAL hnsw.iterative_scan = relaxed_order"))
+            conn.execute(text(f"SET LOCAL hnsw.max_scan_tuples = {self.MAX_SCAN_TUPLES}"))
+            while True:
+                rows = conn.execute(
+                    text("SELECT DISTINCT ON (evidence_id) evidence_id, chunk, score, count(*) OVER () FROM ("
+                         " SELECT evidence_id, chunk, 1 - (embedding <=> CAST(:q AS vector)) AS score"
+                         " FROM evidence_embeddings WHERE firm_id = :firm_id"
+                         " ORDER BY embedding <=> CAST(:q AS vector) LIMIT :fetch) nearest"
+                         " ORDER BY evidence_id, score DESC"),
+                    {"q": self._literal(query), "firm_id": self.firm_id, "fetch": fetch},
+                ).all()
+                # Chunks of one exhibit collapse to one hit: widen until k exhibits or the firm runs out of chunks
+                scanned = rows[0][3] if rows else 0
+                if len(rows) >= k or scanned < fetch or fetch >= self.MAX_SCAN_TUPLES:
+                    break
+                fetch *= 4
+        # relaxed_order may return neighbours slightly out of order: rank here
+        hits = sorted(({"evidence_id": r[0], "chunk": r[1], "score": float(r[2])} for r in rows),
+                      key=lambda h: -h["score"])
+        return hits[:k]
+
+
+@lru_cache(maxsize=None)
+def _pgvector_index(firm_id: str, dim: int) -> PgVectorIndex:
+    return PgVectorIndex(firm_id, dim)
+
+
+def get_index(firm_id: str, index_root: str = None):
+    dim = get_embedder().dim
+    if SEMANTIC_BACKEND == "pgvector":
+        return _pgvector_index(firm_id, dim)
+    return LocalANNIndex(os.path.join(index_root or SEMANTIC_INDEX_ROOT, os.path.basename(firm_id)), dim)
+
+
+def index_text(firm_id: str, evidence_id: str, content: str, index_root: str = None) -> int:
+    """Chunks, embeds and indexes text for one exhibit. Returns the chunk count."""
+    chunks = chunk_text(content)
+    if chunks:
+        get_index(firm_id, index_root).add(evidence_id, get_embedder().embed(chunks))
+    return len(chunks)
+
+
+def index_extracted(firm_id: str, evidence_id: str, file_hash: str,
+                    store_root: str = None, index_root: str = None) -> int:
+    """
+    Process-pool entry point: indexes an exhibit from the extracted-text store
+    (see app.evidence.extraction). Returns 0 when no text was extracted for
+    its content.
+    """
+    from app.evidence.textstore import TextStore
+    extracted = TextStore(store_root).open(file_hash)
+    if extracted is None:
+        return 0
+    with extracted:
+        return index_text(firm_id, evidence_id, extracted.text(SEMANTIC_MAX_TEXT_BYTES), index_root)
+
+
+def search(firm_id: str, query: str, k: int = 10) -> List[Dict]:
+    if not query.strip():
+        return []
+    vector = get_embedder().embed([query])[0]
+    hits = get_index(firm_id).search(vector, k)
+    for hit in hits:
+        hit["citation"] = hit["evidence_id"]
+    return hits
@@ -0,0 +1,152 @@
+"""
+Search queries over the unified index (see app.search.index).
+
+A single ranked query covers every entity type; the database does matching
+(GIN / FTS5), ranking (ts_rank_cd / bm25) and top-k selection, and pages
+are continued with a keyset cursor on (score, document id). Facet counts
+per entity type come from a GROUP BY over the same match, so no rows are
+fetched for them.
+"""
+import heapq
+import re
+from typing import List, Dict, Optional
+from sqlalchemy import text, or_, select
+from sqlalchemy.orm import Session
+from app.core.pagination import encode_cursor, decode_cursor
+from .index import search_documents
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(query: str) -> List[str]:
+    return _TOKEN.findall(query.lower())
+
+
+def _fts5_query(terms: List[str]) -> str:
+    # Every term must match, as a prefix; quoting neutralizes FTS5 operators
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _tsquery(terms: List[str]) -> str:
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+# Per-dialect (FROM/WHERE of the match, score expression)
+_SQLITE_MATCH = (
+    "FROM search_index JOIN search_documents d ON d.id = search_index.rowid "
+    "WHERE search_index MATCH :match AND d.firm_id = :firm_id",
+    "-bm25(search_index, 10.0, 1.0)",
+)
+_POSTGRES_MATCH = (
+    "FROM search_documents d, to_tsquery('simple', :match) q "
+    "WHERE d.firm_id = :firm_id AND d.document @@ q",
+    "ts_rank_cd(d.document, q)",
+)
+
+
+def _page_sql(match_sql: str, score_sql: str, entity_type: Optional[str]):
+    type_filter = " AND d.entity_type = :entity_type" if entity_type else ""
+    return text(f"""
+        SELECT doc_id, entity_type, entity_id, title, summary, score FROM (
+            SELECT d.id AS doc_id, d.entity_type, d.entity_id, d.title, d.summary, {score_sql} AS score
+            {match_sql}{type_filter}
+        ) ranked
+        WHERE :after_score IS NULL OR score < :after_score OR (score = :after_score AND doc_id > :after_id)
+        ORDER BY score DESC, doc_id ASC
+        LIMIT :limit
+    """)
+
+
+def _facet_sql(match_sql: str):
+    return text(f"SELECT d.entity_type, count(*) {match_sql} GROUP BY d.entity_type")
+
+
+def _relevance(score: float) -> float:
+    """Maps unbounded rank scores onto [0, 1) monotonically, stable across pages."""
+    return round(score / (1.0 + score), 4) if score > 0 else 0.0
+
+
+def _fallback_page(db: Session, firm_id: str, query: str, terms: List[str], limit: int,
+                   after, entity_type: Optional[str]):
+    """
+    Generic-dialect path: streams candidate rows and keeps the top-k in a
+    bounded heap instead of materializing and sorting every match.
+    """
+    d = search_documents.c
+    pattern = f"%{query}%"
+    stmt = select(d.id, d.entity_type, d.entity_id, d.title, d.summary, d.body).where(
+        d.firm_id == firm_id, or_(d.title.ilike(pattern), d.body.ilike(pattern))
+    )
+    if entity_type:
+        stmt = stmt.where(d.entity_type == entity_type)
+
+    def score(row) -> float:
+        haystack = f"{row.title or ''} {row.body or ''}".lower()
+        return float(sum(haystack.count(term) for term in terms) + (2 if query.lower() in (row.title or "").lower() else 0))
+
+    def candidates():
+        for row in db.execute(stmt.execution_options(yield_per=1000)):
+            s = score(row)
+            if after and (s > after[0] or (s == after[0] and row.id <= after[1])):
+                continue
+            yield (row.id, row.entity_type, row.entity_id, row.title, row.summary, s)
+
+    top = heapq.nsmallest(limit, candidates(), key=lambda r: (-r[5], r[0]))
+    facets = {}
+    for (entity,) in db.execute(select(d.entity_type).where(
+        d.firm_id == firm_id, or_(d.title.ilike(pattern), d.body.ilike(pattern))
+    )):
+        facets[entity] = facets.get(entity, 0) + 1
+    return top, facets
+
+
+def search(db: Session, firm_id: str, query: str, limit: int = DEFAULT_LIMIT,
+           cursor: Optional[str] = None, entity_type: Optional[str] = None) -> Dict:
+    """
+    Returns {"items", "next_cursor", "facets"}. Facets are computed on the
+    first page only (cursor is None); later pages return an empty mapping.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    terms = tokenize(query)
+    if not terms:
+        return {"items": [], "next_cursor": None, "facets": {}}
+
+    after = decode_cursor(cursor) if cursor else None
+    params = {
+        "firm_id": firm_id,
+        "entity_type": entity_type,
+        "after_score": after[0] if after else None,
+        "after_id": after[1] if after else None,
+        "limit": limit + 1,
+    }
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        match_sql, score_sql = _SQLITE_MATCH if dialect == "sqlite" else _POSTGRES_MATCH
+        params["match"] = _fts5_query(terms) if dialect == "sqlite" else _tsquery(terms)
+        rows = db.execute(_page_sql(match_sql, score_sql, entity_type), params).all()
+        facets = {} if cursor else dict(db.execute(_facet_sql(match_sql), params).all())
+    else:
+        rows, facets = _fallback_page(db, firm_id, query, terms, limit + 1, after, entity_type)
+        facets = {} if cursor else facets
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([float(last[5]), last[0]])
+
+    items = [
+        {
+            "type": entity,
+            "id": entity_id,
+            "title": title,
+            "description": summary,
+            "relevance": _relevance(float(score)),
+        }
+        for _, entity, entity_id, title, summary, score in rows
+    ]
+    return {"items": items, "next_cursor": next_cursor, "facets": facets}
@@ -0,0 +1,66 @@
+"""
+Throughput benchmark for the analysis job queue.
+
+Enqueues JOBS analysis jobs and drains them with 1..MAX worker processes,
+reporting jobs/sec per pool size. Run it against PostgreSQL for meaningful
+numbers; SQLite serializes writers.
+
+Usage:
+    ANALYSIS_SIMULATED_LATENCY=0.2 python -m benchmarks.bench_analysis_queue --jobs 200 --max-workers 8
+"""
+import argparse
+import multiprocessing
+import time
+
+from app.core.database import Base, engine, SessionLocal
+from app.core import models
+from app.analysis import queue, worker
+
+
+def seed(jobs: int):
+    with SessionLocal() as db:
+        firm = models.Firm(name="Bench Firm")
+        db.add(firm)
+        db.flush()
+        case = models.Case(title="Bench Case", firm_id=firm.id, metadata_fields={})
+        db.add(case)
+        db.flush()
+        ev = models.Evidence(case_id=case.id, title="Bench Exhibit", firm_id=firm.id, audit_chain=[])
+        db.add(ev)
+        db.flush()
+        for _ in range(jobs):
+            queue.enqueue(db, ev.id, firm.id)
+        db.commit()
+
+
+def drain(workers: int) -> float:
+    ctx = multiprocessing.get_context("spawn")
+    procs = [
+        ctx.Process(target=worker.run_worker, args=(f"bench-{i}",), kwargs={"stop_when_idle": True})
+        for i in range(workers)
+    ]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--max-workers", type=int, default=8)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    workers = 1
+    while workers <= args.max_workers:
+        seed(args.jobs)
+        elapsed = drain(workers)
+        print(f"workers={workers} jobs={args.jobs} elapsed={elapsed:.2f}s throughput={args.jobs / elapsed:.1f} jobs/s")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
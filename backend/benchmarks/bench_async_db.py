@@ -0,0 +1,156 @@
+"""
+Throughput benchmark: async endpoints on the sync Session vs the AsyncSession.
+
+Mixed concurrent traffic (READ_SHARE status reads, the rest analysis
+triggers) is driven in-process through httpx's ASGI transport, so one event
+loop serves every request, like a single uvicorn worker. The "blocking"
+variant mounts the previous implementations (`async def` routes querying
+the sync SessionLocal); the "async" variant hits the real routes.
+A `bench_sleep(ms)` SQL function adds per-query latency to model a remote
+database, which is where blocking the loop hurts.
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db ENVIRONMENT=staging \\
+        python -m benchmarks.bench_async_db --concurrency 32 --seconds 10 --query-ms 5
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+import uuid
+
+import httpx
+from fastapi import Depends, HTTPException
+from sqlalchemy import event
+
+from main import app, api_v1
+from app.analysis import queue
+from app.core import models, security
+from app.core.database import Base, SessionLocal, engine, async_engine
+
+READ_SHARE = 0.8
+
+
+def install_latency(query_ms: float):
+    def sleep_ms(ms):
+        time.sleep(ms / 1000)
+        return 0
+
+    def register(dbapi_conn, _record):
+        dbapi_conn.create_function("bench_sleep", 1, sleep_ms)
+
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "connect", register)
+    engine.dispose()  # Pooled connections predate the function
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute", retval=True)
+    def add_latency(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and query_ms:
+            statement = f"SELECT * FROM ({statement}) WHERE bench_sleep({query_ms}) = 0"
+        return statement, parameters
+
+
+def mount_blocking_routes():
+    """The pre-AsyncSession handlers, kept here for comparison only."""
+
+    @api_v1.get("/bench/blocking/{evidence_id}/status")
+    async def blocking_status(evidence_id: str, current_user: security.Principal = Depends(security.get_current_user)):
+        with SessionLocal() as db:
+            job = db.query(models.AnalysisJob).filter(
+                models.AnalysisJob.evidence_id == evidence_id,
+                models.AnalysisJob.firm_id == current_user.firm_id
+            ).order_by(models.AnalysisJob.created_at.desc()).first()
+            if not job:
+                raise HTTPException(status_code=404)
+            return {"id": job.id, "status": job.status}
+
+    @api_v1.post("/bench/blocking/{evidence_id}")
+    async def blocking_trigger(evidence_id: str, current_user: security.Principal = Depends(security.get_current_user)):
+        with SessionLocal() as db:
+            evidence = db.query(models.Evidence).filter(
+                models.Evidence.id == evidence_id, models.Evidence.firm_id == current_user.firm_id
+            ).first()
+            if not evidence:
+                raise HTTPException(status_code=404)
+            job = queue.enqueue(db, evidence_id, current_user.firm_id)
+            db.flush()
+            security.log_audit(db, current_user.id, current_user.firm_id, "TRIGGER_ANALYSIS", "analysis_jobs", job.id)
+            db.commit()
+            return {"id": job.id, "status": job.status}
+
+
+def seed(evidence_count: int = 20):
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        firm = models.Firm(name="Bench Firm")
+        db.add(firm)
+        db.flush()
+        user = models.User(email=f"bench_{uuid.uuid4().hex[:8]}@example.com", role="Lawyer", firm_id=firm.id)
+        case = models.Case(title="Bench", case_number=f"B-{uuid.uuid4().hex[:6]}", firm_id=firm.id)
+        db.add_all([user, case])
+        db.flush()
+        evidence = [models.Evidence(title=f"E{i}", case_id=case.id, firm_id=firm.id, file_hash=f"{i:064x}")
+                    for i in range(evidence_count)]
+        db.add_all(evidence)
+        db.flush()
+        for item in evidence:
+            queue.enqueue(db, item.id, firm.id)
+        db.commit()
+        return security.create_access_token({"sub": user.email}), [e.id for e in evidence]
+
+
+async def drive(client, headers, evidence_ids, path_for, concurrency: int, seconds: float):
+    deadline = time.perf_counter() + seconds
+    counts = {"ok": 0, "error": 0}
+
+    async def user_loop():
+        while time.perf_counter() < deadline:
+            evidence_id = random.choice(evidence_ids)
+            try:
+                if random.random() < READ_SHARE:
+                    res = await client.get(path_for("read", evidence_id), headers=headers)
+                else:
+                    res = await client.post(path_for("write", evidence_id), headers=headers)
+                counts["ok" if res.status_code == 200 else "error"] += 1
+            except Exception:
+                counts["error"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user_loop() for _ in range(concurrency)))
+    return counts, time.perf_counter() - start
+
+
+async def main_async(args):
+    token, evidence_ids = seed()
+    headers = {"Authorization": f"Bearer {token}"}
+    variants = {
+        "blocking": lambda kind, eid: f"/api/v1/bench/blocking/{eid}" + ("/status" if kind == "read" else ""),
+        "async": lambda kind, eid: f"/api/v1/analysis/{eid}" + ("/status" if kind == "read" else ""),
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, path_for in variants.items():
+            # Warm the principal cache: with 32 cold misses at once, the blocking
+            # variant can deadlock (loop waits on a pool slot that only the loop frees)
+            await client.get(path_for("read", evidence_ids[0]), headers=headers)
+            counts, elapsed = await drive(client, headers, evidence_ids, path_for, args.concurrency, args.seconds)
+            print(f"{name:>9}: {counts['ok'] / elapsed:8.1f} req/s  ok={counts['ok']} errors={counts['error']}")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--query-ms", type=float, default=5)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    install_latency(args.query_ms)
+    mount_blocking_routes()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
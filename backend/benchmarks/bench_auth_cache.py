@@ -0,0 +1,60 @@
+"""
+Latency benchmark for the authenticated-principal cache.
+
+Issues REQUESTS authenticated GETs against a hot read endpoint with the
+cache disabled and then enabled, and reports p50/p95 per mode.
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db ENVIRONMENT=staging python -m benchmarks.bench_auth_cache --requests 2000
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from fastapi.testclient import TestClient
+
+from main import app
+from app.core import models, security
+from app.core.database import SessionLocal
+
+
+def seed() -> str:
+    with SessionLocal() as db:
+        firm = models.Firm(name="Bench Firm")
+        db.add(firm)
+        db.flush()
+        user = models.User(email=f"bench_{uuid.uuid4().hex[:8]}@example.com", role="Lawyer", firm_id=firm.id)
+        db.add(user)
+        db.commit()
+        return security.create_access_token({"sub": user.email})
+
+
+def measure(client: TestClient, headers: dict, requests: int):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get("/api/v1/cases/", headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {seed()}"}
+    cache = security._principal_cache
+    with TestClient(app) as client:
+        for label, ttl in (("uncached", 0), ("cached", security.PRINCIPAL_CACHE_TTL or 60)):
+            cache.clear()
+            cache.ttl = ttl
+            client.get("/api/v1/cases/", headers=headers)  # Warm-up
+            p50, p95 = measure(client, headers, args.requests)
+            print(f"{label:>9}: p50={p50:.3f}ms p95={p95:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
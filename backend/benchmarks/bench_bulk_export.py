@@ -0,0 +1,91 @@
+"""
+Bulk export job benchmark: archive build time with dossiers rendered inline
+vs in the render process pool, plus the coordinator's peak RSS.
+
+Seeds one firm with CASES cases of EXHIBITS small (incompressible, .pdf) files each and
+runs app.exports.service.run_job directly (no HTTP).
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db ENVIRONMENT=staging python -m benchmarks.bench_bulk_export --cases 40 --exhibits 200
+"""
+import argparse
+import hashlib
+import logging
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime
+
+from app.core import models
+from app.core.database import Base, SessionLocal, engine, ensure_indexes
+from app.exports import service
+
+
+def seed(cases: int, exhibits: int, root: str) -> tuple:
+    with SessionLocal() as db:
+        firm = models.Firm(name="Bench Firm")
+        db.add(firm)
+        db.flush()
+        case_ids, rows = [], []
+        for i in range(cases):
+            case = models.Case(id=models.generate_uuid(), title=f"Matter {i}", case_number=f"BX-{i}",
+                               description="Commercial dispute " * 10, firm_id=firm.id, metadata_fields={})
+            db.add(case)
+            case_ids.append(case.id)
+            for j in range(exhibits):
+                content = os.urandom(16 * 1024)
+                file_hash = hashlib.sha256(content).hexdigest()
+                path = os.path.join(root, f"{file_hash}_exhibit{j}.pdf")
+                with open(path, "wb") as f:
+                    f.write(content)
+                rows.append(dict(id=models.generate_uuid(), case_id=case.id, firm_id=firm.id, title=f"Exhibit {j}",
+                                 type="Document", source="Client", collected_at=datetime.utcnow(),
+                                 file_hash=file_hash, storage_path=path, status="Verified"))
+        db.flush()
+        db.execute(models.Evidence.__table__.insert(), rows)
+        db.commit()
+        return firm.id, case_ids
+
+
+def run(firm_id: str, case_ids: list, workers: int) -> float:
+    service.EXPORT_WORKERS = workers
+    with SessionLocal() as db:
+        job = models.ExportJob(firm_id=firm_id, case_ids=case_ids, include_evidence=True,
+                               total_cases=len(case_ids), completed_cases=0, files_written=0, bytes_written=0)
+        db.add(job)
+        db.commit()
+        job_id = job.id
+    if workers:
+        service.get_pool().submit(int, 0).result()  # Start the workers outside the timing
+    start = time.perf_counter()
+    service.run_job(job_id)
+    elapsed = time.perf_counter() - start
+    with SessionLocal() as db:
+        job = db.get(models.ExportJob, job_id)
+        print(f"workers={workers}: {elapsed:6.2f}s  {job.status}  files={job.files_written}  "
+              f"archive={job.archive_size / 1024 / 1024:.1f} MiB")
+    service.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=40)
+    parser.add_argument("--exhibits", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes()
+    with tempfile.TemporaryDirectory() as root:
+        service.EXPORT_ROOT = os.path.join(root, "exports")
+        firm_id, case_ids = seed(args.cases, args.exhibits, root)
+        for workers in (0, args.workers):
+            run(firm_id, case_ids, workers)
+    print(f"coordinator peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Calendar range / conflict-check benchmark.
+
+Seeds one firm with a year of bookings for LAWYERS lawyers (EVENTS_PER_DAY
+short events per working day each, plus a multi-day trial a month), then
+times per-insert conflict checks late in the year, a one-week window query
+and the full-year conflict report. The naive check (start < to AND
+end > from) is timed alongside: its start_time bound alone does not stop the
+scan, so it reads everything the lawyer booked before the window.
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db ENVIRONMENT=staging python -m benchmarks.bench_calendar --lawyers 20
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.core import models
+from app.core.database import Base, SessionLocal, engine, ensure_indexes
+from app.scheduling import service
+
+YEAR = datetime(2030, 1, 1)
+
+
+def seed(lawyers: int, per_day: int) -> tuple:
+    rng = random.Random(7)
+    with SessionLocal() as db:
+        firm = models.Firm(name="Bench Firm")
+        db.add(firm)
+        db.flush()
+        users = [models.User(email=f"bench_{uuid.uuid4().hex[:8]}@example.com", role="Lawyer", firm_id=firm.id)
+                 for _ in range(lawyers)]
+        db.add_all(users)
+        db.flush()
+        rows = []
+        for user in users:
+            for day in range(365):
+                date = YEAR + timedelta(days=day)
+                if date.weekday() >= 5:
+                    continue
+                for slot in range(per_day):
+                    start = date + timedelta(hours=8 + slot * 9 / per_day, minutes=rng.choice((0, 15, 30)))
+                    rows.append(dict(title="Meeting", start_time=start, end_time=start + timedelta(minutes=45),
+                                     assigned_to=user.id, firm_id=firm.id))
+                if date.day == 10:
+                    rows.append(dict(title="Trial", start_time=date, end_time=date + timedelta(days=4),
+                                     assigned_to=user.id, firm_id=firm.id))
+        for row in rows:
+            row.update(id=models.generate_uuid(),
+                       long_running=row["end_time"] - row["start_time"] > service.SHORT_EVENT_SPAN)
+        db.execute(models.Event.__table__.insert(), rows)
+        db.commit()
+        return firm.id, [u.id for u in users], len(rows)
+
+
+def naive_conflicts(db, firm_id, assigned_to, start, end):
+    return db.query(models.Event).filter(
+        models.Event.firm_id == firm_id, models.Event.assigned_to == assigned_to,
+        models.Event.start_time < end, models.Event.end_time > start,
+    ).all()
+
+
+def timed(fn, runs):
+    timings = []
+    for _ in range(runs):
+        began = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - began) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lawyers", type=int, default=20)
+    parser.add_argument("--per-day", type=int, default=6)
+    parser.add_argument("--checks", type=int, default=200)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes()
+    firm_id, lawyers, count = seed(args.lawyers, args.per_day)
+    print(f"seeded {count} events for {args.lawyers} lawyers")
+
+    rng = random.Random(11)
+    probes = [(rng.choice(lawyers), YEAR + timedelta(days=rng.randint(300, 360), hours=rng.randint(8, 16)))
+              for _ in range(args.checks)]
+    with SessionLocal() as db:
+        for name, check in (("indexed", service.find_conflicts), ("naive", naive_conflicts)):
+            it = iter(probes * 2)
+
+            def one():
+                lawyer, start = next(it)
+                check(db, firm_id, lawyer, start, start + timedelta(hours=1))
+            print(f"conflict check ({name:>7}): p50={timed(one, args.checks):7.2f}ms")
+
+        week = YEAR + timedelta(days=330)
+        print(f"week window:       p50={timed(lambda: service.events_in_range(db, firm_id, week, week + timedelta(days=7)).all(), 20):7.2f}ms")
+        pairs = []
+        report_ms = timed(lambda: pairs.append(len(service.conflict_report(db, firm_id, YEAR, YEAR + timedelta(days=365)))), 3)
+        print(f"year report:       p50={report_ms:7.2f}ms  pairs={pairs[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Payload/latency benchmark for list_cases: full vs ?view=summary vs ?fields=.
+
+Seeds one firm with CASES cases of EVIDENCE exhibits each (each exhibit
+each with a few custody events), then fetches pages of PAGE cases.
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db ENVIRONMENT=staging python -m benchmarks.bench_case_list --cases 200 --evidence 25
+"""
+import argparse
+import logging
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from main import app
+from app.core import models, security
+from app.core.database import SessionLocal
+from app.evidence import custody
+
+
+def seed(cases: int, evidence: int) -> str:
+    with SessionLocal() as db:
+        firm = models.Firm(name="Bench Firm")
+        db.add(firm)
+        db.flush()
+        user = models.User(email=f"bench_{uuid.uuid4().hex[:8]}@example.com", role="Lawyer", firm_id=firm.id)
+        db.add(user)
+        for i in range(cases):
+            case = models.Case(id=models.generate_uuid(), title=f"Matter {i}", case_number=f"BL-{uuid.uuid4().hex[:8]}",
+                               description="Commercial dispute " * 10, court="High Court", judge="Judge",
+                               case_types=["Civil"], metadata_fields={}, firm_id=firm.id)
+            db.add(case)
+            for j in range(evidence):
+                exhibit = models.Evidence(id=models.generate_uuid(), title=f"Exhibit {j}", type="Document",
+                                          source="Client", collected_at=datetime.utcnow(), case_id=case.id,
+                                          firm_id=firm.id, file_hash=uuid.uuid4().hex * 2, status="Verified")
+                db.add(exhibit)
+                for _ in range(3):
+                    custody.record_event(db, exhibit, "Uploaded", user.email, hash=uuid.uuid4().hex * 2,
+                                         previous_hash=uuid.uuid4().hex * 2)
+        db.commit()
+        return security.create_access_token({"sub": user.email})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--evidence", type=int, default=25)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=30)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    headers = {"Authorization": f"Bearer {seed(args.cases, args.evidence)}"}
+    modes = {
+        "full": {},
+        "summary": {"view": "summary"},
+        "fields": {"fields": "title,case_number,status"},
+    }
+    with TestClient(app) as client:
+        for name, params in modes.items():
+            params = {**params, "limit": args.page}
+            client.get("/api/v1/cases/", params=params, headers=headers)  # Warm-up
+            timings, size = [], 0
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                res = client.get("/api/v1/cases/", params=params, headers=headers)
+                timings.append((time.perf_counter() - start) * 1000)
+                size = len(res.content)
+            print(f"{name:>8}: {size / 1024:9.1f} KiB  p50={statistics.median(timings):7.1f}ms  "
+                  f"p95={statistics.quantiles(timings, n=20)[18]:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
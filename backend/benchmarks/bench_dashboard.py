@@ -0,0 +1,94 @@
+"""
+Dashboard benchmark: firm stats from the rollups vs. what the frontend did
+before (pull every case, evidence row, task, event and invoice of the firm
+and count client-side), plus the cost of a full `rollups.refresh()`.
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db ENVIRONMENT=staging python -m benchmarks.bench_dashboard --cases 5000
+"""
+import argparse
+import json
+import logging
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from app.core import models
+from app.core.database import Base, SessionLocal, engine, ensure_indexes
+from app.dashboard import rollups, service
+
+
+def seed(cases: int) -> str:
+    rng = random.Random(7)
+    now = models.utcnow()
+    with SessionLocal() as db:
+        firm = models.Firm(name="Bench Firm")
+        db.add(firm)
+        db.flush()
+        case_rows, evidence, tasks, events, invoices = [], [], [], [], []
+        for i in range(cases):
+            case_id = models.generate_uuid()
+            case_rows.append(dict(id=case_id, title=f"Matter {i}", case_number=f"DB-{uuid.uuid4().hex[:10]}",
+                                  firm_id=firm.id, status=rng.choice(["Open", "Closed", "Pending", "Appealed"])))
+            common = dict(case_id=case_id, firm_id=firm.id)
+            evidence += [dict(id=models.generate_uuid(), title=f"Exhibit {j}", status=rng.choice(["Pending", "Verified", "Conflict Detected"]),
+                              **common) for j in range(10)]
+            tasks += [dict(id=models.generate_uuid(), title=f"Task {j}", status=rng.choice(["Pending", "In Progress", "Completed"]),
+                           due_date=now + timedelta(days=rng.randint(-60, 60)), **common) for j in range(3)]
+            start = now + timedelta(days=rng.randint(-60, 60), hours=rng.randint(0, 23))
+            events.append(dict(id=models.generate_uuid(), title="Hearing", start_time=start, end_time=start + timedelta(hours=1), **common))
+            invoices += [dict(id=models.generate_uuid(), total_amount=rng.randint(1000, 100000), status=rng.choice(["Draft", "Sent", "Paid", "Overdue"]),
+                              due_date=now + timedelta(days=rng.randint(-60, 60)), **common) for j in range(2)]
+        for model, rows in ((models.Case, case_rows), (models.Evidence, evidence), (models.Task, tasks),
+                            (models.Event, events), (models.Invoice, invoices)):
+            db.execute(model.__table__.insert(), rows)
+        db.commit()
+        return firm.id
+
+
+def client_side(firm_id: str) -> tuple:
+    """The old dashboard: every list in full, serialized, then counted."""
+    start = time.perf_counter()
+    payload = 0
+    with SessionLocal() as db:
+        counts = {}
+        for model in (models.Case, models.Evidence, models.Task, models.Event, models.Invoice):
+            rows = db.query(model.__table__).filter(model.firm_id == firm_id).all()
+            payload += len(json.dumps([dict(row._mapping) for row in rows], default=str))
+            counts[model.__tablename__] = Counter(getattr(row, "status", None) for row in rows)
+    return (time.perf_counter() - start) * 1000, payload
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=5000)
+    args = parser.parse_args()
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes()
+    firm_id = seed(args.cases)
+
+    start = time.perf_counter()
+    written = rollups.refresh(firm_id)
+    print(f"refresh: {written} rollup rows in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    with SessionLocal() as db:
+        service.firm_stats(db, firm_id)  # Warm up
+        timings = []
+        for _ in range(20):
+            start = time.perf_counter()
+            stats = service.firm_stats(db, firm_id)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    size = len(json.dumps(stats, default=str))
+    print(f"rollup stats: median {timings[len(timings) // 2]:.2f}ms  p95 {timings[int(len(timings) * 0.95) - 1]:.2f}ms  "
+          f"({size / 1024:.1f} KiB)")
+    elapsed, payload = client_side(firm_id)
+    print(f"full lists + count: {elapsed:.0f}ms  ({payload / 1024 / 1024:.1f} MiB of list data)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Dossier export benchmark: time to first chunk, total render time and peak
+Python memory, for a cold render, a cached repeat, and a render joined into
+one string (what the endpoint used to return).
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db ENVIRONMENT=staging python -m benchmarks.bench_export --exhibits 5000
+"""
+import argparse
+import logging
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from app.core import exporter, models
+from app.core.database import Base, SessionLocal, engine, ensure_indexes
+
+
+def seed(exhibits: int, reports: int) -> str:
+    with SessionLocal() as db:
+        firm = models.Firm(name="Bench Firm")
+        db.add(firm)
+        db.flush()
+        case = models.Case(title="Bench v. Export", case_number=f"EX-{uuid.uuid4().hex[:8]}",
+                           description="Long-running litigation " * 20, firm_id=firm.id, metadata_fields={})
+        db.add(case)
+        db.flush()
+        db.execute(models.Evidence.__table__.insert(), [
+            dict(id=models.generate_uuid(), case_id=case.id, firm_id=firm.id, title=f"Exhibit {i}", type="Document",
+                 source="Client", collected_at=datetime.utcnow(), file_hash=uuid.uuid4().hex * 2, status="Verified")
+            for i in range(exhibits)
+        ])
+        db.execute(models.CaseXaiReport.__table__.insert(), [
+            dict(id=models.generate_uuid(), case_id=case.id, firm_id=firm.id, created_at=models.utcnow(), report={
+                "summary": f"Analysis {i}",
+                "claims": [{"finding": "Procedural marker detected.", "confidence": 0.95, "citation": "x"}] * 3,
+                "risk_flags": [],
+            })
+            for i in range(reports)
+        ])
+        db.commit()
+        return case.id
+
+
+def measure(render):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first, size = None, 0
+    for chunk in render():
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first * 1000, total * 1000, peak / 1024 / 1024, size / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--exhibits", type=int, default=5000)
+    parser.add_argument("--reports", type=int, default=500)
+    args = parser.parse_args()
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes()
+    exporter.templates.load()
+    case_id = seed(args.exhibits, args.reports)
+
+    modes = (
+        ("joined", lambda: [exporter.generate_case_report(case_id)]),
+        ("streamed", lambda: exporter.stream_case_report(case_id)),
+        ("cached", lambda: exporter.stream_case_report(case_id)),
+    )
+    for name, render in modes:
+        if name == "streamed":
+            exporter._sections.clear()
+        first, total, peak, size = measure(render)
+        print(f"{name:>8}: first chunk {first:8.1f}ms  total {total:8.1f}ms  peak {peak:7.1f} MiB  ({size:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
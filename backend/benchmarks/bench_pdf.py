@@ -0,0 +1,112 @@
+"""
+PDF dossier benchmark: pages/sec and memory per render.
+
+  single   one large dossier rendered in-process (tracemalloc peak)
+  pool     CASES dossiers submitted to the renderer pool at once
+           (pages/sec overall, peak RSS of the renderer processes)
+  cached   the same dossiers again, served from the content-hash cache
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db ENVIRONMENT=staging python -m benchmarks.bench_pdf --exhibits 5000 --cases 8
+"""
+import argparse
+import logging
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from sqlalchemy.orm import joinedload
+from app.core import models
+from app.core.database import Base, SessionLocal, engine, ensure_indexes
+from app.exports import pdf
+
+
+def seed(cases: int, exhibits: int, reports: int) -> list:
+    with SessionLocal() as db:
+        firm = models.Firm(name="Bench Firm")
+        db.add(firm)
+        db.flush()
+        case_ids = []
+        for i in range(cases):
+            case = models.Case(title=f"Bench v. PDF {i}", case_number=f"PDF-{uuid.uuid4().hex[:8]}",
+                               description="Long-running litigation " * 20, firm_id=firm.id, metadata_fields={})
+            db.add(case)
+            db.flush()
+            case_ids.append(case.id)
+            db.execute(models.Evidence.__table__.insert(), [
+                dict(id=models.generate_uuid(), case_id=case.id, firm_id=firm.id, title=f"Exhibit {j} - correspondence",
+                     type="Document", source="Client", collected_at=datetime.utcnow(),
+                     file_hash=uuid.uuid4().hex * 2, status="Verified")
+                for j in range(exhibits)
+            ])
+            db.execute(models.CaseXaiReport.__table__.insert(), [
+                dict(id=models.generate_uuid(), case_id=case.id, firm_id=firm.id, created_at=models.utcnow(), report={
+                    "summary": f"Analysis {j}",
+                    "claims": [{"finding": "Procedural marker detected.", "confidence": 0.95, "citation": "x"}] * 3,
+                    "risk_flags": [],
+                })
+                for j in range(reports)
+            ])
+        db.commit()
+        return case_ids
+
+
+def keys(case_ids: list) -> list:
+    with SessionLocal() as db:
+        cases = db.query(models.Case).options(joinedload(models.Case.firm)).filter(models.Case.id.in_(case_ids)).all()
+        return [(case.id, pdf.dossier_key(db, case)) for case in cases]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--exhibits", type=int, default=5000)
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--cases", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes()
+    case_ids = seed(args.cases, args.exhibits, args.reports)
+
+    with tempfile.TemporaryDirectory() as root:
+        pdf.PDF_CACHE_ROOT = root
+        tracemalloc.start()
+        start = time.perf_counter()
+        pages, size = pdf.render_pdf(case_ids[0], os.path.join(root, "single.pdf"))
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  single: {pages} pages  {elapsed:6.2f}s  {pages / elapsed:7.1f} pages/s  "
+              f"peak {peak / 1024 / 1024:.1f} MiB  ({size / 1024 / 1024:.1f} MiB file)")
+
+        pdf.PDF_WORKERS = args.workers
+        pdf.PDF_QUEUE_SIZE = max(pdf.PDF_QUEUE_SIZE, args.cases)
+        pdf.get_pool().submit(int, 0).result()  # Start the renderers outside the timing
+        dossiers = keys(case_ids)
+        start = time.perf_counter()
+        futures = [pdf.submit(case_id, key) for case_id, key in dossiers]
+        total_pages = sum(future.result()[0] for future in futures)
+        elapsed = time.perf_counter() - start
+        pdf.shutdown()
+        child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        print(f"    pool: {len(futures)} dossiers x {args.workers} workers  {total_pages} pages  {elapsed:6.2f}s  "
+              f"{total_pages / elapsed:7.1f} pages/s  renderer peak RSS {child_rss:.0f} MiB")
+
+        start = time.perf_counter()
+        hits = 0
+        for _, key in keys(case_ids):
+            handle = pdf.open_cached(key)
+            if handle is not None:
+                handle.close()
+                hits += 1
+        print(f"  cached: {hits}/{len(case_ids)} hits  {(time.perf_counter() - start) * 1000:6.1f}ms (key + lookup)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Recall/latency benchmark for the local semantic index.
+
+Builds an IVF index over VECTORS clustered synthetic embeddings, then compares
+IVF search (for several nprobe values) against exact brute force: mean
+recall@10 and p50/p95 query latency.
+
+Usage:
+    python -m benchmarks.bench_semantic --vectors 200000 --queries 200
+"""
+import argparse
+import statistics
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from app.search import semantic
+
+
+def clustered(rng, n: int, dim: int, clusters: int = 256) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    data = centers[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=semantic.SEMANTIC_DIM)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = clustered(rng, args.vectors, args.dim)
+    with tempfile.TemporaryDirectory() as root:
+        index = semantic.LocalANNIndex(root, args.dim)
+        # One exhibit per vector so recall is measured on raw neighbours
+        start = time.perf_counter()
+        ids = [str(uuid.uuid4()) for _ in range(args.vectors)]
+        with open(index._path("vectors.f32"), "ab") as f:
+            f.write(data.tobytes())
+        with open(index._path("ids.bin"), "ab") as f:
+            f.write(b"".join(i.encode() for i in ids))
+        with open(index._path("chunks.i32"), "ab") as f:
+            f.write(np.zeros(args.vectors, dtype=np.int32).tobytes())
+        index._train(args.vectors)
+        print(f"Built IVF over {args.vectors} x {args.dim} ({index._state()['nlist']} lists) "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        queries = clustered(np.random.default_rng(1), args.queries, args.dim)
+        truth, exact_ms = [], []
+        for q in queries:
+            top, ms = timed(lambda: np.argsort(-(data @ q))[:args.k])
+            truth.append({ids[i] for i in top})
+            exact_ms.append(ms)
+        print(f"{'exact':>10}  recall@{args.k}=1.000  p50={statistics.median(exact_ms):7.2f}ms  "
+              f"p95={statistics.quantiles(exact_ms, n=20)[18]:7.2f}ms")
+
+        for nprobe in (4, 8, 16, 32):
+            recalls, latencies = [], []
+            for q, expected in zip(queries, truth):
+                hits, ms = timed(lambda: index.search(q, args.k, nprobe=nprobe))
+                recalls.append(len(expected & {h["evidence_id"] for h in hits}) / args.k)
+                latencies.append(ms)
+            print(f"nprobe={nprobe:<3}  recall@{args.k}={statistics.mean(recalls):.3f}  "
+                  f"p50={statistics.median(latencies):7.2f}ms  p95={statistics.quantiles(latencies, n=20)[18]:7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Case timeline benchmark: page latency at increasing depth in the
+materialized timeline, with and without a date window, and the cost of
+re-projecting everything with `rebuild()`. For reference, "load + sort"
+is what the endpoint used to do per request: load every exhibit of the
+case and sort them in Python (ignoring tasks, events and invoices).
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db ENVIRONMENT=staging python -m benchmarks.bench_timeline --items 20000
+"""
+import argparse
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.cases import timeline
+from app.core import models
+from app.core.database import Base, SessionLocal, engine, ensure_indexes
+from app.core.pagination import paginate
+
+
+def seed(items: int) -> str:
+    with SessionLocal() as db:
+        firm = models.Firm(name="Bench Firm")
+        db.add(firm)
+        db.flush()
+        case = models.Case(title="Bench v. Timeline", case_number=f"TL-{uuid.uuid4().hex[:8]}", firm_id=firm.id,
+                           metadata_fields={}, registered_at=datetime(2015, 1, 1))
+        db.add(case)
+        db.flush()
+        base = datetime(2015, 1, 1)
+        per_kind = items // 4
+        common = dict(case_id=case.id, firm_id=firm.id)
+        db.execute(models.Evidence.__table__.insert(), [
+            dict(id=models.generate_uuid(), title=f"Exhibit {i}", type="Document", status="Verified",
+                 collected_at=base + timedelta(hours=7 * i), **common) for i in range(per_kind)])
+        db.execute(models.Task.__table__.insert(), [
+            dict(id=models.generate_uuid(), title=f"Task {i}", status="Pending",
+                 due_date=base + timedelta(hours=7 * i + 1), **common) for i in range(per_kind)])
+        db.execute(models.Event.__table__.insert(), [
+            dict(id=models.generate_uuid(), title=f"Hearing {i}", start_time=base + timedelta(hours=7 * i + 2),
+                 end_time=base + timedelta(hours=7 * i + 3), **common) for i in range(per_kind)])
+        db.execute(models.Invoice.__table__.insert(), [
+            dict(id=models.generate_uuid(), total_amount=1000, status="Sent",
+                 due_date=base + timedelta(hours=7 * i + 4), **common) for i in range(per_kind)])
+        db.commit()
+        return case.id
+
+
+def page_ms(case_id: str, pages: int, limit: int, **window) -> list:
+    """Walks `pages` pages; returns the latency of each one in ms."""
+    columns = [timeline.case_timeline.c.occurred_at, timeline.case_timeline.c.id]
+    timings, cursor = [], None
+    with SessionLocal() as db:
+        for _ in range(pages):
+            start = time.perf_counter()
+            rows, cursor = paginate(timeline.page_query(db, case_id, **window), columns, cursor, limit)
+            timings.append((time.perf_counter() - start) * 1000)
+            if cursor is None:
+                break
+    return timings
+
+
+def load_and_sort_ms(case_id: str) -> float:
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        exhibits = db.query(models.Evidence).filter(models.Evidence.case_id == case_id).all()
+        items = sorted(({"date": (e.collected_at or e.created_at).isoformat(), "title": f"Evidence: {e.title}",
+                         "description": f"Status: {e.status}. Citation: {e.id}", "evidence_id": e.id}
+                        for e in exhibits), key=lambda item: item["date"])
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes()
+    case_id = seed(args.items)
+    start = time.perf_counter()
+    projected = timeline.rebuild()
+    print(f"rebuild: {projected} items in {time.perf_counter() - start:.2f}s")
+
+    timings = page_ms(case_id, args.items // args.limit + 1, args.limit)
+    print(f"pages of {args.limit}: first {timings[0]:.2f}ms  middle {timings[len(timings) // 2]:.2f}ms  "
+          f"last {timings[-1]:.2f}ms  ({len(timings)} pages)")
+    print(f"load + sort (exhibits only): {load_and_sort_ms(case_id):.2f}ms")
+    windowed = page_ms(case_id, 3, args.limit, start=datetime(2016, 1, 1), end=datetime(2016, 7, 1))
+    print(f"windowed (2016 H1): {' '.join(f'{t:.2f}ms' for t in windowed)}")
+
+
+if __name__ == "__main__":
+    main()
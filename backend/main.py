@@ -1,17 +1,24 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core import models, database, firebase as firebase_setup, legacy_routes
+from app.core import models, database, exporter, firebase as firebase_setup, legacy_routes
 from app.auth import router as auth_router
 from app.cases import router as case_router
-from app.core.database import engine, check_database_connection
+from app.core.database import engine, async_engine, check_database_connection
+from app.search import index as search_index  # Registers search tables and write hooks
+from app.dashboard import rollups as dashboard_rollups  # Registers rollup tables and write hooks
+from app.audit import writer as audit_writer
+from app.evidence import extraction
+from app.search import semantic
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("veritas")
 
-# Create tables
+# Create tables (and indexes added to existing tables)
 models.Base.metadata.create_all(bind=engine)
+database.ensure_indexes()
+semantic.ensure_schema()  # pgvector table and indexes, when that backend is selected
 
 # Initialize Firebase
 firebase_setup.initialize_firebase()
@@ -23,8 +30,20 @@ async def startup_event():
     """Enterprise startup checks."""
     logger.info("🚀 Starting Veritas Legal Intelligence Platform...")
     check_database_connection()
+    exporter.templates.load()
+    audit_writer.flusher.start()
+    export_service.start()  # Resumes export jobs left Pending/Running by a stopped process
     logger.info("✓ All systems operational")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Guarantees buffered audit entries reach the database before exit."""
+    audit_writer.flusher.stop()
+    extraction.shutdown()
+    export_service.shutdown()
+    pdf_renderer.shutdown()
+    await async_engine.dispose()
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -35,12 +54,22 @@ app.add_middleware(
 )
 
 from app.analysis import router as analysis_router
+from app.audit import router as audit_router
+from app.search import router as search_router
+from app.scheduling import router as scheduling_router
+from app.dashboard import router as dashboard_router
+from app.exports import router as exports_router, service as export_service, pdf as pdf_renderer
 
 # Include routers - Enterprise v1
 api_v1 = FastAPI()
 api_v1.include_router(auth_router.router)
 api_v1.include_router(case_router.router)
 api_v1.include_router(analysis_router.router)
+api_v1.include_router(audit_router.router)
+api_v1.include_router(search_router.router)
+api_v1.include_router(scheduling_router.router)
+api_v1.include_router(exports_router.router)
+api_v1.include_router(dashboard_router.router)
 api_v1.include_router(legacy_routes.router)
 
 app.mount("/api/v1", api_v1)
@@ -0,0 +1,65 @@
+import threading
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from app.core.database import engine, async_engine
+
+# Background writers whose statements don't belong to the request under test
+_IGNORED_THREADS = {"audit-flusher"}
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.current_thread().name not in _IGNORED_THREADS:
+            self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries():
+    """Counts SQL statements sent through the sync and async engines."""
+    counter = QueryCounter()
+    targets = (engine, async_engine.sync_engine)
+    for target in targets:
+        event.listen(target, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", counter)
+
+
+@pytest.fixture
+def query_budget():
+    """
+    `with query_budget(n): ...` fails the test when the block issues more
+    than n SQL statements, listing them in the failure message.
+    """
+    @contextmanager
+    def budget(limit: int):
+        with count_queries() as counter:
+            yield counter
+        assert counter.count <= limit, (
+            f"{counter.count} queries exceed the budget of {limit}:\n" + "\n---\n".join(counter.statements)
+        )
+    return budget
+
+
+@pytest.fixture(autouse=True)
+def extraction_roots(tmp_path, monkeypatch):
+    """
+    Keeps the post-upload pipeline in-process and its text store and semantic
+    index under tmp_path, so test uploads never write into the working tree.
+    """
+    from app.evidence import extraction, textstore
+    from app.search import semantic
+    monkeypatch.setattr(textstore.store, "root", str(tmp_path / "extracted_text"))
+    monkeypatch.setattr(semantic, "SEMANTIC_INDEX_ROOT", str(tmp_path / "semantic_index"))
+    monkeypatch.setattr(extraction, "EXTRACTION_WORKERS", 0)
+    monkeypatch.setattr(extraction, "_pool", None)
@@ -0,0 +1,180 @@
+import pytest
+from datetime import datetime, timedelta, UTC
+from app.core.database import Base, engine, SessionLocal
+from app.core import models
+from app.analysis import queue, service, worker
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    session.query(models.AnalysisJob).delete()
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def evidence(db):
+    firm = models.Firm(name="Queue Firm")
+    db.add(firm)
+    db.flush()
+    case = models.Case(title="Queue Case", firm_id=firm.id, metadata_fields={})
+    db.add(case)
+    db.flush()
+    ev = models.Evidence(case_id=case.id, title="Exhibit", firm_id=firm.id, file_hash="abc", audit_chain=[])
+    db.add(ev)
+    db.commit()
+    return ev
+
+
+def test_claim_leases_job_once(db, evidence):
+    job = queue.enqueue(db, evidence.id, evidence.firm_id)
+    db.commit()
+
+    claimed = queue.claim_next(db, "worker-a")
+    assert claimed.id == job.id
+    assert claimed.status == "Processing"
+    assert claimed.attempts == 1
+    assert claimed.locked_by == "worker-a"
+    assert queue.claim_next(db, "worker-b") is None
+
+
+def test_expired_lease_is_reclaimed(db, evidence):
+    queue.enqueue(db, evidence.id, evidence.firm_id)
+    db.commit()
+    job = queue.claim_next(db, "worker-a")
+    job.locked_until = datetime.now(UTC) - timedelta(seconds=1)
+    db.commit()
+
+    reclaimed = queue.claim_next(db, "worker-b")
+    assert reclaimed.id == job.id
+    assert reclaimed.locked_by == "worker-b"
+    assert reclaimed.attempts == 2
+
+
+def test_expired_final_attempt_is_failed_not_reclaimed(db, evidence):
+    queue.enqueue(db, evidence.id, evidence.firm_id)
+    db.commit()
+    job = queue.claim_next(db, "worker-a")
+    evidence.status = "Analyzing"
+    job.attempts = job.max_attempts  # Final attempt; the worker is SIGKILLed and never calls fail()
+    job.locked_until = datetime.now(UTC) - timedelta(seconds=1)
+    db.commit()
+
+    assert queue.claim_next(db, "worker-b") is None
+    db.expire_all()
+    job = db.get(models.AnalysisJob, job.id)
+    assert (job.status, job.locked_by, job.attempts) == ("Failed", None, job.max_attempts)
+    assert db.get(models.Evidence, evidence.id).status == queue.ANALYSIS_FAILED_STATUS
+
+
+def test_fail_backs_off_then_gives_up(db, evidence):
+    queue.enqueue(db, evidence.id, evidence.firm_id)
+    db.commit()
+    job = queue.claim_next(db, "worker-a")
+
+    queue.fail(db, job, "worker-a", "boom")
+    assert job.status == "Pending"
+    assert queue.claim_next(db, "worker-a") is None  # Still backing off
+
+    job.available_at = datetime.now(UTC) - timedelta(seconds=1)
+    job.attempts = job.max_attempts - 1
+    db.commit()
+    job = queue.claim_next(db, "worker-a")
+    queue.fail(db, job, "worker-a", "boom again")
+    assert job.status == "Failed"
+    assert job.last_error == "boom again"
+
+
+def test_final_failure_releases_the_exhibit(db, evidence):
+    queue.enqueue(db, evidence.id, evidence.firm_id)
+    db.commit()
+    job = queue.claim_next(db, "worker-a")
+    evidence.status = "Analyzing"  # As committed by analyze_evidence before the crash
+    job.attempts = job.max_attempts
+    db.commit()
+
+    queue.fail(db, job, "worker-a", "boom")
+    db.expire_all()
+    assert db.get(models.AnalysisJob, job.id).status == "Failed"
+    assert db.get(models.Evidence, evidence.id).status == queue.ANALYSIS_FAILED_STATUS
+
+
+def test_lost_lease_discards_results(db, evidence, monkeypatch):
+    monkeypatch.setattr(service, "SIMULATED_LATENCY_SECONDS", 0)
+    queue.enqueue(db, evidence.id, evidence.firm_id)
+    db.commit()
+    job = queue.claim_next(db, "worker-a")
+    assert queue.extend_lease(db, job.id, "worker-a")
+    job.locked_until = datetime.now(UTC) - timedelta(seconds=1)  # worker-a stalled past its lease
+    db.commit()
+    assert queue.claim_next(SessionLocal(), "worker-b").locked_by == "worker-b"
+
+    assert queue.extend_lease(db, job.id, "worker-a") is False
+    assert worker.process_job(db, job, "worker-a") is False
+    db.expire_all()
+    job = db.get(models.AnalysisJob, job.id)
+    assert (job.status, job.locked_by, job.result) == ("Processing", "worker-b", None)
+    assert db.query(models.CaseXaiReport).filter_by(job_id=job.id).count() == 0
+    with pytest.raises(queue.LeaseLost):
+        queue.fail(db, job, "worker-a", "late failure")
+
+
+def test_worker_drains_queue(db, evidence, monkeypatch):
+    monkeypatch.setattr(service, "SIMULATED_LATENCY_SECONDS", 0)
+    job = queue.enqueue(db, evidence.id, evidence.firm_id)
+    db.commit()
+
+    assert worker.run_worker("test-worker", stop_when_idle=True) == 1
+
+    db.expire_all()
+    job = db.get(models.AnalysisJob, job.id)
+    assert job.status == "Completed"
+    assert job.locked_by is None
+    assert job.result["claims"][0]["citation"] == evidence.id
+
+
+def test_duplicate_content_served_from_cache(db, evidence, monkeypatch):
+    from app.analysis import cache
+    monkeypatch.setattr(service, "SIMULATED_LATENCY_SECONDS", 0)
+    cache._lru.clear()
+    db.query(models.AnalysisCacheEntry).delete()
+    duplicate = models.Evidence(case_id=evidence.case_id, title="Copy", firm_id=evidence.firm_id,
+                                file_hash=evidence.file_hash, audit_chain=[])
+    db.add(duplicate)
+    first = queue.enqueue(db, evidence.id, evidence.firm_id)
+    second = queue.enqueue(db, duplicate.id, duplicate.firm_id)
+    db.commit()
+
+    service.AIService.analyze_evidence(evidence.id, first.id, db)
+    cache._lru.clear()  # Force the database tier
+    service.AIService.analyze_evidence(duplicate.id, second.id, db)
+
+    assert first.cache_hit is False
+    assert second.cache_hit is True
+    assert second.tokens_used == 0
+    assert {c["citation"] for c in second.result["claims"]} == {duplicate.id}
+    assert db.query(models.AnalysisCacheEntry).count() == 1
+
+
+def test_repeat_analysis_appends_without_rewriting_history(db, evidence, monkeypatch):
+    from tests.conftest import count_queries
+    monkeypatch.setattr(service, "SIMULATED_LATENCY_SECONDS", 0)
+    for _ in range(3):
+        job = queue.enqueue(db, evidence.id, evidence.firm_id)
+        db.commit()
+        with count_queries() as counter:
+            service.AIService.analyze_evidence(evidence.id, job.id, db)
+
+    # Each analysis inserts one report and one custody row; the blobs are never touched
+    assert not [s for s in counter.statements if s.startswith("UPDATE") and ("metadata_fields" in s or "audit_chain" in s)]
+    assert db.query(models.CaseXaiReport).filter_by(case_id=evidence.case_id).count() == 3
+    events = db.query(models.EvidenceCustodyEvent).filter_by(evidence_id=evidence.id).all()
+    assert [e.action for e in events] == ["XAI_REPORT_GENERATED"] * 3
+    assert {e.details["report_id"] for e in events} == {
+        r.id for r in db.query(models.CaseXaiReport).filter_by(case_id=evidence.case_id)
+    }
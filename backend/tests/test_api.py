@@ -4,6 +4,7 @@ from main import app
 from app.core.database import Base, engine, SessionLocal
 from app.core import models
 import uuid
+from datetime import datetime, timedelta
 
 # Setup test database
 @pytest.fixture(scope="module")
@@ -92,10 +93,588 @@ def test_get_tasks(client, auth_token):
     headers = {"Authorization": f"Bearer {auth_token}"}
     response = client.get("/api/v1/tasks", headers=headers)
     assert response.status_code == 200
-    assert isinstance(response.json(), list)
+    assert isinstance(response.json()["items"], list)
 
 def test_global_search(client, auth_token):
     headers = {"Authorization": f"Bearer {auth_token}"}
     response = client.get("/api/v1/search?query=State", headers=headers)
     assert response.status_code == 200
-    assert isinstance(response.json(), list)
+    assert isinstance(response.json()["items"], list)
+    assert response.json()["facets"].get("Case", 0) >= 1
+
+def test_add_evidence_streams_upload(client, auth_token, tmp_path, monkeypatch):
+    from app.evidence import storage
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path))
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    case = client.post("/api/v1/cases/", json={
+        "title": "State vs. Upload",
+        "description": "Evidence upload case",
+        "case_number": f"UPL-{uuid.uuid4().hex[:4]}",
+        "court": "District Court",
+        "judge": "Judge Doe",
+        "case_types": ["Civil"],
+        "metadata_fields": {}
+    }, headers=headers).json()
+
+    content = b"exhibit-bytes" * 1000
+    response = client.post(
+        f"/api/v1/cases/{case['id']}/evidence",
+        params={"title": "Exhibit A", "type": "Document", "source": "Client"},
+        files={"file": ("exhibit.txt", content, "text/plain")},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    import hashlib
+    assert response.json()["file_hash"] == hashlib.sha256(content).hexdigest()
+
+    custody_log = client.get(
+        f"/api/v1/cases/{case['id']}/evidence/{response.json()['id']}/custody", headers=headers
+    ).json()
+    assert [e["action"] for e in custody_log["items"]] == ["Uploaded", "TEXT_EXTRACTED"]
+    assert custody_log["items"][0]["details"]["hash"] == response.json()["file_hash"]
+    assert client.get(f"/api/v1/cases/{case['id']}/xai-reports", headers=headers).json()["items"] == []
+
+def test_add_evidence_removes_stored_file_when_insert_fails(client, auth_token, tmp_path, monkeypatch):
+    from app.evidence import storage
+    from app.cases import router as case_router
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path))
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    case = client.post("/api/v1/cases/", json={
+        "title": "State vs. Orphan", "description": "Failed insert", "case_number": f"ORP-{uuid.uuid4().hex[:4]}",
+        "court": "District Court", "judge": "Judge Doe", "case_types": ["Civil"], "metadata_fields": {}
+    }, headers=headers).json()
+
+    def broken_audit(*args, **kwargs):
+        raise RuntimeError("audit insert failed")
+    monkeypatch.setattr(case_router.auth, "log_audit", broken_audit)
+    with pytest.raises(RuntimeError, match="audit insert failed"):
+        client.post(
+            f"/api/v1/cases/{case['id']}/evidence",
+            params={"title": "Exhibit", "type": "Document", "source": "Client"},
+            files={"file": ("exhibit.txt", b"orphan-bytes", "text/plain")},
+            headers=headers,
+        )
+    assert list((tmp_path / case["id"]).iterdir()) == []
+
+def test_trigger_analysis_enqueues_job(client, auth_token, test_db):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    evidence = test_db.query(models.Evidence).first()
+    response = client.post(f"/api/v1/analysis/{evidence.id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "Pending"
+
+    # Async session path: job visible to the async status route, audit committed with it
+    status_res = client.get(f"/api/v1/analysis/{evidence.id}/status", headers=headers)
+    assert status_res.json()["id"] == response.json()["id"]
+    audit = test_db.query(models.SystemAudit).filter(
+        models.SystemAudit.action == "TRIGGER_ANALYSIS", models.SystemAudit.record_id == response.json()["id"]
+    ).one()
+    assert audit.row_hash and audit.seq
+
+def test_batch_analysis_progress(client, auth_token, test_db):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    evidence = test_db.query(models.Evidence).first()
+    response = client.post("/api/v1/analysis/batch", json={"evidence_ids": [evidence.id, evidence.id]}, headers=headers)
+    assert response.status_code == 200
+    batch = response.json()
+    assert batch["total"] == 1
+    assert batch["status_counts"] == {"Pending": 1}
+
+    progress = client.get(f"/api/v1/analysis/batch/{batch['id']}", headers=headers)
+    assert progress.status_code == 200
+    assert progress.json()["progress"] == 0.0
+
+    unknown = client.post("/api/v1/analysis/batch", json={"evidence_ids": ["missing"]}, headers=headers)
+    assert unknown.status_code == 404
+
+def test_analyze_case_enqueues_all_evidence(client, auth_token, test_db):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    evidence = test_db.query(models.Evidence).first()
+    response = client.post(f"/api/v1/cases/{evidence.case_id}/analyze", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["case_id"] == evidence.case_id
+    assert response.json()["total"] == 1
+
+def test_principal_cache_skips_user_lookup(client, auth_token, test_db):
+    from sqlalchemy import event
+    from app.core import security
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    client.get("/api/v1/tasks", headers=headers)
+
+    user_queries = []
+    def count_user_queries(conn, cursor, statement, *args):
+        if "FROM users" in statement:
+            user_queries.append(statement)
+    event.listen(engine, "before_cursor_execute", count_user_queries)
+    try:
+        assert client.get("/api/v1/tasks", headers=headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", count_user_queries)
+    assert user_queries == []
+
+    # Role changes invalidate the cached principal immediately
+    email = security.jwt.decode(auth_token, security.SECRET_KEY, algorithms=[security.ALGORITHM])["sub"]
+    user = test_db.query(models.User).filter(models.User.email == email).first()
+    user.role = "Assistant"
+    test_db.commit()
+    case_payload = {
+        "title": "Forbidden", "description": "", "case_number": f"RB-{uuid.uuid4().hex[:4]}",
+        "court": "", "judge": "", "case_types": [], "metadata_fields": {}
+    }
+    assert client.post("/api/v1/cases/", json=case_payload, headers=headers).status_code == 403
+    user.role = "Lawyer"
+    test_db.commit()
+    assert client.post("/api/v1/cases/", json=case_payload, headers=headers).status_code == 200
+
+    # A request that loads the user between the flush and the commit cannot keep the old role cached
+    user.role = "Assistant"
+    test_db.flush()
+    with SessionLocal() as other:
+        assert security.get_current_user(auth_token, other).role == "Lawyer"  # Still the committed row
+    test_db.commit()
+    assert security._principal_cache.get(email) is None
+    assert client.post("/api/v1/cases/", json=case_payload, headers=headers).status_code == 403
+    user.role = "Lawyer"
+    test_db.commit()
+
+def test_audit_logs_keyset_pagination(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    case_id = client.get("/api/v1/cases/", headers=headers).json()[0]["id"]
+    for i in range(5):
+        client.post("/api/v1/tasks", json={"title": f"Audit task {i}", "case_id": case_id}, headers=headers)
+
+    seen, cursor = [], None
+    while True:
+        params = {"action": "CREATE_TASK", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/v1/audit/logs", params=params, headers=headers).json()
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == 5
+    assert len({e["id"] for e in seen}) == 5
+    assert all(e["action"] == "CREATE_TASK" for e in seen)
+    assert [e["timestamp"] for e in seen] == sorted((e["timestamp"] for e in seen), reverse=True)
+
+    assert client.get("/api/v1/audit/logs", params={"cursor": "garbage"}, headers=headers).status_code == 400
+
+def test_audit_export_endpoint(client, auth_token, test_db):
+    import json
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    email = security_subject(auth_token)
+    user = test_db.query(models.User).filter(models.User.email == email).first()
+    user.role = "Owner"
+    test_db.commit()
+    response = client.get("/api/v1/audit/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    trailer = json.loads(response.text.splitlines()[-1])
+    assert trailer["type"] == "trailer"
+    assert trailer["intact"] is True
+    user.role = "Lawyer"
+    test_db.commit()
+
+def security_subject(token):
+    from app.core import security
+    return security.jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])["sub"]
+
+def test_custody_verify_endpoint(client, auth_token, test_db):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    evidence = test_db.query(models.Evidence).first()
+    response = client.get(f"/api/v1/cases/{evidence.case_id}/custody/verify", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["intact"] is True
+
+def test_semantic_search_over_uploaded_evidence(client, auth_token, tmp_path, monkeypatch):
+    from app.evidence import storage
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path / "files"))
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    case_id = client.post("/api/v1/cases/", json={
+        "title": "Semantic Case", "description": "Warehouse injury", "case_number": f"SEM-{uuid.uuid4().hex[:4]}",
+        "court": "District Court", "judge": "Judge Lee", "case_types": ["Civil"], "metadata_fields": {}
+    }, headers=headers).json()["id"]
+    upload = client.post(
+        f"/api/v1/cases/{case_id}/evidence",
+        params={"title": "Witness statement", "type": "Document", "source": "Deposition"},
+        files={"file": ("statement.txt", b"The witness saw the forklift strike the loading dock gate.", "text/plain")},
+        headers=headers,
+    )
+    assert upload.status_code == 200
+
+    res = client.get("/api/v1/search/semantic", params={"query": "forklift loading dock", "k": 3}, headers=headers)
+    assert res.status_code == 200
+    top = res.json()["items"][0]
+    assert top["citation"] == upload.json()["id"] and top["title"] == "Witness statement"
+
+def _seed_cases(test_db, firm_id, count, evidence_per_case=2):
+    for i in range(count):
+        case = models.Case(title=f"Budget case {i}", case_number=f"QB-{uuid.uuid4().hex[:6]}",
+                           description="", court="", judge="", case_types=[], firm_id=firm_id)
+        test_db.add(case)
+        test_db.flush()
+        for j in range(evidence_per_case):
+            test_db.add(models.Evidence(title=f"Exhibit {j}", type="Document", source="Client",
+                                        collected_at=datetime.utcnow(), case_id=case.id,
+                                        firm_id=firm_id, file_hash=uuid.uuid4().hex, status="Pending"))
+    test_db.commit()
+
+def test_case_endpoints_query_budget(client, auth_token, test_db, query_budget):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    user = test_db.query(models.User).filter(models.User.email == security_subject(auth_token)).one()
+    _seed_cases(test_db, user.firm_id, 30)
+    client.get("/api/v1/cases/", params={"limit": 1}, headers=headers)  # Warm the principal cache
+
+    # Constant cost per page: cases + one IN query for their evidence
+    counts = []
+    for limit in (5, 30):
+        with query_budget(2) as counter:
+            res = client.get("/api/v1/cases/", params={"limit": limit}, headers=headers)
+        assert len(res.json()) == limit and all(c["evidence"] is not None for c in res.json())
+        counts.append(counter.count)
+    assert counts[0] == counts[1]
+
+    case_id = next(c["id"] for c in res.json() if c["title"].startswith("Budget case"))
+    with query_budget(2):
+        assert len(client.get(f"/api/v1/cases/{case_id}", headers=headers).json()["evidence"]) == 2
+    # Access check, case + firm, version, then evidence and XAI reports streamed
+    with query_budget(5):
+        first = client.get(f"/api/v1/cases/{case_id}/export", headers=headers)
+    assert first.status_code == 200 and first.text.count("<tr>") == 3  # Header + 2 exhibits
+    with query_budget(3):  # Unchanged case: sections come from the dossier cache
+        again = client.get(f"/api/v1/cases/{case_id}/export", headers=headers)
+    assert again.text.split("<div class=\"footer\">")[0].split("Case Summary")[1] == \
+        first.text.split("<div class=\"footer\">")[0].split("Case Summary")[1]
+    with query_budget(2):
+        client.get(f"/api/v1/cases/{case_id}/timeline", headers=headers)
+
+def test_list_invoices_query_budget(client, auth_token, test_db, query_budget):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    case_id = client.get("/api/v1/cases/", params={"limit": 1}, headers=headers).json()[0]["id"]
+    for _ in range(5):
+        created = client.post("/api/v1/invoices", json={
+            "case_id": case_id, "total_amount": 10, "due_date": "2026-01-31T00:00:00",
+            "items": [{"description": "Review", "amount": 10}]
+        }, headers=headers)
+        assert created.status_code == 200
+    with query_budget(2):
+        res = client.get("/api/v1/invoices", headers=headers)
+    assert res.status_code == 200 and all(len(i["items"]) == 1 for i in res.json()["items"])
+
+def test_list_projection_and_summary(client, auth_token, query_budget):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    with query_budget(1):
+        summary = client.get("/api/v1/cases/", params={"view": "summary", "limit": 50}, headers=headers).json()
+    assert summary and set(summary[0]) == {"id", "title", "case_number", "status", "registered_at", "evidence_count"}
+    assert any(row["evidence_count"] == 2 for row in summary)
+
+    projected = client.get("/api/v1/cases/", params={"fields": "title,status"}, headers=headers).json()
+    assert set(projected[0]) == {"id", "title", "status"}
+
+    # Only columns of the response schema project: not relationships, not internal columns
+    assert client.get("/api/v1/cases/", params={"fields": "title,evidence"}, headers=headers).status_code == 400
+    assert client.get("/api/v1/tasks", params={"fields": "title,firm_id"}, headers=headers).status_code == 400
+
+    invoices = client.get("/api/v1/invoices", params={"view": "summary"}, headers=headers).json()["items"]
+    assert invoices and "items" not in invoices[0] and "total_amount" in invoices[0]
+    tasks = client.get("/api/v1/tasks", params={"fields": "title"}, headers=headers)
+    assert tasks.status_code == 200 and all(set(t) == {"id", "title"} for t in tasks.json()["items"])
+
+def _walk(client, path, headers, **params):
+    items, cursor = [], None
+    while True:
+        page = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})}, headers=headers).json()
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return items
+
+def test_tasks_and_events_keyset_pagination(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    case_id = client.get("/api/v1/cases/", params={"limit": 1}, headers=headers).json()[0]["id"]
+    for day in range(1, 8):
+        client.post("/api/v1/tasks", json={
+            "title": f"Paged task {day}", "case_id": case_id, "status": "Done" if day % 2 else "Pending",
+            "due_date": f"2030-03-{day:02d}T09:00:00"
+        }, headers=headers)
+        client.post("/api/v1/events", json={
+            "title": f"Hearing {day}", "case_id": case_id,
+            "start_time": f"2030-03-{8 - day:02d}T10:00:00", "end_time": f"2030-03-{8 - day:02d}T11:00:00"
+        }, headers=headers)
+
+    tasks = _walk(client, "/api/v1/tasks", headers, limit=3, case_id=case_id)
+    assert len(tasks) == len({t["id"] for t in tasks}) >= 7
+    assert [t["created_at"] for t in tasks] == sorted((t["created_at"] for t in tasks), reverse=True)
+
+    march = _walk(client, "/api/v1/tasks", headers, limit=2, status="Pending", case_id=case_id,
+                  due_after="2030-03-01T00:00:00", due_before="2030-03-07T00:00:00", fields="title")
+    assert sorted(t["title"] for t in march) == ["Paged task 2", "Paged task 4", "Paged task 6"]
+
+    events = _walk(client, "/api/v1/events", headers, limit=3, case_id=case_id, start_after="2030-03-01T00:00:00")
+    assert [e["title"] for e in events] == [f"Hearing {day}" for day in range(7, 0, -1)]
+
+def test_calendar_window_and_conflicts(client, auth_token, test_db):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    case_a, case_b = [c["id"] for c in client.get("/api/v1/cases/", params={"limit": 2}, headers=headers).json()]
+    lawyer = test_db.query(models.User).filter(models.User.firm_id.isnot(None)).first().id
+
+    def book(title, case_id, start, end, **params):
+        return client.post("/api/v1/events", params=params, json={
+            "title": title, "case_id": case_id, "assigned_to": lawyer,
+            "start_time": f"2031-05-{start}", "end_time": f"2031-05-{end}"
+        }, headers=headers)
+
+    assert book("Trial", case_a, "01T09:00:00", "04T17:00:00").status_code == 200  # Long-running
+    assert book("Deposition", case_a, "06T10:00:00", "06T12:00:00").status_code == 200
+    assert book("Back to back", case_b, "06T12:00:00", "06T13:00:00").status_code == 200  # [start, end) touch
+
+    clash = book("Hearing", case_b, "03T11:00:00", "03T12:00:00")
+    assert clash.status_code == 409
+    assert [c["title"] for c in clash.json()["detail"]["conflicts"]] == ["Trial"]
+    assert book("Hearing", case_b, "03T11:00:00", "03T12:00:00", allow_conflicts="true").status_code == 200
+    assert book("Bad", case_b, "07T12:00:00", "07T11:00:00").status_code == 422
+
+    window = client.get("/api/v1/calendar", params={
+        "from": "2031-05-03T00:00:00", "to": "2031-05-06T11:00:00", "assigned_to": lawyer
+    }, headers=headers).json()
+    assert [e["title"] for e in window] == ["Trial", "Hearing", "Deposition"]
+
+    check = client.get("/api/v1/calendar/check", params={
+        "assigned_to": lawyer, "start_time": "2031-05-06T11:30:00", "end_time": "2031-05-06T12:30:00"
+    }, headers=headers).json()
+    assert sorted(c["title"] for c in check["conflicts"]) == ["Back to back", "Deposition"]
+
+    report = client.get("/api/v1/calendar/conflicts", params={
+        "from": "2031-05-01T00:00:00", "to": "2031-06-01T00:00:00"
+    }, headers=headers).json()
+    assert [(p["first"]["title"], p["second"]["title"]) for p in report["pairs"]] == [("Trial", "Hearing")]
+
+def test_reflag_long_running_events(client, auth_token, test_db):
+    from app.scheduling import service as scheduling
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    user = test_db.query(models.User).filter(models.User.email == security_subject(auth_token)).one()
+    # Written before the column existed (or under a longer span): flagged short
+    event_id = models.generate_uuid()
+    test_db.execute(models.Event.__table__.insert().values(
+        id=event_id, title="Arbitration", firm_id=user.firm_id, long_running=False,
+        case_id=test_db.query(models.Case.id).filter(models.Case.firm_id == user.firm_id).first()[0],
+        start_time=datetime(2032, 3, 1, 9), end_time=datetime(2032, 3, 5, 17)
+    ))
+    test_db.commit()
+    window = {"from": "2032-03-03T00:00:00", "to": "2032-03-04T00:00:00"}
+    assert client.get("/api/v1/calendar", params=window, headers=headers).json() == []
+
+    with engine.begin() as connection:
+        assert scheduling.reflag_long_running(connection) >= 1
+        assert scheduling.reflag_long_running(connection) == 0  # Only changed rows are written
+    assert [e["id"] for e in client.get("/api/v1/calendar", params=window, headers=headers).json()] == [event_id]
+
+def test_bulk_export_archive(client, auth_token, tmp_path, monkeypatch):
+    import hashlib, io, json, time, zipfile
+    from app.evidence import storage
+    from app.exports import service as export_service
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path / "evidence"))
+    monkeypatch.setattr(export_service, "EXPORT_ROOT", str(tmp_path / "exports"))
+    monkeypatch.setattr(export_service, "EXPORT_WORKERS", 0)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    case_ids = []
+    for i in range(2):
+        case_ids.append(client.post("/api/v1/cases/", json={
+            "title": f"Export matter {i}", "description": "", "case_number": f"EXP/{i}-{uuid.uuid4().hex[:4]}",
+            "court": "", "judge": "", "case_types": [], "metadata_fields": {}
+        }, headers=headers).json()["id"])
+        client.post(f"/api/v1/cases/{case_ids[-1]}/evidence",
+                    params={"title": f"Exhibit {i}", "type": "Document", "source": "Client"},
+                    files={"file": (f"exhibit{i}.txt", f"exhibit {i} bytes".encode(), "text/plain")}, headers=headers)
+    # Same bytes and file name again: stored under the same name, but a separate exhibit
+    client.post(f"/api/v1/cases/{case_ids[-1]}/evidence", params={"title": "Duplicate", "type": "Document", "source": "Client"},
+                files={"file": ("exhibit1.txt", b"exhibit 1 bytes", "text/plain")}, headers=headers)
+
+    def wait(job_id):
+        for _ in range(100):
+            status = client.get(f"/api/v1/exports/{job_id}", headers=headers).json()
+            if status["status"] in ("Completed", "Failed"):
+                break
+            time.sleep(0.05)
+        return status
+
+    assert client.post("/api/v1/exports", json={"case_ids": ["nope"]}, headers=headers).status_code == 404
+    job = client.post("/api/v1/exports", json={"case_ids": case_ids}, headers=headers)
+    assert job.status_code == 202
+    status = wait(job.json()["id"])
+    assert status["status"] == "Completed" and status["progress"] == 1.0 and status["files_written"] == 5
+
+    archive = zipfile.ZipFile(io.BytesIO(client.get(status["download_url"], headers=headers).content))
+    manifest = json.loads(archive.read("manifest.json"))["entries"]
+    assert len(manifest) == 5 and all(e.get("verified", True) for e in manifest)
+    for entry in manifest:
+        assert hashlib.sha256(archive.read(entry["path"])).hexdigest() == entry["sha256"]
+    assert sum(1 for e in manifest if e["path"].endswith("dossier.html")) == 2
+    assert sum(1 for e in manifest if e["path"].endswith("_exhibit1.txt")) == 2
+
+    # A job left Running by a process that died is rebuilt once its lease has expired
+    with SessionLocal() as db:
+        abandoned = db.get(models.ExportJob, status["id"])
+        abandoned.status, abandoned.locked_by, abandoned.completed_cases = "Running", "gone:1", 1
+        abandoned.locked_until = models.utcnow() - timedelta(seconds=1)
+        db.commit()
+    assert status["id"] in export_service.recover()
+    status = wait(status["id"])
+    assert status["status"] == "Completed" and status["completed_cases"] == 2 and status["files_written"] == 5
+
+def test_pdf_dossier_export(client, auth_token, tmp_path, monkeypatch):
+    import io, os
+    from pypdf import PdfReader
+    from app.evidence import storage
+    from app.exports import pdf as pdf_renderer
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path / "evidence"))
+    monkeypatch.setattr(pdf_renderer, "PDF_CACHE_ROOT", str(tmp_path / "pdf"))
+    monkeypatch.setattr(pdf_renderer, "PDF_WORKERS", 0)
+    monkeypatch.setattr(pdf_renderer, "_pool", None)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    case_id = client.post("/api/v1/cases/", json={
+        "title": "Printed v. Record", "description": "Long narrative " * 400, "case_number": f"PDF/{uuid.uuid4().hex[:4]}",
+        "court": "", "judge": "", "case_types": [], "metadata_fields": {}
+    }, headers=headers).json()["id"]
+
+    first = client.get(f"/api/v1/cases/{case_id}/export", params={"format": "pdf"}, headers=headers)
+    assert first.status_code == 200 and first.headers["content-type"] == "application/pdf"
+    reader = PdfReader(io.BytesIO(first.content))
+    assert len(reader.pages) >= 2 and "Printed v. Record" in reader.pages[0].extract_text()
+    cached = [f for _, _, files in os.walk(tmp_path / "pdf") for f in files]
+    assert len(cached) == 1
+
+    # Unchanged case: served from the content-hash cache, byte for byte
+    assert client.get(f"/api/v1/cases/{case_id}/export", params={"format": "pdf"}, headers=headers).content == first.content
+    # No generation time in the body: a re-render of the same contents is the same file
+    pdf_renderer.prune(max_bytes=0)
+    assert client.get(f"/api/v1/cases/{case_id}/export", params={"format": "pdf"}, headers=headers).content == first.content
+
+    # A prune racing the response can't cut it short: the handle is already open
+    open_cached = pdf_renderer.open_cached
+    def open_then_prune(key):
+        handle = open_cached(key)
+        pdf_renderer.prune(max_bytes=0)
+        return handle
+    monkeypatch.setattr(pdf_renderer, "open_cached", open_then_prune)
+    raced = client.get(f"/api/v1/cases/{case_id}/export", params={"format": "pdf"}, headers=headers)
+    assert raced.status_code == 200 and raced.content == first.content
+    monkeypatch.setattr(pdf_renderer, "open_cached", open_cached)
+
+    # New evidence changes the dossier, so it renders again
+    client.post(f"/api/v1/cases/{case_id}/evidence", params={"title": "Late exhibit", "type": "Document", "source": "Client"},
+                files={"file": ("late.txt", b"late", "text/plain")}, headers=headers)
+    again = client.get(f"/api/v1/cases/{case_id}/export", params={"format": "pdf"}, headers=headers)
+    assert again.content != first.content
+    assert "Late exhibit" in "".join(page.extract_text() for page in PdfReader(io.BytesIO(again.content)).pages)
+
+    # A slow render answers 202 without being cancelled, and the retry collects it
+    import threading
+    render, release = pdf_renderer.render_pdf, threading.Event()
+    monkeypatch.setattr(pdf_renderer, "render_pdf", lambda *args: release.wait(5) and render(*args))
+    monkeypatch.setattr(pdf_renderer, "PDF_WAIT_SECONDS", 0.05)
+    client.post(f"/api/v1/cases/{case_id}/evidence", params={"title": "Slow", "type": "Document", "source": "Client"},
+                files={"file": ("slow.txt", b"slow", "text/plain")}, headers=headers)
+    assert client.get(f"/api/v1/cases/{case_id}/export", params={"format": "pdf"}, headers=headers).status_code == 202
+    release.set()
+    monkeypatch.setattr(pdf_renderer, "PDF_WAIT_SECONDS", 5)
+    slow = client.get(f"/api/v1/cases/{case_id}/export", params={"format": "pdf"}, headers=headers)
+    assert slow.status_code == 200 and "Slow" in "".join(page.extract_text() for page in PdfReader(io.BytesIO(slow.content)).pages)
+
+    monkeypatch.setattr(pdf_renderer, "PDF_QUEUE_SIZE", 0)
+    client.post(f"/api/v1/cases/{case_id}/evidence", params={"title": "Later", "type": "Document", "source": "Client"},
+                files={"file": ("later.txt", b"later", "text/plain")}, headers=headers)
+    assert client.get(f"/api/v1/cases/{case_id}/export", params={"format": "pdf"}, headers=headers).status_code == 503
+    pdf_renderer.shutdown()
+
+def test_case_timeline_materialized(client, auth_token, test_db, tmp_path, monkeypatch):
+    from app.evidence import storage
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path / "evidence"))
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    case_id = client.post("/api/v1/cases/", json={
+        "title": "Timeline matter", "description": "", "case_number": f"TL/{uuid.uuid4().hex[:4]}",
+        "court": "", "judge": "", "case_types": [], "metadata_fields": {}
+    }, headers=headers).json()["id"]
+    client.post(f"/api/v1/cases/{case_id}/evidence", params={"title": "Contract", "type": "Document", "source": "Client"},
+                files={"file": ("contract.txt", b"terms", "text/plain")}, headers=headers)
+    task_id = client.post("/api/v1/tasks", json={"title": "File brief", "case_id": case_id,
+                                                 "due_date": "2030-03-01T09:00:00"}, headers=headers).json()["id"]
+    client.post("/api/v1/events", json={"title": "Hearing", "case_id": case_id, "start_time": "2030-02-01T09:00:00",
+                                        "end_time": "2030-02-01T10:00:00", "location": "Court 4"}, headers=headers)
+    client.post("/api/v1/invoices", json={"case_id": case_id, "total_amount": 12500, "due_date": "2030-04-01T00:00:00",
+                                          "items": [{"description": "Drafting", "amount": 12500}]}, headers=headers)
+
+    url = f"/api/v1/cases/{case_id}/timeline"
+    items = client.get(url, headers=headers).json()["items"]
+    assert [i["type"] for i in items] == ["system", "evidence", "event", "task", "invoice"]
+    assert items[1]["evidence_id"] and items[4]["title"] == "Invoice due: 125.00"
+
+    first = client.get(url, params={"limit": 2}, headers=headers).json()
+    rest = client.get(url, params={"limit": 10, "cursor": first["next_cursor"]}, headers=headers).json()
+    assert [i["entity_id"] for i in first["items"] + rest["items"]] == [i["entity_id"] for i in items]
+    window = client.get(url, params={"from": "2030-01-01T00:00:00", "to": "2030-03-15T00:00:00"}, headers=headers).json()
+    assert [i["title"] for i in window["items"]] == ["Event: Hearing", "Task due: File brief"]
+    assert [i["type"] for i in client.get(url, params={"type": "task"}, headers=headers).json()["items"]] == ["task"]
+
+    # Writes keep the timeline current: a rescheduled task moves
+    task = test_db.get(models.Task, task_id)
+    task.due_date = datetime(2029, 12, 1)
+    test_db.commit()
+    window = client.get(url, params={"from": "2030-01-01T00:00:00"}, headers=headers).json()
+    assert "Task due: File brief" not in [i["title"] for i in window["items"]]
+    test_db.delete(task)
+    test_db.commit()
+    assert "task" not in [i["type"] for i in client.get(url, headers=headers).json()["items"]]
+
+def test_dashboard_stats_rollups(client, auth_token, test_db, query_budget):
+    from datetime import timedelta
+    from sqlalchemy import func, select
+    from app.dashboard import rollups
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    user = test_db.query(models.User).filter(models.User.email == security_subject(auth_token)).one()
+    before = client.get("/api/v1/dashboard/stats", headers=headers).json()
+
+    case_id = client.post("/api/v1/cases/", json={
+        "title": "Dashboard matter", "description": "", "case_number": f"DB/{uuid.uuid4().hex[:4]}",
+        "court": "", "judge": "", "case_types": [], "metadata_fields": {}
+    }, headers=headers).json()["id"]
+    now = datetime.utcnow()
+    client.post("/api/v1/tasks", json={"title": "Late", "case_id": case_id,
+                                       "due_date": (now - timedelta(days=2)).isoformat()}, headers=headers)
+    client.post("/api/v1/events", json={"title": "Soon", "case_id": case_id, "start_time": (now + timedelta(days=1)).isoformat(),
+                                        "end_time": (now + timedelta(days=1, hours=1)).isoformat()}, headers=headers)
+    invoice_ids = [client.post("/api/v1/invoices", json={
+        "case_id": case_id, "total_amount": amount, "status": "Sent", "due_date": (now + timedelta(days=days)).isoformat(),
+        "items": [{"description": "Work", "amount": amount}]
+    }, headers=headers).json()["id"] for amount, days in ((5000, -3), (7000, 30))]
+
+    with query_budget(3):
+        stats = client.get("/api/v1/dashboard/stats", headers=headers).json()
+    assert stats["total_cases"] == before["total_cases"] + 1
+    assert stats["cases_by_status"]["Open"] == before["cases_by_status"].get("Open", 0) + 1
+    assert stats["overdue_tasks"] == before["overdue_tasks"] + 1
+    assert stats["upcoming_events"] == before["upcoming_events"] + 1
+    assert "Soon" in [e["title"] for e in stats["next_events"]]
+    assert stats["outstanding_invoices"]["amount"] == before["outstanding_invoices"]["amount"] + 12000
+    assert stats["overdue_invoices"]["amount"] == before["overdue_invoices"]["amount"] + 5000
+
+    # Status changes and deletes move the counters; a full refresh agrees with them
+    invoice = test_db.get(models.Invoice, invoice_ids[0])
+    invoice.status = "Paid"
+    test_db.commit()
+    test_db.expire_all()
+    test_db.delete(test_db.get(models.Invoice, invoice_ids[1]))
+    test_db.commit()
+    stats = client.get("/api/v1/dashboard/stats", headers=headers).json()
+    assert stats["outstanding_invoices"] == before["outstanding_invoices"]
+    assert stats["invoices_by_status"]["Paid"]["amount"] == before["invoices_by_status"].get("Paid", {}).get("amount", 0) + 5000
+    sharded = test_db.execute(select(func.count(func.distinct(rollups.firm_rollups.c.shard))).where(
+        rollups.firm_rollups.c.firm_id == user.firm_id)).scalar()
+    assert sharded > 1  # Writers in one firm spread over counter rows
+    rollups.refresh(user.firm_id)
+    refreshed = client.get("/api/v1/dashboard/stats", headers=headers).json()
+    assert {k: v for k, v in refreshed.items() if k != "generated_at"} == {k: v for k, v in stats.items() if k != "generated_at"}
+    assert test_db.execute(select(func.max(rollups.firm_rollups.c.shard)).where(
+        rollups.firm_rollups.c.firm_id == user.firm_id)).scalar() == 0  # Refresh folds the shards
@@ -0,0 +1,188 @@
+import uuid
+import pytest
+from app.core.database import Base, engine, SessionLocal
+from app.core import models, security
+from app.audit import chain, writer
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _chain_rows(db, firm_id):
+    return db.query(models.SystemAudit).filter(
+        models.SystemAudit.firm_id == firm_id
+    ).order_by(models.SystemAudit.seq).all()
+
+
+def _assert_chain_valid(rows):
+    prev = chain.GENESIS_HASH
+    for expected_seq, row in enumerate(rows, start=1):
+        assert row.seq == expected_seq
+        assert row.prev_hash == prev
+        assert row.row_hash == chain.compute_row_hash(row)
+        prev = row.row_hash
+
+
+def test_log_audit_writes_with_callers_commit(db):
+    firm_id = f"firm-{uuid.uuid4().hex[:8]}"
+    for i in range(3):
+        security.log_audit(db, "user-1", firm_id, "CREATE_TASK", "tasks", f"task-{i}", {"n": i})
+    assert _chain_rows(db, firm_id) == []
+
+    db.commit()
+    rows = _chain_rows(db, firm_id)
+    assert [r.record_id for r in rows] == ["task-0", "task-1", "task-2"]
+    _assert_chain_valid(rows)
+    assert db.get(models.AuditChainHead, firm_id).last_hash == rows[-1].row_hash
+
+
+def test_rollback_discards_buffered_entries(db):
+    firm_id = f"firm-{uuid.uuid4().hex[:8]}"
+    security.log_audit(db, "user-1", firm_id, "DELETE", "tasks", "t")
+    db.rollback()
+    db.commit()
+    assert _chain_rows(db, firm_id) == []
+
+
+def test_background_flusher_continues_chain_and_flushes_on_stop(db):
+    firm_id = f"firm-{uuid.uuid4().hex[:8]}"
+    security.log_audit(db, "user-1", firm_id, "CREATE_CASE", "cases", "c-1")
+    db.commit()
+
+    flusher = writer.AuditFlusher(interval_ms=10_000)
+    flusher.start()
+    for i in range(5):
+        flusher.submit(writer.make_entry("user-1", firm_id, "EXPORT_DOSSIER", "cases", f"c-{i}"))
+    flusher.stop()
+
+    db.expire_all()
+    rows = _chain_rows(db, firm_id)
+    assert len(rows) == 6
+    _assert_chain_valid(rows)
+
+
+def _breaks(rows, head=None):
+    verifier = chain.ChainVerifier()
+    if head:
+        verifier.expect_head(*head)
+    for row in rows:
+        verifier.feed(row)
+    verifier.finish()
+    return [b["reason"] for b in verifier.breaks]
+
+
+def test_tampering_breaks_the_chain(db):
+    firm_id = f"firm-{uuid.uuid4().hex[:8]}"
+    for i in range(4):
+        security.log_audit(db, "user-1", firm_id, "UPDATE", "cases", f"c-{i}")
+    db.commit()
+    rows = _chain_rows(db, firm_id)
+    head = (rows[-1].seq, rows[-1].row_hash)
+    assert _breaks(rows, head) == []
+
+    # Deleted entries: in the middle a gap, at the end the recorded head
+    assert _breaks(rows[:1] + rows[2:], head) == ["gap: expected seq 2"]
+    assert _breaks(rows[:-1], head) == ["chain head is seq 4 but log ends at seq 3"]
+
+    # Reordered entries, even with seq rewritten to hide the move
+    swapped = [rows[0], rows[2], rows[1], rows[3]]
+    assert _breaks(swapped, head)
+    rows[1].seq, rows[2].seq = 3, 2
+    assert "prev_hash does not match previous entry" in _breaks(swapped, head)
+
+    rows[0].details = {"forged": True}
+    assert rows[0].row_hash != chain.compute_row_hash(rows[0])
+    db.rollback()
+
+
+def test_firmless_entries_are_hashed_but_not_chained(db):
+    user_id = f"user-{uuid.uuid4().hex[:8]}"
+    security.log_audit(db, user_id, None, "SIGNUP", "users", user_id)
+    db.commit()
+    row = db.query(models.SystemAudit).filter(models.SystemAudit.user_id == user_id).one()
+    assert (row.firm_id, row.seq, row.prev_hash) == (None, None, None)
+    assert row.row_hash == chain.compute_row_hash(row)
+    assert db.get(models.AuditChainHead, "") is None
+
+
+def _export(firm_id, fmt="ndjson"):
+    from app.audit import export
+    return b"".join(export.stream_audit_export(firm_id, fmt)).decode()
+
+
+def test_export_streams_rows_and_verifies_chain(db):
+    import json
+    firm_id = f"firm-{uuid.uuid4().hex[:8]}"
+    for i in range(4):
+        security.log_audit(db, "user-1", firm_id, "CREATE_TASK", "tasks", f"t-{i}", {"i": i})
+    db.commit()
+
+    lines = [json.loads(line) for line in _export(firm_id).splitlines()]
+    assert [r["seq"] for r in lines[:-1]] == [1, 2, 3, 4]
+    trailer = lines[-1]
+    assert trailer["type"] == "trailer"
+    assert trailer["intact"] is True
+    assert trailer["verified"] == 4
+
+    csv_lines = _export(firm_id, "csv").splitlines()
+    assert csv_lines[0].startswith("seq,id,timestamp")
+    assert csv_lines[-1].startswith("#TRAILER")
+
+
+def test_export_reports_tampering_and_truncation(db):
+    import json
+    firm_id = f"firm-{uuid.uuid4().hex[:8]}"
+    for i in range(4):
+        security.log_audit(db, "user-1", firm_id, "UPDATE", "cases", f"c-{i}")
+    db.commit()
+    rows = _chain_rows(db, firm_id)
+    rows[1].details = {"forged": True}
+    db.delete(rows[3])
+    db.commit()
+
+    trailer = json.loads(_export(firm_id).splitlines()[-1])
+    assert trailer["intact"] is False
+    reasons = [b["reason"] for b in trailer["breaks"]]
+    assert any("row_hash mismatch" in r for r in reasons)
+    assert any("log ends at seq 3" in r for r in reasons)
+
+
+def test_export_reports_deleted_leading_entries(db):
+    import json
+    firm_id = f"firm-{uuid.uuid4().hex[:8]}"
+    for i in range(4):
+        security.log_audit(db, "user-1", firm_id, "UPDATE", "cases", f"c-{i}")
+    db.commit()
+    rows = _chain_rows(db, firm_id)
+    db.delete(rows[0])
+    db.delete(rows[1])
+    db.commit()
+
+    trailer = json.loads(_export(firm_id).splitlines()[-1])
+    assert trailer["intact"] is False
+    assert any("does not start at seq 1" in b["reason"] for b in trailer["breaks"])
+
+
+def test_windowed_export_checks_continuity_by_seq(db):
+    import json
+    from datetime import timedelta
+    from app.audit import export
+    firm_id = f"firm-{uuid.uuid4().hex[:8]}"
+    early, late, last = (writer.make_entry("user-1", firm_id, "UPDATE", "cases", f"c-{i}") for i in range(3))
+    late["timestamp"] = early["timestamp"] + timedelta(seconds=1)
+    last["timestamp"] = early["timestamp"] + timedelta(seconds=2)
+    for entry in (late, early, last):  # Concurrent commits: seq order differs from timestamp order
+        writer.write_entries(db, [entry])
+        db.commit()
+
+    lines = b"".join(export.stream_audit_export(firm_id, since=late["timestamp"])).decode().splitlines()
+    trailer = json.loads(lines[-1])
+    assert [json.loads(line)["seq"] for line in lines[:-1]] == [1, 2, 3]
+    assert trailer["intact"] is True
@@ -0,0 +1,80 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from app.core.database import Base, engine, SessionLocal
+from app.core import models
+from app.evidence import custody
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _make_case(db, firm_id, links):
+    """links: list of (file_hash, previous_hash) in append order."""
+    case = models.Case(title="Custody", firm_id=firm_id, case_number=uuid.uuid4().hex)
+    db.add(case)
+    db.flush()
+    start = datetime(2024, 1, 1)
+    for i, (file_hash, previous_hash) in enumerate(links):
+        db.add(models.Evidence(case_id=case.id, firm_id=firm_id, title=f"E{i}", file_hash=file_hash,
+                               previous_hash=previous_hash, created_at=start + timedelta(minutes=i)))
+    db.commit()
+    return case.id
+
+
+def test_intact_chain(db):
+    case_id = _make_case(db, "firm-x", [("a", "GENESIS"), ("b", "a"), ("c", "b")])
+    report = custody.verify_case(db, case_id)
+    assert report["intact"] is True
+    assert report["items"] == 3
+    assert report["head_hash"] == "c"
+
+
+def test_detects_fork_and_break(db):
+    case_id = _make_case(db, "firm-x", [("a", "GENESIS"), ("b", "a"), ("c", "a"), ("d", "zzz")])
+    report = custody.verify_case(db, case_id)
+    assert report["intact"] is False
+    assert [f["found"] for f in report["forks"]] == ["a"]
+    assert [b["found"] for b in report["breaks"]] == ["zzz"]
+
+
+def test_verify_firm_in_worker_processes(db):
+    firm_id = f"firm-{uuid.uuid4().hex[:8]}"
+    good = _make_case(db, firm_id, [("a", "GENESIS"), ("b", "a")])
+    bad = _make_case(db, firm_id, [("a", "nope")])
+
+    reports = {r["case_id"]: r for r in custody.verify_firm(firm_id, workers=2)}
+    assert reports[good]["intact"] is True
+    assert reports[bad]["intact"] is False
+
+
+def _append_in_own_session(case_id, firm_id, i):
+    with SessionLocal() as session:
+        ev = models.Evidence(id=models.generate_uuid(), case_id=case_id, firm_id=firm_id,
+                             title=f"Parallel {i}", file_hash=f"hash-{i}")
+        custody.append(session, case_id, ev)
+        session.add(ev)
+        session.commit()
+
+
+def test_parallel_appends_keep_chain_linear(db):
+    from concurrent.futures import ThreadPoolExecutor
+    firm_id = f"firm-{uuid.uuid4().hex[:8]}"
+    case_id = _make_case(db, firm_id, [("legacy", "GENESIS")])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: _append_in_own_session(case_id, firm_id, i), range(40)))
+
+    report = custody.verify_case(db, case_id)
+    assert report["intact"] is True, report
+    assert report["items"] == 41
+    head = db.get(models.EvidenceChainHead, case_id)
+    assert head.seq == 40
+    assert head.head_hash == report["head_hash"]
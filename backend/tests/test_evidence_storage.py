@@ -0,0 +1,41 @@
+import pytest
+import asyncio
+import hashlib
+import io
+import os
+from fastapi import UploadFile
+from app.evidence import storage
+
+
+def _upload(data: bytes, filename: str = "exhibit.bin") -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+
+def test_store_upload_hashes_incrementally(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path))
+    monkeypatch.setattr(storage, "EVIDENCE_CHUNK_SIZE", 7)
+    data = os.urandom(1000)
+
+    stored = asyncio.run(storage.store_upload(_upload(data), "case-1"))
+
+    assert stored.file_hash == hashlib.sha256(data).hexdigest()
+    assert stored.size == len(data)
+    assert stored.storage_path.endswith(f"{stored.file_hash}_exhibit.bin")
+    with open(stored.storage_path, "rb") as f:
+        assert f.read() == data
+    assert not [n for n in os.listdir(tmp_path / "case-1") if n.startswith(".incoming")]
+
+
+def test_store_upload_aborts_on_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path))
+
+    class BrokenUpload:
+        filename = "broken.bin"
+        content_type = "application/octet-stream"
+
+        async def read(self, size):
+            raise IOError("client disconnected")
+
+    with pytest.raises(IOError, match="client disconnected"):
+        asyncio.run(storage.store_upload(BrokenUpload(), "case-2"))
+    assert os.listdir(tmp_path / "case-2") == []  # The temp object was removed
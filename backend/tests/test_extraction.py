@@ -0,0 +1,65 @@
+import io
+import zipfile
+import pytest
+from app.evidence import extraction, textstore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    target = textstore.TextStore(str(tmp_path / "text"))
+    monkeypatch.setattr(textstore, "TEXT_BLOCK_SIZE", 1024)
+    return target
+
+
+def _docx(paragraphs) -> bytes:
+    ns = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", f"<w:document {ns}><w:body>{body}</w:body></w:document>")
+    return buffer.getvalue()
+
+
+def test_block_store_random_access_and_streaming(store):
+    text = "".join(f"línea {i} del expediente\n" for i in range(2000))  # Multi-byte chars across blocks
+    size = store.put("ab" * 32, iter(text.splitlines(keepends=True)))
+    assert size == len(text.encode())
+    with store.open("ab" * 32) as extracted:
+        assert extracted.blocks > 1
+        assert "".join(extracted.iter_text()) == text
+        assert extracted.read_bytes(5000, 300) == text.encode()[5000:5300]
+        assert extracted.word_count() == len(text.split())
+        assert extracted.excerpt(12) == text.encode()[:12].decode()
+    assert store.open("cd" * 32) is None
+
+
+def test_extract_formats(tmp_path, store):
+    docx = tmp_path / "memo.docx"
+    docx.write_bytes(_docx(["Settlement terms", "Payment within 30 days"]))
+    plain = tmp_path / "note.txt"
+    plain.write_text("Call opposing counsel")
+    binary = tmp_path / "photo.jpg"
+    binary.write_bytes(b"\xff\xd8\xff\xe0")
+
+    assert extraction.extract_to_store("1" * 64, str(docx), "memo.docx", None, store.root)
+    assert extraction.extract_to_store("2" * 64, str(plain), "note.txt", "text/plain", store.root)
+    assert extraction.extract_to_store("3" * 64, str(binary), "photo.jpg", "image/jpeg", store.root) is None
+    with store.open("1" * 64) as doc:
+        assert doc.text() == "Settlement terms\nPayment within 30 days\n"
+    with store.open("2" * 64) as doc:
+        assert doc.text() == "Call opposing counsel"
+
+
+def test_extraction_runs_in_process_pool(tmp_path, store, monkeypatch):
+    plain = tmp_path / "note.txt"
+    plain.write_text("Deposition scheduled for Monday")
+    monkeypatch.setattr(extraction, "EXTRACTION_WORKERS", 1)
+    try:
+        future = extraction.get_pool().submit(
+            extraction.extract_to_store, "4" * 64, str(plain), "note.txt", None, store.root
+        )
+        assert future.result(timeout=60) == len("Deposition scheduled for Monday")
+    finally:
+        extraction.shutdown()
+    with store.open("4" * 64) as doc:
+        assert doc.word_count() == 4
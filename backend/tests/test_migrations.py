@@ -0,0 +1,46 @@
+from app.core.database import Base, engine, SessionLocal
+from app.core import models, migrations
+
+
+def test_normalize_json_history_moves_blobs_once():
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        firm = models.Firm(name="Migration Firm")
+        db.add(firm)
+        db.flush()
+        case = models.Case(title="Legacy", firm_id=firm.id, metadata_fields={"court_room": "4B"})
+        db.add(case)
+        db.flush()
+        ev = models.Evidence(case_id=case.id, title="Exhibit", firm_id=firm.id, file_hash="f" * 64, audit_chain=[
+            {"action": "Uploaded", "timestamp": "2024-03-01T10:00:00", "user": "a@example.com",
+             "hash": "f" * 64, "previous_hash": "GENESIS"},
+            {"action": "XAI_REPORT_GENERATED", "timestamp": "2024-03-02T09:30:00Z",
+             "user": "Veritas-System-AI", "details": {"summary": "first"}},
+        ])
+        db.add(ev)
+        db.flush()
+        case.metadata_fields = {"court_room": "4B", "xai_reports": [
+            {"summary": "first", "claims": [{"finding": "x", "confidence": 0.9, "citation": ev.id}]},
+            {"summary": "second", "claims": [{"finding": "y", "confidence": 0.8, "citation": "deleted-exhibit"}]},
+        ]}
+        db.commit()
+        case_id, evidence_id = case.id, ev.id
+
+    migrations.normalize_json_history(batch_size=1)
+    assert migrations.normalize_json_history() == {"evidence_custody_events": 0, "case_xai_reports": 0}
+
+    with SessionLocal() as db:
+        assert db.get(models.Evidence, evidence_id).audit_chain is None
+        assert db.get(models.Case, case_id).metadata_fields == {"court_room": "4B"}
+
+        events = db.query(models.EvidenceCustodyEvent).filter_by(evidence_id=evidence_id).order_by(
+            models.EvidenceCustodyEvent.occurred_at).all()
+        assert [(e.action, e.actor) for e in events] == [
+            ("Uploaded", "a@example.com"), ("XAI_REPORT_GENERATED", "Veritas-System-AI")
+        ]
+        assert events[0].details == {"hash": "f" * 64, "previous_hash": "GENESIS"}
+
+        reports = db.query(models.CaseXaiReport).filter_by(case_id=case_id).order_by(
+            models.CaseXaiReport.created_at).all()
+        assert [r.report["summary"] for r in reports] == ["first", "second"]
+        assert [r.evidence_id for r in reports] == [evidence_id, None]
@@ -0,0 +1,91 @@
+import uuid
+import pytest
+from app.core.database import Base, engine, SessionLocal
+from app.core import models
+from app.search import service, index
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def firm_id(db):
+    firm_id = f"firm-{uuid.uuid4().hex[:8]}"
+    case = models.Case(title="Harbor Freight v. Oceanic", case_number=f"HF-{uuid.uuid4().hex[:4]}",
+                       description="Maritime contract dispute", firm_id=firm_id)
+    db.add(case)
+    db.flush()
+    db.add(models.Task(title="Draft oceanic discovery requests", case_id=case.id, firm_id=firm_id))
+    db.add(models.Evidence(title="Bill of lading", type="Document", case_id=case.id, firm_id=firm_id))
+    db.commit()
+    return firm_id
+
+
+def _items(db, firm_id, query, **kwargs):
+    return service.search(db, firm_id, query, **kwargs)["items"]
+
+
+def test_single_query_across_entity_types(db, firm_id):
+    results = _items(db, firm_id, "oceanic")
+    assert {r["type"] for r in results} == {"Case", "Task"}
+    assert 0 < results[-1]["relevance"] <= results[0]["relevance"] < 1
+    assert _items(db, firm_id, "lading")[0]["type"] == "Evidence"
+    assert _items(db, firm_id, "marit")[0]["type"] == "Case"  # Prefix match on body
+
+
+def test_index_follows_updates_and_deletes(db, firm_id):
+    task = db.query(models.Task).filter(models.Task.firm_id == firm_id).one()
+    task.title = "Prepare deposition outline"
+    db.commit()
+    assert [r["type"] for r in _items(db, firm_id, "oceanic")] == ["Case"]
+    assert _items(db, firm_id, "deposition")[0]["id"] == task.id
+
+    db.delete(task)
+    db.commit()
+    assert _items(db, firm_id, "deposition") == []
+
+
+def test_firm_isolation_and_operator_safety(db, firm_id):
+    assert _items(db, "other-firm", "oceanic") == []
+    assert _items(db, firm_id, 'oceanic"*') != []
+    assert _items(db, firm_id, 'NEAR( "x" OR -') == []  # No FTS syntax errors
+    assert _items(db, firm_id, "   ") == []
+
+
+def test_rebuild_reindexes_existing_rows(db, firm_id):
+    db.execute(index.search_documents.delete().where(index.search_documents.c.firm_id == firm_id))
+    db.commit()
+    assert _items(db, firm_id, "oceanic") == []
+    index.rebuild()
+    assert len(_items(db, firm_id, "oceanic")) == 2
+
+
+def test_cursor_pages_and_facets(db):
+    firm_id = f"firm-{uuid.uuid4().hex[:8]}"
+    case = models.Case(title="Alpha matter", case_number=f"AL-{uuid.uuid4().hex[:4]}", firm_id=firm_id)
+    db.add(case)
+    db.flush()
+    for i in range(7):
+        db.add(models.Task(title=f"Alpha task {i}", case_id=case.id, firm_id=firm_id))
+    db.commit()
+
+    first = service.search(db, firm_id, "alpha", limit=3)
+    assert first["facets"] == {"Case": 1, "Task": 7}
+    seen, page = list(first["items"]), first
+    while page["next_cursor"]:
+        page = service.search(db, firm_id, "alpha", limit=3, cursor=page["next_cursor"])
+        assert page["facets"] == {}
+        seen.extend(page["items"])
+    assert len(seen) == 8
+    assert len({r["id"] for r in seen}) == 8
+    assert [r["relevance"] for r in seen] == sorted((r["relevance"] for r in seen), reverse=True)
+
+    tasks_only = service.search(db, firm_id, "alpha", limit=50, entity_type="Task")
+    assert {r["type"] for r in tasks_only["items"]} == {"Task"}
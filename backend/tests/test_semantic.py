@@ -0,0 +1,90 @@
+import os
+import uuid
+import pytest
+import numpy as np
+from app.search import semantic
+
+
+def _random_unit(rng, n, dim):
+    data = rng.standard_normal((n, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = semantic.HashingEmbedder(64)
+    a, b, c = embedder.embed(["breach of contract damages", "breach of contract damages", "harbor pilot logbook"])
+    assert np.allclose(a, b)
+    assert abs(np.linalg.norm(a) - 1) < 1e-5
+    assert a @ b > a @ c
+
+
+def test_chunk_text_overlaps():
+    words = [f"w{i}" for i in range(450)]
+    chunks = semantic.chunk_text(" ".join(words), words_per_chunk=200, overlap=40)
+    assert [len(c.split()) for c in chunks] == [200, 200, 130]
+    assert chunks[1].split()[0] == "w160"
+    assert semantic.chunk_text("   ") == []
+
+
+def test_ivf_index_recall_and_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(semantic, "SEMANTIC_MIN_TRAIN", 500)
+    rng = np.random.default_rng(1)
+    index = semantic.LocalANNIndex(str(tmp_path / "firm"), 32)
+    ids = [str(uuid.uuid4()) for _ in range(100)]
+    data = _random_unit(rng, 1000, 32)
+    for i, evidence_id in enumerate(ids):
+        index.add(evidence_id, data[i * 10:(i + 1) * 10])
+    assert index._state()["trained"] >= 500
+
+    late = str(uuid.uuid4())
+    index.add(late, data[:1] * -1)  # Lands in the unindexed tail
+    assert index.search(data[0] * -1, k=1)[0]["evidence_id"] == late
+
+    reopened = semantic.LocalANNIndex(str(tmp_path / "firm"), 32)
+    hits = reopened.search(data[555], k=5, nprobe=reopened._state()["nlist"])
+    assert hits[0] == {"evidence_id": ids[55], "chunk": 5, "score": hits[0]["score"]}
+    assert len({h["evidence_id"] for h in hits}) == 5
+
+
+def test_index_text_search_cites_evidence(tmp_path, monkeypatch):
+    monkeypatch.setattr(semantic, "SEMANTIC_INDEX_ROOT", str(tmp_path))
+    semantic.index_text("firm-a", "ev-1", "The vessel ran aground near the harbor entrance at night.")
+    semantic.index_text("firm-a", "ev-2", "Invoice for consulting services rendered in March.")
+    hits = semantic.search("firm-a", "vessel aground harbor", k=2)
+    assert hits[0]["citation"] == "ev-1"
+    assert semantic.search("firm-b", "vessel aground harbor") == []
+
+
+def test_append_repairs_a_torn_record(tmp_path):
+    rng = np.random.default_rng(2)
+    index = semantic.LocalANNIndex(str(tmp_path / "firm"), 16)
+    first, second = str(uuid.uuid4()), str(uuid.uuid4())
+    index.add(first, _random_unit(rng, 3, 16))
+    with open(index._path("vectors.f32"), "ab") as f:  # Crash after the vectors, before ids/chunks
+        f.write(_random_unit(rng, 2, 16).tobytes())
+    assert len(index) == 3
+
+    query = _random_unit(rng, 1, 16)
+    index.add(second, query)
+    assert len(index) == 4 and os.path.getsize(index._path("vectors.f32")) == 4 * 16 * 4
+    assert index.search(query[0], k=1)[0] == {"evidence_id": second, "chunk": 0, "score": pytest.approx(1.0)}
+
+
+def test_retrain_publishes_a_new_generation(tmp_path, monkeypatch):
+    monkeypatch.setattr(semantic, "SEMANTIC_MIN_TRAIN", 100)
+    rng = np.random.default_rng(3)
+    index = semantic.LocalANNIndex(str(tmp_path / "firm"), 16)
+    data = _random_unit(rng, 400, 16)
+    generations = []
+    for i in range(40):
+        index.add(str(uuid.uuid4()), data[i * 10:(i + 1) * 10])
+        generation = index._state().get("ivf")
+        if generation and generation not in generations:
+            generations.append(generation)
+    assert len(generations) >= 3
+    on_disk = sorted(name for name in os.listdir(index.directory) if name.startswith("ivf"))
+    assert on_disk == sorted(generations[-2:])  # Current, plus the previous one for in-flight readers
+
+    state, count, centroids, order, offsets = index._snapshot()
+    assert state["ivf"] == generations[-1] and len(order) == state["trained"]
+    assert len(centroids) == state["nlist"] and offsets[-1] == state["trained"]